@@ -10,8 +10,12 @@ d = { 'settings': { 'branch': 'main',
                              'chewc.chewc.BreedingSimulation.calculate_reward': ( 'chewc2.html#breedingsimulation.calculate_reward',
                                                                                   'chewc/chewc.py'),
                              'chewc.chewc.BreedingSimulation.get_state': ('chewc2.html#breedingsimulation.get_state', 'chewc/chewc.py'),
+                             'chewc.chewc.BreedingSimulation.load': ('chewc2.html#breedingsimulation.load', 'chewc/chewc.py'),
                              'chewc.chewc.BreedingSimulation.plot_history': ( 'chewc2.html#breedingsimulation.plot_history',
                                                                               'chewc/chewc.py'),
+                             'chewc.chewc.BreedingSimulation.population_metrics': ( 'chewc2.html#breedingsimulation.population_metrics',
+                                                                                    'chewc/chewc.py'),
+                             'chewc.chewc.BreedingSimulation.save': ('chewc2.html#breedingsimulation.save', 'chewc/chewc.py'),
                              'chewc.chewc.BreedingSimulation.select_parents': ( 'chewc2.html#breedingsimulation.select_parents',
                                                                                 'chewc/chewc.py'),
                              'chewc.chewc.BreedingSimulation.step': ('chewc2.html#breedingsimulation.step', 'chewc/chewc.py'),
@@ -29,22 +33,29 @@ d = { 'settings': { 'branch': 'main',
                              'chewc.chewc.MetaDataProcessor': ('chewc2.html#metadataprocessor', 'chewc/chewc.py'),
                              'chewc.chewc.MetaDataProcessor.__init__': ('chewc2.html#metadataprocessor.__init__', 'chewc/chewc.py'),
                              'chewc.chewc.MetaDataProcessor.forward': ('chewc2.html#metadataprocessor.forward', 'chewc/chewc.py'),
+                             'chewc.chewc.NonAdditiveTrait': ('chewc2.html#nonadditivetrait', 'chewc/chewc.py'),
+                             'chewc.chewc.NonAdditiveTrait.__init__': ('chewc2.html#nonadditivetrait.__init__', 'chewc/chewc.py'),
                              'chewc.chewc.Population': ('chewc2.html#population', 'chewc/chewc.py'),
                              'chewc.chewc.Population.__init__': ('chewc2.html#population.__init__', 'chewc/chewc.py'),
                              'chewc.chewc.Trait': ('chewc2.html#trait', 'chewc/chewc.py'),
                              'chewc.chewc.Trait.__init__': ('chewc2.html#trait.__init__', 'chewc/chewc.py'),
+                             'chewc.chewc.allele_frequencies': ('chewc2.html#allele_frequencies', 'chewc/chewc.py'),
                              'chewc.chewc.breed': ('chewc2.html#breed', 'chewc/chewc.py'),
                              'chewc.chewc.bv': ('chewc2.html#bv', 'chewc/chewc.py'),
                              'chewc.chewc.calculate_breeding_value': ('chewc2.html#calculate_breeding_value', 'chewc/chewc.py'),
+                             'chewc.chewc.count_alleles': ('chewc2.html#count_alleles', 'chewc/chewc.py'),
                              'chewc.chewc.create_dummy_data': ('chewc2.html#create_dummy_data', 'chewc/chewc.py'),
                              'chewc.chewc.create_pop': ('chewc2.html#create_pop', 'chewc/chewc.py'),
                              'chewc.chewc.create_progeny': ('chewc2.html#create_progeny', 'chewc/chewc.py'),
                              'chewc.chewc.create_random_pop': ('chewc2.html#create_random_pop', 'chewc/chewc.py'),
+                             'chewc.chewc.genetic_components': ('chewc2.html#genetic_components', 'chewc/chewc.py'),
+                             'chewc.chewc.genetic_value': ('chewc2.html#genetic_value', 'chewc/chewc.py'),
                              'chewc.chewc.phenotype': ('chewc2.html#phenotype', 'chewc/chewc.py'),
                              'chewc.chewc.population_statistics': ('chewc2.html#population_statistics', 'chewc/chewc.py'),
                              'chewc.chewc.prep': ('chewc2.html#prep', 'chewc/chewc.py'),
                              'chewc.chewc.recombine': ('chewc2.html#recombine', 'chewc/chewc.py'),
                              'chewc.chewc.run_generation': ('chewc2.html#run_generation', 'chewc/chewc.py'),
+                             'chewc.chewc.select_individuals': ('chewc2.html#select_individuals', 'chewc/chewc.py'),
                              'chewc.chewc.truncation_selection': ('chewc2.html#truncation_selection', 'chewc/chewc.py'),
                              'chewc.chewc.update_pop': ('chewc2.html#update_pop', 'chewc/chewc.py')},
             'chewc.core': { 'chewc.core.Genome': ('core.html#genome', 'chewc/core.py'),
@@ -54,35 +65,262 @@ d = { 'settings': { 'branch': 'main',
                             'chewc.core.Genome.to': ('core.html#genome.to', 'chewc/core.py'),
                             'chewc.core.Individual': ('core.html#individual', 'chewc/core.py'),
                             'chewc.core.Individual.__init__': ('core.html#individual.__init__', 'chewc/core.py'),
+                            'chewc.core.Individual._optional_id': ('core.html#individual._optional_id', 'chewc/core.py'),
+                            'chewc.core.Individual._view': ('core.html#individual._view', 'chewc/core.py'),
+                            'chewc.core.Individual.breeding_values': ('core.html#individual.breeding_values', 'chewc/core.py'),
                             'chewc.core.Individual.create_random_individual': ( 'core.html#individual.create_random_individual',
                                                                                 'chewc/core.py'),
+                            'chewc.core.Individual.father_id': ('core.html#individual.father_id', 'chewc/core.py'),
+                            'chewc.core.Individual.genome': ('core.html#individual.genome', 'chewc/core.py'),
+                            'chewc.core.Individual.haplotypes': ('core.html#individual.haplotypes', 'chewc/core.py'),
+                            'chewc.core.Individual.id': ('core.html#individual.id', 'chewc/core.py'),
+                            'chewc.core.Individual.mother_id': ('core.html#individual.mother_id', 'chewc/core.py'),
+                            'chewc.core.Individual.phenotypes': ('core.html#individual.phenotypes', 'chewc/core.py'),
                             'chewc.core.Population': ('core.html#population', 'chewc/core.py'),
+                            'chewc.core.Population.__getitem__': ('core.html#population.__getitem__', 'chewc/core.py'),
                             'chewc.core.Population.__init__': ('core.html#population.__init__', 'chewc/core.py'),
+                            'chewc.core.Population.__len__': ('core.html#population.__len__', 'chewc/core.py'),
+                            'chewc.core.Population._count': ('core.html#population._count', 'chewc/core.py'),
+                            'chewc.core.Population._gathered_storage': ('core.html#population._gathered_storage', 'chewc/core.py'),
+                            'chewc.core.Population._n_haplotypes': ('core.html#population._n_haplotypes', 'chewc/core.py'),
+                            'chewc.core.Population._next_id': ('core.html#population._next_id', 'chewc/core.py'),
+                            'chewc.core.Population._packed': ('core.html#population._packed', 'chewc/core.py'),
+                            'chewc.core.Population._row': ('core.html#population._row', 'chewc/core.py'),
+                            'chewc.core.Population._set_arrays': ('core.html#population._set_arrays', 'chewc/core.py'),
+                            'chewc.core.Population._set_counts': ('core.html#population._set_counts', 'chewc/core.py'),
+                            'chewc.core.Population._unpacked': ('core.html#population._unpacked', 'chewc/core.py'),
+                            'chewc.core.Population.add_haplotypes': ('core.html#population.add_haplotypes', 'chewc/core.py'),
                             'chewc.core.Population.add_individual': ('core.html#population.add_individual', 'chewc/core.py'),
+                            'chewc.core.Population.allele_counts': ('core.html#population.allele_counts', 'chewc/core.py'),
                             'chewc.core.Population.calculate_allele_frequencies': ( 'core.html#population.calculate_allele_frequencies',
                                                                                     'chewc/core.py'),
+                            'chewc.core.Population.calculate_expected_heterozygosity': ( 'core.html#population.calculate_expected_heterozygosity',
+                                                                                         'chewc/core.py'),
                             'chewc.core.Population.calculate_genetic_diversity': ( 'core.html#population.calculate_genetic_diversity',
                                                                                    'chewc/core.py'),
+                            'chewc.core.Population.calculate_heterozygosity': ( 'core.html#population.calculate_heterozygosity',
+                                                                                'chewc/core.py'),
+                            'chewc.core.Population.calculate_minor_allele_frequencies': ( 'core.html#population.calculate_minor_allele_frequencies',
+                                                                                          'chewc/core.py'),
                             'chewc.core.Population.create_random_founder_population': ( 'core.html#population.create_random_founder_population',
                                                                                         'chewc/core.py'),
+                            'chewc.core.Population.fixed_loci': ('core.html#population.fixed_loci', 'chewc/core.py'),
+                            'chewc.core.Population.get_alleles': ('core.html#population.get_alleles', 'chewc/core.py'),
                             'chewc.core.Population.get_dosages': ('core.html#population.get_dosages', 'chewc/core.py'),
+                            'chewc.core.Population.get_gametes': ('core.html#population.get_gametes', 'chewc/core.py'),
                             'chewc.core.Population.get_genotypes': ('core.html#population.get_genotypes', 'chewc/core.py'),
+                            'chewc.core.Population.get_packed': ('core.html#population.get_packed', 'chewc/core.py'),
+                            'chewc.core.Population.haplotypes': ('core.html#population.haplotypes', 'chewc/core.py'),
+                            'chewc.core.Population.individuals': ('core.html#population.individuals', 'chewc/core.py'),
+                            'chewc.core.Population.replace_individuals': ('core.html#population.replace_individuals', 'chewc/core.py'),
+                            'chewc.core.Population.select': ('core.html#population.select', 'chewc/core.py'),
                             'chewc.core.Population.size': ('core.html#population.size', 'chewc/core.py'),
                             'chewc.core.PopulationDataset': ('core.html#populationdataset', 'chewc/core.py'),
                             'chewc.core.PopulationDataset.__getitem__': ('core.html#populationdataset.__getitem__', 'chewc/core.py'),
                             'chewc.core.PopulationDataset.__init__': ('core.html#populationdataset.__init__', 'chewc/core.py'),
                             'chewc.core.PopulationDataset.__len__': ('core.html#populationdataset.__len__', 'chewc/core.py'),
-                            'chewc.core.create_population_dataloader': ('core.html#create_population_dataloader', 'chewc/core.py')},
-            'chewc.cross': {'chewc.cross.random_crosses': ('cross.html#random_crosses', 'chewc/cross.py')},
-            'chewc.meiosis': { 'chewc.meiosis.poisson_crossing_over': ('meiosis.html#poisson_crossing_over', 'chewc/meiosis.py'),
-                               'chewc.meiosis.simulate_gametes': ('meiosis.html#simulate_gametes', 'chewc/meiosis.py')},
-            'chewc.trait': { 'chewc.trait.TraitModule': ('trait.html#traitmodule', 'chewc/trait.py'),
+                            'chewc.core._IndividualViews': ('core.html#_individualviews', 'chewc/core.py'),
+                            'chewc.core._IndividualViews.__iadd__': ('core.html#_individualviews.__iadd__', 'chewc/core.py'),
+                            'chewc.core._IndividualViews.__init__': ('core.html#_individualviews.__init__', 'chewc/core.py'),
+                            'chewc.core._IndividualViews._read_only': ('core.html#_individualviews._read_only', 'chewc/core.py'),
+                            'chewc.core._IndividualViews.append': ('core.html#_individualviews.append', 'chewc/core.py'),
+                            'chewc.core._IndividualViews.extend': ('core.html#_individualviews.extend', 'chewc/core.py'),
+                            'chewc.core._as_id': ('core.html#_as_id', 'chewc/core.py'),
+                            'chewc.core._as_id_tensor': ('core.html#_as_id_tensor', 'chewc/core.py'),
+                            'chewc.core._packed_bit_counts': ('core.html#_packed_bit_counts', 'chewc/core.py'),
+                            'chewc.core._packed_heterozygous_words': ('core.html#_packed_heterozygous_words', 'chewc/core.py'),
+                            'chewc.core.bivalent_homologs': ('core.html#bivalent_homologs', 'chewc/core.py'),
+                            'chewc.core.create_population_dataloader': ('core.html#create_population_dataloader', 'chewc/core.py'),
+                            'chewc.core.n_packed_words': ('core.html#n_packed_words', 'chewc/core.py'),
+                            'chewc.core.pack_haplotypes': ('core.html#pack_haplotypes', 'chewc/core.py'),
+                            'chewc.core.packed_allele_frequencies': ('core.html#packed_allele_frequencies', 'chewc/core.py'),
+                            'chewc.core.packed_dosages': ('core.html#packed_dosages', 'chewc/core.py'),
+                            'chewc.core.packed_heterozygosity': ('core.html#packed_heterozygosity', 'chewc/core.py'),
+                            'chewc.core.packed_popcount': ('core.html#packed_popcount', 'chewc/core.py'),
+                            'chewc.core.packed_select': ('core.html#packed_select', 'chewc/core.py'),
+                            'chewc.core.unpack_haplotypes': ('core.html#unpack_haplotypes', 'chewc/core.py')},
+            'chewc.cross': { 'chewc.cross.diallel_plan': ('cross.html#diallel_plan', 'chewc/cross.py'),
+                             'chewc.cross.factorial_plan': ('cross.html#factorial_plan', 'chewc/cross.py'),
+                             'chewc.cross.homolog_pairing': ('cross.html#homolog_pairing', 'chewc/cross.py'),
+                             'chewc.cross.make_crosses': ('cross.html#make_crosses', 'chewc/cross.py'),
+                             'chewc.cross.random_crosses': ('cross.html#random_crosses', 'chewc/cross.py')},
+            'chewc.env': { 'chewc.env.VecBreedingEnv': ('env.html#vecbreedingenv', 'chewc/env.py'),
+                           'chewc.env.VecBreedingEnv.__init__': ('env.html#vecbreedingenv.__init__', 'chewc/env.py'),
+                           'chewc.env.VecBreedingEnv._selection_sizes': ('env.html#vecbreedingenv._selection_sizes', 'chewc/env.py'),
+                           'chewc.env.VecBreedingEnv.observe': ('env.html#vecbreedingenv.observe', 'chewc/env.py'),
+                           'chewc.env.VecBreedingEnv.reset': ('env.html#vecbreedingenv.reset', 'chewc/env.py'),
+                           'chewc.env.VecBreedingEnv.step': ('env.html#vecbreedingenv.step', 'chewc/env.py')},
+            'chewc.gebv': { 'chewc.gebv.GenomicPredictor': ('gebv.html#genomicpredictor', 'chewc/gebv.py'),
+                            'chewc.gebv.GenomicPredictor.__init__': ('gebv.html#genomicpredictor.__init__', 'chewc/gebv.py'),
+                            'chewc.gebv.GenomicPredictor._solve': ('gebv.html#genomicpredictor._solve', 'chewc/gebv.py'),
+                            'chewc.gebv.GenomicPredictor.fit': ('gebv.html#genomicpredictor.fit', 'chewc/gebv.py'),
+                            'chewc.gebv.GenomicPredictor.predict': ('gebv.html#genomicpredictor.predict', 'chewc/gebv.py'),
+                            'chewc.gebv.GenomicPredictor.update': ('gebv.html#genomicpredictor.update', 'chewc/gebv.py'),
+                            'chewc.gebv.IncrementalGenomicPredictor': ('gebv.html#incrementalgenomicpredictor', 'chewc/gebv.py'),
+                            'chewc.gebv.IncrementalGenomicPredictor.__init__': ( 'gebv.html#incrementalgenomicpredictor.__init__',
+                                                                                 'chewc/gebv.py'),
+                            'chewc.gebv.IncrementalGenomicPredictor._accumulate': ( 'gebv.html#incrementalgenomicpredictor._accumulate',
+                                                                                    'chewc/gebv.py'),
+                            'chewc.gebv.IncrementalGenomicPredictor.fit': ('gebv.html#incrementalgenomicpredictor.fit', 'chewc/gebv.py'),
+                            'chewc.gebv.IncrementalGenomicPredictor.reset': ( 'gebv.html#incrementalgenomicpredictor.reset',
+                                                                              'chewc/gebv.py'),
+                            'chewc.gebv.IncrementalGenomicPredictor.update': ( 'gebv.html#incrementalgenomicpredictor.update',
+                                                                               'chewc/gebv.py'),
+                            'chewc.gebv.conjugate_gradient': ('gebv.html#conjugate_gradient', 'chewc/gebv.py')},
+            'chewc.generation': { 'chewc.generation.GenerationKernel': ('generation.html#generationkernel', 'chewc/generation.py'),
+                                  'chewc.generation.GenerationKernel.__init__': ( 'generation.html#generationkernel.__init__',
+                                                                                  'chewc/generation.py'),
+                                  'chewc.generation.GenerationKernel.haplotypes': ( 'generation.html#generationkernel.haplotypes',
+                                                                                    'chewc/generation.py'),
+                                  'chewc.generation.GenerationKernel.population': ( 'generation.html#generationkernel.population',
+                                                                                    'chewc/generation.py'),
+                                  'chewc.generation.GenerationKernel.run': ('generation.html#generationkernel.run', 'chewc/generation.py'),
+                                  'chewc.generation.GenerationKernel.step': ( 'generation.html#generationkernel.step',
+                                                                              'chewc/generation.py'),
+                                  'chewc.generation._genetic_values': ('generation.html#_genetic_values', 'chewc/generation.py'),
+                                  'chewc.generation.generation_step': ('generation.html#generation_step', 'chewc/generation.py')},
+            'chewc.grm': { 'chewc.grm.GenomicRelationship': ('grm.html#genomicrelationship', 'chewc/grm.py'),
+                           'chewc.grm.GenomicRelationship.__init__': ('grm.html#genomicrelationship.__init__', 'chewc/grm.py'),
+                           'chewc.grm.GenomicRelationship._centered': ('grm.html#genomicrelationship._centered', 'chewc/grm.py'),
+                           'chewc.grm.GenomicRelationship._reserve': ('grm.html#genomicrelationship._reserve', 'chewc/grm.py'),
+                           'chewc.grm.GenomicRelationship.matrix': ('grm.html#genomicrelationship.matrix', 'chewc/grm.py'),
+                           'chewc.grm.GenomicRelationship.update': ('grm.html#genomicrelationship.update', 'chewc/grm.py'),
+                           'chewc.grm.genomic_relationship_matrix': ('grm.html#genomic_relationship_matrix', 'chewc/grm.py')},
+            'chewc.history': { 'chewc.history.HistoryLog': ('history.html#historylog', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.__getitem__': ('history.html#historylog.__getitem__', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.__init__': ('history.html#historylog.__init__', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.__iter__': ('history.html#historylog.__iter__', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.__len__': ('history.html#historylog.__len__', 'chewc/history.py'),
+                               'chewc.history.HistoryLog._add_columns': ('history.html#historylog._add_columns', 'chewc/history.py'),
+                               'chewc.history.HistoryLog._buffered': ('history.html#historylog._buffered', 'chewc/history.py'),
+                               'chewc.history.HistoryLog._columns_of': ('history.html#historylog._columns_of', 'chewc/history.py'),
+                               'chewc.history.HistoryLog._read_part': ('history.html#historylog._read_part', 'chewc/history.py'),
+                               'chewc.history.HistoryLog._records': ('history.html#historylog._records', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.columns': ('history.html#historylog.columns', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.flush': ('history.html#historylog.flush', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.load': ('history.html#historylog.load', 'chewc/history.py'),
+                               'chewc.history.HistoryLog.record': ('history.html#historylog.record', 'chewc/history.py')},
+            'chewc.ld': { 'chewc.ld._ld_decay': ('ld.html#_ld_decay', 'chewc/ld.py'),
+                          'chewc.ld.band_distances': ('ld.html#band_distances', 'chewc/ld.py'),
+                          'chewc.ld.banded_ld': ('ld.html#banded_ld', 'chewc/ld.py'),
+                          'chewc.ld.ld_decay': ('ld.html#ld_decay', 'chewc/ld.py'),
+                          'chewc.ld.window_for_distance': ('ld.html#window_for_distance', 'chewc/ld.py'),
+                          'chewc.ld.windowed_ld': ('ld.html#windowed_ld', 'chewc/ld.py')},
+            'chewc.mating': { 'chewc.mating._cross_progeny': ('mating.html#_cross_progeny', 'chewc/mating.py'),
+                              'chewc.mating._gametes': ('mating.html#_gametes', 'chewc/mating.py'),
+                              'chewc.mating._positions': ('mating.html#_positions', 'chewc/mating.py'),
+                              'chewc.mating.backcross': ('mating.html#backcross', 'chewc/mating.py'),
+                              'chewc.mating.doubled_haploids': ('mating.html#doubled_haploids', 'chewc/mating.py'),
+                              'chewc.mating.self_population': ('mating.html#self_population', 'chewc/mating.py'),
+                              'chewc.mating.single_seed_descent': ('mating.html#single_seed_descent', 'chewc/mating.py'),
+                              'chewc.mating.three_way_crosses': ('mating.html#three_way_crosses', 'chewc/mating.py'),
+                              'chewc.mating.topcross': ('mating.html#topcross', 'chewc/mating.py')},
+            'chewc.meiosis': { 'chewc.meiosis._map_lengths': ('meiosis.html#_map_lengths', 'chewc/meiosis.py'),
+                               'chewc.meiosis._max_crossovers': ('meiosis.html#_max_crossovers', 'chewc/meiosis.py'),
+                               'chewc.meiosis.crossover_masks': ('meiosis.html#crossover_masks', 'chewc/meiosis.py'),
+                               'chewc.meiosis.pair_homologs': ('meiosis.html#pair_homologs', 'chewc/meiosis.py'),
+                               'chewc.meiosis.poisson_crossing_over': ('meiosis.html#poisson_crossing_over', 'chewc/meiosis.py'),
+                               'chewc.meiosis.sample_crossovers': ('meiosis.html#sample_crossovers', 'chewc/meiosis.py'),
+                               'chewc.meiosis.sample_switch_loci': ('meiosis.html#sample_switch_loci', 'chewc/meiosis.py'),
+                               'chewc.meiosis.simulate_gametes': ('meiosis.html#simulate_gametes', 'chewc/meiosis.py'),
+                               'chewc.meiosis.simulate_packed_gametes': ('meiosis.html#simulate_packed_gametes', 'chewc/meiosis.py'),
+                               'chewc.meiosis.switch_masks': ('meiosis.html#switch_masks', 'chewc/meiosis.py')},
+            'chewc.metrics': { 'chewc.metrics.MetricsTracker': ('metrics.html#metricstracker', 'chewc/metrics.py'),
+                               'chewc.metrics.MetricsTracker.__init__': ('metrics.html#metricstracker.__init__', 'chewc/metrics.py'),
+                               'chewc.metrics.MetricsTracker.compute': ('metrics.html#metricstracker.compute', 'chewc/metrics.py'),
+                               'chewc.metrics.MetricsTracker.due': ('metrics.html#metricstracker.due', 'chewc/metrics.py'),
+                               'chewc.metrics.PopulationMetrics': ('metrics.html#populationmetrics', 'chewc/metrics.py'),
+                               'chewc.metrics.PopulationMetrics.__getitem__': ( 'metrics.html#populationmetrics.__getitem__',
+                                                                                'chewc/metrics.py'),
+                               'chewc.metrics.PopulationMetrics.__init__': ('metrics.html#populationmetrics.__init__', 'chewc/metrics.py'),
+                               'chewc.metrics.PopulationMetrics.summary': ('metrics.html#populationmetrics.summary', 'chewc/metrics.py'),
+                               'chewc.metrics._allele_frequencies': ('metrics.html#_allele_frequencies', 'chewc/metrics.py'),
+                               'chewc.metrics._effective_population_size': ('metrics.html#_effective_population_size', 'chewc/metrics.py'),
+                               'chewc.metrics._expected_heterozygosity': ('metrics.html#_expected_heterozygosity', 'chewc/metrics.py'),
+                               'chewc.metrics._fst': ('metrics.html#_fst', 'chewc/metrics.py'),
+                               'chewc.metrics._genotype_frequencies': ('metrics.html#_genotype_frequencies', 'chewc/metrics.py'),
+                               'chewc.metrics._heterozygosity': ('metrics.html#_heterozygosity', 'chewc/metrics.py'),
+                               'chewc.metrics._heterozygous': ('metrics.html#_heterozygous', 'chewc/metrics.py'),
+                               'chewc.metrics._inbreeding_coefficient': ('metrics.html#_inbreeding_coefficient', 'chewc/metrics.py'),
+                               'chewc.metrics._ld_matrix': ('metrics.html#_ld_matrix', 'chewc/metrics.py'),
+                               'chewc.metrics._maf': ('metrics.html#_maf', 'chewc/metrics.py'),
+                               'chewc.metrics.available_metrics': ('metrics.html#available_metrics', 'chewc/metrics.py'),
+                               'chewc.metrics.register_metric': ('metrics.html#register_metric', 'chewc/metrics.py')},
+            'chewc.pedigree': { 'chewc.pedigree.Pedigree': ('pedigree.html#pedigree', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.__init__': ('pedigree.html#pedigree.__init__', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.__len__': ('pedigree.html#pedigree.__len__', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree._add_cohort': ('pedigree.html#pedigree._add_cohort', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree._mendelian_variances': ( 'pedigree.html#pedigree._mendelian_variances',
+                                                                                  'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree._relationships_among': ( 'pedigree.html#pedigree._relationships_among',
+                                                                                  'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.a_inverse': ('pedigree.html#pedigree.a_inverse', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.add': ('pedigree.html#pedigree.add', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.add_founders': ('pedigree.html#pedigree.add_founders', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.fathers': ('pedigree.html#pedigree.fathers', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.inbreeding': ('pedigree.html#pedigree.inbreeding', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.last_cohort': ('pedigree.html#pedigree.last_cohort', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.levels': ('pedigree.html#pedigree.levels', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.mothers': ('pedigree.html#pedigree.mothers', 'chewc/pedigree.py'),
+                                'chewc.pedigree.Pedigree.relationships': ('pedigree.html#pedigree.relationships', 'chewc/pedigree.py')},
+            'chewc.segments': { 'chewc.segments.SegmentInheritance': ('segments.html#segmentinheritance', 'chewc/segments.py'),
+                                'chewc.segments.SegmentInheritance.__init__': ( 'segments.html#segmentinheritance.__init__',
+                                                                                'chewc/segments.py'),
+                                'chewc.segments.SegmentInheritance._ordered_pairing': ( 'segments.html#segmentinheritance._ordered_pairing',
+                                                                                        'chewc/segments.py'),
+                                'chewc.segments.SegmentInheritance.cross': ('segments.html#segmentinheritance.cross', 'chewc/segments.py'),
+                                'chewc.segments.SegmentInheritance.gamete_values': ( 'segments.html#segmentinheritance.gamete_values',
+                                                                                     'chewc/segments.py')},
+            'chewc.store': { 'chewc.store.PopulationStore': ('store.html#populationstore', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.__init__': ('store.html#populationstore.__init__', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.__len__': ('store.html#populationstore.__len__', 'chewc/store.py'),
+                             'chewc.store.PopulationStore._chunk': ('store.html#populationstore._chunk', 'chewc/store.py'),
+                             'chewc.store.PopulationStore._gather': ('store.html#populationstore._gather', 'chewc/store.py'),
+                             'chewc.store.PopulationStore._write_meta': ('store.html#populationstore._write_meta', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.allele_counts': ('store.html#populationstore.allele_counts', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.append': ('store.html#populationstore.append', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.batches': ('store.html#populationstore.batches', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.calculate_allele_frequencies': ( 'store.html#populationstore.calculate_allele_frequencies',
+                                                                                           'chewc/store.py'),
+                             'chewc.store.PopulationStore.calculate_breeding_values': ( 'store.html#populationstore.calculate_breeding_values',
+                                                                                        'chewc/store.py'),
+                             'chewc.store.PopulationStore.cross': ('store.html#populationstore.cross', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.get_ids': ('store.html#populationstore.get_ids', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.get_packed': ('store.html#populationstore.get_packed', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.get_parents': ('store.html#populationstore.get_parents', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.population': ('store.html#populationstore.population', 'chewc/store.py'),
+                             'chewc.store.PopulationStore.size': ('store.html#populationstore.size', 'chewc/store.py')},
+            'chewc.sweep': { 'chewc.sweep._init_worker': ('sweep.html#_init_worker', 'chewc/sweep.py'),
+                             'chewc.sweep._run_scenario': ('sweep.html#_run_scenario', 'chewc/sweep.py'),
+                             'chewc.sweep.run_sweep': ('sweep.html#run_sweep', 'chewc/sweep.py'),
+                             'chewc.sweep.sweep_grid': ('sweep.html#sweep_grid', 'chewc/sweep.py')},
+            'chewc.trait': { 'chewc.trait.NonAdditiveTraitModule': ('trait.html#nonadditivetraitmodule', 'chewc/trait.py'),
+                             'chewc.trait.NonAdditiveTraitModule.__init__': ( 'trait.html#nonadditivetraitmodule.__init__',
+                                                                              'chewc/trait.py'),
+                             'chewc.trait.NonAdditiveTraitModule._calibrate_components': ( 'trait.html#nonadditivetraitmodule._calibrate_components',
+                                                                                           'chewc/trait.py'),
+                             'chewc.trait.NonAdditiveTraitModule.calculate_genetic_values': ( 'trait.html#nonadditivetraitmodule.calculate_genetic_values',
+                                                                                              'chewc/trait.py'),
+                             'chewc.trait.NonAdditiveTraitModule.genetic_components': ( 'trait.html#nonadditivetraitmodule.genetic_components',
+                                                                                        'chewc/trait.py'),
+                             'chewc.trait.TraitModule': ('trait.html#traitmodule', 'chewc/trait.py'),
                              'chewc.trait.TraitModule.__init__': ('trait.html#traitmodule.__init__', 'chewc/trait.py'),
                              'chewc.trait.TraitModule._calculate_intercepts': ( 'trait.html#traitmodule._calculate_intercepts',
                                                                                 'chewc/trait.py'),
                              'chewc.trait.TraitModule._initialize_correlated_effects': ( 'trait.html#traitmodule._initialize_correlated_effects',
                                                                                          'chewc/trait.py'),
+                             'chewc.trait.TraitModule._qtl_dosages': ('trait.html#traitmodule._qtl_dosages', 'chewc/trait.py'),
                              'chewc.trait.TraitModule.calculate_breeding_values': ( 'trait.html#traitmodule.calculate_breeding_values',
                                                                                     'chewc/trait.py'),
+                             'chewc.trait.TraitModule.calculate_genetic_values': ( 'trait.html#traitmodule.calculate_genetic_values',
+                                                                                   'chewc/trait.py'),
+                             'chewc.trait.TraitModule.calibrate_error_variance': ( 'trait.html#traitmodule.calibrate_error_variance',
+                                                                                   'chewc/trait.py'),
+                             'chewc.trait.TraitModule.dense_effects': ('trait.html#traitmodule.dense_effects', 'chewc/trait.py'),
                              'chewc.trait.TraitModule.forward': ('trait.html#traitmodule.forward', 'chewc/trait.py'),
+                             'chewc.trait.TraitModule.genetic_values': ('trait.html#traitmodule.genetic_values', 'chewc/trait.py'),
+                             'chewc.trait.TraitModule.sample_environments': ( 'trait.html#traitmodule.sample_environments',
+                                                                              'chewc/trait.py'),
+                             'chewc.trait.TraitModule.set_gxe_variance': ('trait.html#traitmodule.set_gxe_variance', 'chewc/trait.py'),
+                             'chewc.trait.TraitModule.trial': ('trait.html#traitmodule.trial', 'chewc/trait.py'),
                              'chewc.trait.select_qtl_loci': ('trait.html#select_qtl_loci', 'chewc/trait.py')}}}
@@ -2,10 +2,11 @@
 
 # %% auto 0
 __all__ = ['device', 'input_length', 'pop_size', 'dummy_geno_data', 'num_meta_features', 'Genome', 'Population', 'Trait',
-           'calculate_breeding_value', 'truncation_selection', 'recombine', 'phenotype', 'create_random_pop',
-           'update_pop', 'breed', 'create_pop', 'bv', 'create_progeny', 'run_generation', 'population_statistics',
-           'BreedingSimulation', 'GeneticFeatureExtractor', 'MetaDataProcessor', 'CompleteNetwork', 'create_dummy_data',
-           'prep']
+           'NonAdditiveTrait', 'calculate_breeding_value', 'genetic_components', 'genetic_value',
+           'truncation_selection', 'select_individuals', 'recombine', 'phenotype', 'create_random_pop', 'count_alleles',
+           'allele_frequencies', 'update_pop', 'breed', 'create_pop', 'bv', 'create_progeny', 'run_generation',
+           'population_statistics', 'BreedingSimulation', 'GeneticFeatureExtractor', 'MetaDataProcessor',
+           'CompleteNetwork', 'create_dummy_data', 'prep']
 
 # %% ../nbs/chewc2.ipynb 1
 import torch
@@ -15,24 +16,38 @@ import uuid
 import pdb
 import torch
 from matplotlib.animation import FuncAnimation
+from .pedigree import Pedigree
+from .metrics import MetricsTracker, PopulationMetrics
+from .history import HistoryLog
+from .core import bivalent_homologs
 
 device='cpu'
 
 class Genome:
-    def __init__(self, n_chr, n_loci):
-        self.ploidy = 2
+    def __init__(self, n_chr, n_loci, ploidy=2):
+        self.ploidy = ploidy
         self.n_chr = n_chr
         self.n_loci = n_loci
         self.shape = (self.ploidy, self.n_chr, self.n_loci)
         
 class Population:
-    def __init__(self, genome, haplotypes, device=device):
+    # every population records its individuals in a pedigree: a new one unless a Pedigree is passed, none for
+    # pedigree=False. Without ids the individuals are added as founders
+    def __init__(self, genome, haplotypes, device=device, pedigree=None, ids=None):
         self.genome = genome
         self.device = device
         self.phenotypes = None
         self.haplotypes = haplotypes
-        self.dosages = haplotypes.sum(dim=1).float()
-        self.size = haplotypes.shape[0]
+        self.dosages = haplotypes.sum(dim=-3).float()
+        self.size = haplotypes.shape[-4]
+        count_alleles(self)
+        # optional leading replicate axis: (n_replicates, size, ploidy, n_chr, n_loci)
+        self.n_replicates = haplotypes.shape[0] if haplotypes.dim() == 5 else None
+        # pedigree ids of the individuals (same leading dims as the phenotypes), None when no pedigree is kept
+        self.pedigree = Pedigree() if pedigree is None else (None if pedigree is False else pedigree)
+        if self.pedigree is not None and ids is None:
+            ids = self.pedigree.add_founders(haplotypes.shape[:-3])
+        self.ids = ids
                 
 class Trait:
     def __init__(self, genome, founder_population, target_mean, target_variance, device=device):
@@ -41,7 +56,7 @@ class Trait:
         self.device = device
         random_effects = torch.randn(genome.n_chr, genome.n_loci, device=self.device)
         random_effects -= random_effects.mean()
-        founder_scores = torch.einsum('kl,hkl->h', random_effects, founder_population.dosages)
+        founder_scores = torch.einsum('kl,...kl->...', random_effects, founder_population.dosages)
         founder_mean, founder_var = founder_scores.mean(), founder_scores.var()
         scaling_factors = torch.sqrt(self.target_variance / founder_var)
         self.scaling_factors = scaling_factors
@@ -50,11 +65,61 @@ class Trait:
         self.intercept = founder_mean - target_mean
 
         
-def calculate_breeding_value(population_dosages, trait_effects, device = device):
-    return torch.einsum('hjk,jk->h', population_dosages,trait_effects)
+class NonAdditiveTrait(Trait):
+    # additive effects plus dominance effects on heterozygous loci and epistatic effects on a sparse list of
+    # locus pairs (flat indices into n_chr * n_loci); each part gets its share of the founder variance.
+    # dominance effects are dominance degrees times the additive effect sizes, so a positive mean degree gives heterosis
+    def __init__(self, genome, founder_population, target_mean, target_variance, variance_proportions=(0.6, 0.3, 0.1),
+                 n_epistatic_pairs=100, dominance_degree=0., device=device):
+        super().__init__(genome, founder_population, target_mean, target_variance, device)
+        self.ploidy = genome.ploidy
+        n_markers = genome.n_chr * genome.n_loci
+        self.dominance_effects = (dominance_degree + torch.randn(genome.n_chr, genome.n_loci, device=self.device)) * self.effects.abs()
+        first = torch.randint(0, n_markers, (n_epistatic_pairs,), device=self.device)
+        second = (first + torch.randint(1, n_markers, (n_epistatic_pairs,), device=self.device)) % n_markers
+        self.epistatic_pairs = torch.stack([first, second], dim=1)
+        self.epistatic_effects = torch.randn(n_epistatic_pairs, device=self.device)
+        # scale every part to its share, then all parts jointly to the target variance (the parts covary)
+        components = genetic_components(founder_population.dosages, self)
+        scaling_factors = [torch.sqrt(proportion * self.target_variance / values.var()).nan_to_num(0.)
+                           for proportion, values in zip(variance_proportions, components)]
+        founder_scores = sum(values * scaling for values, scaling in zip(components, scaling_factors))
+        joint = torch.sqrt(self.target_variance / founder_scores.var())
+        self.effects = self.effects * scaling_factors[0] * joint
+        self.dominance_effects = self.dominance_effects * scaling_factors[1] * joint
+        self.epistatic_effects = self.epistatic_effects * scaling_factors[2] * joint
+        self.intercept = founder_scores.mean() * joint - target_mean
 
-def truncation_selection(population, trait, top_percent):
-    return torch.topk(population.phenotypes, top_percent).indices
+        
+def calculate_breeding_value(population_dosages, trait_effects, device = device):
+    return torch.einsum('...jk,jk->...', population_dosages,trait_effects)
+
+def genetic_components(population_dosages, trait):
+    # additive, dominance and epistatic values of a NonAdditiveTrait, each (...,);
+    # the epistatic pairs are gathered and multiplied, so the cost is O(n_epistatic_pairs) per individual
+    additive = calculate_breeding_value(population_dosages, trait.effects)
+    heterozygous = ((population_dosages > 0) & (population_dosages < trait.ploidy)).float()
+    dominance = calculate_breeding_value(heterozygous, trait.dominance_effects)
+    centered = population_dosages.flatten(-2) - trait.ploidy / 2
+    interactions = centered[..., trait.epistatic_pairs[:, 0]] * centered[..., trait.epistatic_pairs[:, 1]]
+    return additive, dominance, interactions @ trait.epistatic_effects
+
+def genetic_value(population, trait):
+    # the breeding value of additive traits; the sum of all parts for a NonAdditiveTrait
+    if isinstance(trait, NonAdditiveTrait):
+        return sum(genetic_components(population.dosages, trait))
+    return calculate_breeding_value(population.dosages, trait.effects)
+
+def truncation_selection(population, trait, top_percent, scores=None):
+    # indices are per replicate when phenotypes carry a leading replicate axis;
+    # scores (e.g. GEBVs from chewc.gebv.GenomicPredictor) rank the candidates instead of the phenotypes
+    scores = population.phenotypes if scores is None else scores
+    return torch.topk(scores, top_percent, dim=-1).indices
+
+def select_individuals(tensor, indices, n_trailing=3):
+    # gather individuals along the axis before the last `n_trailing` dims, separately for every replicate
+    indices = indices.view(*indices.shape, *([1] * n_trailing))
+    return torch.take_along_dim(tensor, indices, dim=-1 - n_trailing)
 
 # meiosis
 def recombine(parent_haplo_tensor, recombination_rate=0.1):
@@ -67,101 +132,141 @@ def recombine(parent_haplo_tensor, recombination_rate=0.1):
     return progeny
 
 
-def phenotype(population, trait, h2):
-    breeding_values = calculate_breeding_value(population.dosages, trait.effects) 
-    
-    if breeding_values.var() == 0:
-        print('phenotype: no var')
-        environmental_variance = 0  
-    else:
-        environmental_variance = (1 - h2) / h2 * breeding_values.var() 
+def phenotype(population, trait, h2, generator=None):
+    breeding_values = genetic_value(population, trait)
     
-    # Check if environmental_variance is zero before applying torch.sqrt and .clone()
-    if environmental_variance == 0:
-        environmental_noise = torch.zeros(breeding_values.shape, device=device)
-    else:
-        environmental_noise = torch.randn(breeding_values.shape, device=device) * torch.sqrt(environmental_variance).detach()
+    # genetic variance per replicate; a replicate without variance gets no noise (and no host sync)
+    environmental_variance = (1 - h2) / h2 * breeding_values.var(dim=-1, keepdim=True)
+    environmental_noise = torch.randn(breeding_values.shape, device=device, generator=generator) * torch.sqrt(environmental_variance).detach()
     
     population.phenotypes = breeding_values + environmental_noise
 #     def _create_random_haplotypes(self,num_individuals):
 #         return torch.randint(0, 2, (num_individuals, *self.g.shape), device=self.device)
-def create_random_pop(G, pop_size):
-    return torch.randint(0, 2, (pop_size, *G.shape), device= device)
+def create_random_pop(G, pop_size, n_replicates=None, generator=None):
+    shape = (pop_size, *G.shape) if n_replicates is None else (n_replicates, pop_size, *G.shape)
+    return torch.randint(0, 2, shape, device= device, generator=generator)
+
+def count_alleles(population):
+    # running accumulators taken from the dosages of the new generation, so frequency queries are O(loci):
+    # allele counts per locus (..., n_chr, n_loci) and heterozygosity per individual (..., size)
+    population.allele_counts = population.dosages.sum(dim=-3)
+    dosages = population.dosages
+    population.heterozygosity = ((dosages > 0) & (dosages < population.genome.ploidy)).float().mean(dim=(-2, -1))
+    return population
+
+def allele_frequencies(population):
+    return population.allele_counts / (population.genome.ploidy * population.size)
 
-def update_pop(population, haplotype_pop_tensor):
+def update_pop(population, haplotype_pop_tensor, ids=None):
+    # ids: pedigree ids of the new individuals
     population.haplotypes = haplotype_pop_tensor
-    population.dosages = haplotype_pop_tensor.sum(dim=1).float()
+    population.ids = ids
+    population.dosages = haplotype_pop_tensor.sum(dim=-3).float()
+    population.size = haplotype_pop_tensor.shape[-4]
+    count_alleles(population)
     return population
 
 # meiosis
-def recombine(parent_haplo_tensor, recombination_rate=0.1):
-    num_individuals, ploidy, num_chromosomes, num_loci = parent_haplo_tensor.shape
-    # Generate crossover masks
-    maternal, paternal = parent_haplo_tensor[:,0,:,:],parent_haplo_tensor[:,1,:,:],
-    crossovers = torch.bernoulli(torch.full((num_individuals, num_chromosomes, num_loci), recombination_rate, device=device))
+def recombine(parent_haplo_tensor, recombination_rate=0.1, generator=None):
+    # Generate crossover masks; leading dims (individuals, optionally replicates) are batched.
+    # Polyploid parents (..., ploidy, n_chr, n_loci) pair their homologs into random bivalents per chromosome
+    # and give gametes of ploidy // 2 homologs (..., ploidy // 2, n_chr, n_loci), in one gather
+    ploidy = parent_haplo_tensor.shape[-3]
+    if ploidy > 2:
+        *batch_shape, _, n_chr, n_loci = parent_haplo_tensor.shape
+        pairing = torch.rand(*batch_shape, n_chr, ploidy, device=parent_haplo_tensor.device, generator=generator).argsort(dim=-1)
+        crossovers = torch.rand(*batch_shape, ploidy // 2, n_chr, n_loci, device=parent_haplo_tensor.device,
+                                generator=generator) < recombination_rate
+        return torch.gather(parent_haplo_tensor, -3, bivalent_homologs(pairing, crossovers))
+    maternal, paternal = parent_haplo_tensor[...,0,:,:],parent_haplo_tensor[...,1,:,:],
+    crossovers = torch.bernoulli(torch.full(maternal.shape, recombination_rate, device=device), generator=generator)
 #     crossovers = torch.rand((num_individuals, num_chromosomes, num_loci), device=device) < recombination_rate
     progeny = maternal * torch.logical_not(crossovers) + paternal * crossovers
     return progeny
 
-def breed(mother_tensor, father_tensor, recombination_rate=0.1):
+def breed(mother_tensor, father_tensor, recombination_rate=0.1, pedigree=None, mother_ids=None, father_ids=None):
     eggs = recombine(mother_tensor,recombination_rate)
     pollens = recombine(father_tensor,recombination_rate)
-    return torch.stack((eggs,pollens), dim=1)
+    # diploid gametes are single haplotypes, polyploid gametes carry ploidy // 2 of them
+    progeny = torch.stack((eggs,pollens), dim=-3) if eggs.dim() < mother_tensor.dim() else torch.cat((eggs,pollens), dim=-3)
+    if pedigree is None:
+        return progeny
+    # record the progeny and return their pedigree ids as well
+    return progeny, pedigree.add(mother_ids, father_ids)
 
-def create_pop(G, haplotypes):
-    return Population(G, haplotypes=haplotypes)
+def create_pop(G, haplotypes, pedigree=None, ids=None):
+    return Population(G, haplotypes=haplotypes, pedigree=pedigree, ids=ids)
 
 def bv(P,T):
-    P.breeding_values = calculate_breeding_value(P.dosages,T.effects)
+    P.breeding_values = genetic_value(P, T)
     
-def create_progeny(mother_gametes, father_gametes,reps = 1):
-    progeny = []
-    for _ in range(reps):
-        # Randomly shuffle the gametes from each parent 
-        shuffled_mother_indices = torch.randperm(mother_gametes.shape[0])
-        shuffled_father_indices = torch.randperm(father_gametes.shape[0])
-
-        # Select the shuffled gametes
-        mother_gametes = mother_gametes[shuffled_mother_indices]
-        father_gametes = father_gametes[shuffled_father_indices]
-
-        # Stack the gametes to create progeny haplotypes
-        progeny_haplotypes = torch.stack((mother_gametes, father_gametes),dim=1)
-        progeny.append(progeny_haplotypes)
-    return torch.vstack(progeny)
-
-# Function to run one generation
-def run_generation(P, T, h2, reps, pop_size, selection_fraction):
+def create_progeny(mother_gametes, father_gametes,reps = 1, pedigree=None, mother_ids=None, father_ids=None, ploidy=2,
+                   generator=None):
+    # every rep pairs an independent random permutation of the mother gametes with one of the father gametes;
+    # all permutations are drawn at once as (..., reps, n) and gathered in a single pass.
+    # diploid gametes are single haplotypes (..., n, n_chr, n_loci), polyploid gametes carry ploidy // 2 homologs
+    # (..., n, ploidy // 2, n_chr, n_loci) that are concatenated on the homolog axis
+    n_trailing = 2 if ploidy == 2 else 3
+    batch_shape, n = mother_gametes.shape[:-1 - n_trailing], mother_gametes.shape[-1 - n_trailing]
+    shuffled_mother_indices = torch.rand(*batch_shape, reps, n, device=mother_gametes.device,
+                                         generator=generator).argsort(dim=-1).flatten(-2)
+    shuffled_father_indices = torch.rand(*batch_shape, reps, n, device=father_gametes.device,
+                                         generator=generator).argsort(dim=-1).flatten(-2)
+
+    # Stack the gametes to create progeny haplotypes
+    gametes = (select_individuals(mother_gametes, shuffled_mother_indices, n_trailing=n_trailing),
+               select_individuals(father_gametes, shuffled_father_indices, n_trailing=n_trailing))
+    progeny = torch.stack(gametes, dim=-3) if ploidy == 2 else torch.cat(gametes, dim=-3)
+    if pedigree is None:
+        return progeny
+    # parent ids follow their gametes through the shuffle; all progeny are recorded as one cohort
+    progeny_ids = pedigree.add(select_individuals(mother_ids, shuffled_mother_indices, n_trailing=0),
+                               select_individuals(father_ids, shuffled_father_indices, n_trailing=0))
+    return progeny, progeny_ids
+
+# Function to run one generation; the progeny are recorded in the pedigree of P unless another one is given
+def run_generation(P, T, h2, reps, pop_size, selection_fraction, pedigree=None):
+    pedigree = P.pedigree if pedigree is None else pedigree
     bv(P, T)  # Calculate breeding values
     phenotype(P, T, h2)  # Calculate phenotypes with given h2
-    selected = P.haplotypes[torch.topk(P.phenotypes, int(pop_size * selection_fraction)).indices]  # Select top individuals based on phenotype
+    top = torch.topk(P.phenotypes, int(pop_size * selection_fraction)).indices
+    selected = select_individuals(P.haplotypes, top)  # Select top individuals based on phenotype
     m = recombine(selected)  # Mother gametes
     f = recombine(selected)  # Father gametes
-    progeny = create_progeny(m, f, reps=reps)  # Create progeny
-    new_population = Population(G, progeny)
+    if pedigree is None:
+        progeny = create_progeny(m, f, reps=reps, ploidy=P.genome.ploidy)  # Create progeny
+        new_population = Population(P.genome, progeny, pedigree=False)
+    else:
+        # P.ids holds the pedigree ids of the current generation
+        selected_ids = select_individuals(P.ids, top, n_trailing=0)
+        progeny, progeny_ids = create_progeny(m, f, reps, pedigree, selected_ids, selected_ids, ploidy=P.genome.ploidy)
+        new_population = Population(P.genome, progeny, pedigree=pedigree, ids=progeny_ids)
     bv(new_population, T)  # Calculate breeding values for progeny
     phenotype(new_population, T, h2)  # Calculate phenotypes for progeny
     return new_population
 
 # %% ../nbs/chewc2.ipynb 4
 def population_statistics(population_tensor):
+    # population_tensor: (n_individuals, n_markers) dosages, or (n_replicates, n_individuals, n_markers)
+    # in which case every statistic is returned per replicate
 
     
     #Calculate the mean genotype value divided by 2 for each marker.
     def calculate_allele_frequencies(genotypes):
-        num_individuals = genotypes.size(0)
-        allele_frequencies = torch.mean(genotypes, dim=0) / 2.
+        allele_frequencies = torch.mean(genotypes, dim=-2) / 2.
         return allele_frequencies
     #Calculate the unique genotype counts and their frequencies.
     def calculate_genotype_frequencies(genotypes):
+        if genotypes.dim() == 3:  # unique rows are ragged across replicates
+            return [calculate_genotype_frequencies(replicate) for replicate in genotypes]
         num_individuals = genotypes.size(0)
         unique_genotypes, counts = torch.unique(genotypes, dim=0, return_counts=True)
         genotype_frequencies = counts.float() / num_individuals
         return unique_genotypes, genotype_frequencies
     #Calculate the proportion of heterozygous individuals at each marker.
     def calculate_heterozygosity(genotypes):
-        num_individuals = genotypes.size(0)
-        heterozygosity = torch.sum(genotypes == 1, dim=0).float() / num_individuals
+        num_individuals = genotypes.size(-2)
+        heterozygosity = torch.sum(genotypes == 1, dim=-2).float() / num_individuals
         return heterozygosity
     #Calculate the frequency of the less common allele.
     def calculate_maf(genotypes):
@@ -170,30 +275,32 @@ def population_statistics(population_tensor):
         return maf
     #Measure the degree of inbreeding based on observed and expected heterozygosity.
     def calculate_inbreeding_coefficient(genotypes):
-        num_markers = genotypes.size(1)
-        observed_heterozygosity = torch.sum(genotypes == 1, dim=1).float() / num_markers
+        num_markers = genotypes.size(-1)
+        observed_heterozygosity = torch.sum(genotypes == 1, dim=-1).float() / num_markers
         expected_heterozygosity = 2 * calculate_allele_frequencies(genotypes) * (1 - calculate_allele_frequencies(genotypes))
-        average_expected_heterozygosity = torch.mean(expected_heterozygosity)
+        average_expected_heterozygosity = torch.mean(expected_heterozygosity, dim=-1, keepdim=True)
         inbreeding_coefficient = 1 - (observed_heterozygosity / average_expected_heterozygosity)
         return inbreeding_coefficient
     #Calculate the correlation matrix for the genotypes.
     def calculate_ld(genotypes):
-        num_markers = genotypes.size(1)
-        ld_matrix = torch.corrcoef(genotypes.T)
+        centered = genotypes - genotypes.mean(dim=-2, keepdim=True)
+        covariance = centered.transpose(-1, -2) @ centered
+        std = torch.sqrt(torch.diagonal(covariance, dim1=-2, dim2=-1))
+        ld_matrix = covariance / (std.unsqueeze(-1) * std.unsqueeze(-2))
         return ld_matrix
     #Measure the genetic differentiation between subpopulations.
     def calculate_fst(genotypes, subpopulations):
         total_allele_frequencies = calculate_allele_frequencies(genotypes)
-        subpop_allele_frequencies = [calculate_allele_frequencies(genotypes[subpop]) for subpop in subpopulations]
+        subpop_allele_frequencies = [calculate_allele_frequencies(genotypes[..., subpop, :]) for subpop in subpopulations]
         ht = 2 * total_allele_frequencies * (1 - total_allele_frequencies)
         hs = torch.mean(torch.stack([2 * freq * (1 - freq) for freq in subpop_allele_frequencies]), dim=0)
         fst = (ht - hs) / ht
         return fst
     #Estimate the effective population size based on allele frequencies and genetic drift.
     def calculate_effective_population_size(genotypes):
-        num_individuals = genotypes.size(0)
+        num_individuals = genotypes.size(-2)
         allele_frequencies = calculate_allele_frequencies(genotypes)
-        variance = torch.var(allele_frequencies)
+        variance = torch.var(allele_frequencies, dim=-1)
         ne = (num_individuals - 1) / (2 * variance)
         return ne
 
@@ -209,31 +316,54 @@ def population_statistics(population_tensor):
     }
     return stats
 
-# %% ../nbs/chewc2.ipynb 7
+# %% ../nbs/chewc2.ipynb 6
 class BreedingSimulation:
-    def __init__(self, G, T, h2, reps, pop_size, selection_fraction):
+    # n_replicates runs that many independent programs in lock-step along a leading replicate axis
+    # pedigree (a chewc.pedigree.Pedigree, or True for a new one) records the founders and every generation of
+    # progeny; none is kept by default, as a pedigree grows with every generation of a long run
+    # predictor (chewc.gebv) selects on GEBVs predicted from the phenotypes of earlier generations only: a
+    # GenomicPredictor is trained on the previous generation, an IncrementalGenomicPredictor on all of them.
+    # Without a trained model (the founders) selection is on phenotypes
+    # metrics (a chewc.metrics.MetricsTracker or its schedule) selects the statistics tracked per generation
+    # history (a chewc.history.HistoryLog, e.g. one writing to disk) receives them; defaults to an in-memory log
+    # generator (a torch.Generator) draws all randomness of the run instead of torch's global RNG
+    def __init__(self, G, T, h2, reps, pop_size, selection_fraction, n_replicates=None, pedigree=None, predictor=None,
+                 metrics=None, history=None, generator=None):
         self.G = G
         self.T = T
         self.h2 = h2
         self.reps = reps
         self.pop_size = pop_size
         self.selection_fraction = selection_fraction
-        self.population = create_pop(G, create_random_pop(G, pop_size)) # Start with a random population
-        self.history = []  # For tracking population data over generations
+        self.n_replicates = n_replicates
+        self.generator = generator
+        # Start with a random population
+        pedigree = Pedigree() if pedigree is True else (False if pedigree is None else pedigree)
+        self.population = create_pop(G, create_random_pop(G, pop_size, n_replicates, generator), pedigree)
+        self.predictor = predictor
+        self.metrics = metrics if isinstance(metrics, MetricsTracker) else MetricsTracker(metrics)
+        # For tracking population data over generations; the log buffers on the population's device
+        self.history = HistoryLog(device=self.population.haplotypes.device) if history is None else history
+        self.last_record = None  # the statistics of the latest generation, as recorded in the history
 
     def step(self, actions): # Actions will be provided by the RL agent
         selected_parent_indices = self.select_parents(actions)
-        selected = self.population.haplotypes[selected_parent_indices]
+        selected = select_individuals(self.population.haplotypes, selected_parent_indices)
         
         #breeding
-        m = recombine(selected)  # Mother gametes
-        f = recombine(selected)  # Father gametes
-        progeny = create_progeny(m, f, reps=self.reps)  # Create progeny
+        m = recombine(selected, generator=self.generator)  # Mother gametes
+        f = recombine(selected, generator=self.generator)  # Father gametes
+        if self.pedigree is None:
+            progeny = create_progeny(m, f, reps=self.reps, ploidy=self.G.ploidy, generator=self.generator)  # Create progeny
+        else:
+            selected_ids = select_individuals(self.population.ids, selected_parent_indices, n_trailing=0)
+            progeny, progeny_ids = create_progeny(m, f, self.reps, self.pedigree, selected_ids, selected_ids,
+                                                  ploidy=self.G.ploidy, generator=self.generator)
 
         #phenotype
-        self.population = update_pop(self.population, progeny)
+        self.population = update_pop(self.population, progeny, None if self.pedigree is None else progeny_ids)
         bv(self.population, self.T)
-        phenotype(self.population, self.T, self.h2)
+        phenotype(self.population, self.T, self.h2, self.generator)
 
         # Calculate reward (e.g., genetic gain)
         reward = self.calculate_reward()
@@ -243,16 +373,28 @@ class BreedingSimulation:
 
         return self.get_state(), reward
 
+    @property
+    def pedigree(self):
+        # the pedigree of the current population, None when none is kept
+        return self.population.pedigree
+
     def select_parents(self, actions):
         #the output from agent network will go into here.
-        phenotype(self.population, self.T, self.h2)
-        parents = torch.topk(self.population.phenotypes, actions).indices
+        phenotype(self.population, self.T, self.h2, self.generator)
+        scores = None
+        if self.predictor is not None:
+            markers = self.population.dosages.flatten(-2)
+            if self.predictor.effects is not None:
+                scores = self.predictor.predict(markers)
+            # the candidates' phenotypes only train the model for the next generation's candidates
+            self.predictor.update(markers, self.population.phenotypes)
+        parents = truncation_selection(self.population, self.T, actions, scores)
         return parents
 
     def calculate_reward(self):
         # Define how to calculate the reward based on your objective. 
-        # Example: Improvement in average trait value
-        return self.population.phenotypes.mean()
+        # Example: Improvement in average trait value (per replicate)
+        return self.population.phenotypes.mean(dim=-1)
 
     def get_state(self):
         # Define how to represent the state of the environment to the 
@@ -260,38 +402,40 @@ class BreedingSimulation:
         # - Average trait value: self.population.phenotypes.mean()
         # - Genetic diversity metrics
         # - ...
-        return self.population.phenotypes.mean() # Placeholder
+        return self.population.phenotypes.mean(dim=-1) # Placeholder
 
     def track_data(self, actions, reward):
-        n_ind, n_chr, n_loci = self.population.haplotypes.sum(dim=1).shape
-        pop_stat_in  = self.population.haplotypes.sum(dim=1).view((n_ind, n_chr* n_loci))
-        pop_stat = population_statistics(pop_stat_in)
-#         population_statistics(pop_stat_in.float())['allele_frequencies'].mean()
-#         import pdb;pdb.set_trace()
-        gen_data = {
-            'generation': len(self.history),
-            'avg_phenotype': self.population.phenotypes.mean().item(),
-            'phenotype_variance': self.population.phenotypes.var().item(),
-            'avg_breeding_value': self.population.breeding_values.mean().item(),
-            'actions': actions,  # You might want to log the actions taken
-            'reward': reward.item(),
-            'n_ind': n_ind,
-            'heterozygosity': pop_stat['heterozygosity'].mean().item(),
-            'allele_frequencies': pop_stat['allele_frequencies'].mean().item(),
-            'maf': pop_stat['maf'].mean().item(),
-            'inbreeding_coefficient': pop_stat['inbreeding_coefficient'].mean().item(),
-            'effective_population_size': pop_stat['effective_population_size'].item()
-        }
-        self.history.append(gen_data)
+        # statistics are per replicate when the simulation runs replicates
+        n_ind = self.population.size
+        pop_stat_in  = self.population.dosages.flatten(-2)
+        pop_stat = self.metrics.compute(pop_stat_in, generation=len(self.history), ploidy=self.G.ploidy,
+                                        allele_counts=self.population.allele_counts.flatten(-2))
+        # tensors stay on the device; the log moves them to the host in batches
+        self.last_record = dict(
+            generation=len(self.history),
+            avg_phenotype=self.population.phenotypes.mean(dim=-1),
+            phenotype_variance=self.population.phenotypes.var(dim=-1),
+            avg_breeding_value=self.population.breeding_values.mean(dim=-1),
+            actions=actions,  # You might want to log the actions taken
+            reward=reward,
+            n_ind=n_ind,
+            **pop_stat)
+        self.history.record(**self.last_record)
+
+    def population_metrics(self):
+        # on-demand statistics of the current generation, e.g. sim.population_metrics()['ld_matrix']
+        return PopulationMetrics(self.population.dosages.flatten(-2), self.G.ploidy,
+                                 allele_counts=self.population.allele_counts.flatten(-2))
 
     def plot_history(self):
         def normalize(data):
-            min_val = min(data)
-            max_val = max(data)
-            return [(x - min_val) / (max_val - min_val) for x in data]
-        generations = [d['generation'] for d in self.history]
-        avg_phenotypes = [d['avg_phenotype'] for d in self.history]
-        actions = [d['maf'] for d in self.history]
+            # replicated runs give one line per replicate
+            min_val = data.min()
+            max_val = data.max()
+            return (data - min_val) / (max_val - min_val)
+        generations = self.history['generation']
+        avg_phenotypes = self.history['avg_phenotype']
+        actions = self.history['maf']
         
         avg_phenotypes = normalize(avg_phenotypes)
         actions = normalize(actions)
@@ -302,8 +446,71 @@ class BreedingSimulation:
         plt.title('Breeding Progress')
         plt.show()
 
-
-# %% ../nbs/chewc2.ipynb 9
+# %% ../nbs/chewc2.ipynb 12
+import os
+from .core import pack_haplotypes, unpack_haplotypes
+
+# checkpoints: one torch.save archive with the haplotypes bit-packed along the loci axis, the genome, trait,
+# pedigree, predictor, metrics schedule, history, the torch RNG states and the state of the simulation's generator.
+# The archive is written next to `path`, synced and renamed over it, and the directory is synced so the rename is durable;
+# a crash never leaves a partial checkpoint. Loading maps the file (torch.load(mmap=True)) so the archive is not read up
+# front, but the haplotypes are unpacked into fresh memory: a loaded population does not share memory with the file.
+@patch
+def save(self: BreedingSimulation, path):
+    P = self.population
+    state = {
+        'config': {'h2': self.h2, 'reps': self.reps, 'pop_size': self.pop_size,
+                   'selection_fraction': self.selection_fraction, 'n_replicates': self.n_replicates},
+        'G': self.G, 'T': self.T,
+        'haplotypes': pack_haplotypes(P.haplotypes), 'haplotype_dtype': P.haplotypes.dtype,
+        'breeding_values': getattr(P, 'breeding_values', None), 'phenotypes': P.phenotypes, 'ids': P.ids,
+        'pedigree': self.pedigree, 'predictor': self.predictor, 'metrics': self.metrics, 'history': self.history,
+        'rng_state': torch.get_rng_state(),
+        'generator_state': self.generator.get_state() if self.generator is not None else None,
+        'cuda_rng_state': torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+    }
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        torch.save(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    return path
+
+# restore_rng=False lets branches of one snapshot draw different random numbers, e.g. after torch.manual_seed
+@patch(cls_method=True)
+def load(cls: BreedingSimulation, path, mmap=True, restore_rng=True):
+    state = torch.load(path, mmap=mmap, weights_only=False)
+    sim = cls.__new__(cls)
+    for name, value in state['config'].items():
+        setattr(sim, name, value)
+    sim.G, sim.T = state['G'], state['T']
+    haplotypes = unpack_haplotypes(state['haplotypes'], sim.G.n_loci, dtype=state['haplotype_dtype'])
+    sim.population = create_pop(sim.G, haplotypes, False if state['pedigree'] is None else state['pedigree'], state['ids'])
+    sim.population.breeding_values = state['breeding_values']
+    sim.population.phenotypes = state['phenotypes']
+    sim.predictor, sim.metrics = state['predictor'], state['metrics']
+    sim.history = state['history']
+    sim.last_record = None
+    sim.generator = None
+    if state.get('generator_state') is not None:
+        sim.generator = torch.Generator()
+        if restore_rng:
+            sim.generator.set_state(state['generator_state'])
+        else:  # branches are seeded from the global RNG
+            sim.generator.manual_seed(int(torch.randint(2**62, ())))
+    if restore_rng:
+        torch.set_rng_state(state['rng_state'])
+        if state['cuda_rng_state'] is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(state['cuda_rng_state'])
+    return sim
+
+# %% ../nbs/chewc2.ipynb 16
 import torch
 import torch.nn as nn
 
@@ -387,4 +594,3 @@ pop_size = 1
 dummy_geno_data = create_dummy_data(pop_size, 2, input_length)
 
 num_meta_features = 5 # float values in tensor
-
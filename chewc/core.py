@@ -1,7 +1,9 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/01_core.ipynb.
 
 # %% auto 0
-__all__ = ['Genome', 'Individual', 'Population', 'PopulationDataset', 'create_population_dataloader']
+__all__ = ['HAPLOTYPE_DTYPE', 'Genome', 'Individual', 'bivalent_homologs', 'Population', 'n_packed_words', 'pack_haplotypes',
+           'unpack_haplotypes', 'packed_select', 'packed_popcount', 'packed_dosages', 'packed_allele_frequencies',
+           'packed_heterozygosity', 'PopulationDataset', 'create_population_dataloader']
 
 # %% ../nbs/01_core.ipynb 4
 import torch
@@ -65,67 +67,266 @@ class Genome:
             self.device = device
         return self
 
+HAPLOTYPE_DTYPE = torch.int8  # compact storage for 0/1 alleles (8x smaller than the int64 torch.randint default)
+
+def _as_id(value) -> int:
+    try:
+        return -1 if value is None else int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Individual ids are integers (numeric strings are converted), got {value!r}. Map labels "
+                         "to integers first, e.g. with a dict kept next to the population.") from None
+
+def _as_id_tensor(values, n: int, device: torch.device) -> torch.Tensor:
+    """Converts optional ids (None, ints, numeric strings or a tensor) into an int64 tensor, using -1 for unknown."""
+    if values is None:
+        return torch.full((n,), -1, dtype=torch.long, device=device)
+    if isinstance(values, torch.Tensor):
+        return values.to(device=device, dtype=torch.long).reshape(n)
+    return torch.tensor([_as_id(v) for v in values], dtype=torch.long, device=device)
+
+
 class Individual:
     """
     Represents an individual in the breeding simulation.
 
+    Individuals are lightweight views into a row of a `Population`; all of their data lives in the
+    population's arrays. Constructing an `Individual` directly wraps it in a population of size one.
+
     Args:
         genome (Genome): Reference to the shared Genome object.
         haplotypes (torch.Tensor): Tensor representing the individual's haplotypes.
                                     Shape: (ploidy, n_chromosomes, n_loci_per_chromosome).
-        id (Optional[str]): Unique identifier. Defaults to None.
-        mother_id (Optional[str]): Mother's identifier. Defaults to None.
-        father_id (Optional[str]): Father's identifier. Defaults to None.
-        breeding_values (Optional[torch.Tensor]): Breeding values for traits. 
+        id (Optional[int]): Unique integer identifier. Defaults to None.
+        mother_id (Optional[int]): Mother's identifier. Defaults to None.
+        father_id (Optional[int]): Father's identifier. Defaults to None.
+        breeding_values (Optional[torch.Tensor]): Breeding values for traits.
                                                    Shape: (n_traits,). Defaults to None.
         phenotypes (Optional[torch.Tensor]): Phenotype for traits. Shape: (n_traits,). Defaults to None.
     """
 
-    def __init__(self, 
-                 genome: 'Genome', 
-                 haplotypes: torch.Tensor, 
-                 id: Optional[str] = None, 
-                 mother_id: Optional[str] = None, 
-                 father_id: Optional[str] = None, 
-                 breeding_values: Optional[torch.Tensor] = None, 
+    def __init__(self,
+                 genome: 'Genome',
+                 haplotypes: torch.Tensor,
+                 id: Optional[int] = None,
+                 mother_id: Optional[int] = None,
+                 father_id: Optional[int] = None,
+                 breeding_values: Optional[torch.Tensor] = None,
                  phenotypes: Optional[torch.Tensor] = None):
 
-        self.genome = genome
-        self.haplotypes = haplotypes.to(self.genome.device)
-        self.id = id
-        self.mother_id = mother_id
-        self.father_id = father_id
-        self.breeding_values = breeding_values
-        self.phenotypes = phenotypes
+        population = Population(genome=genome, haplotypes=haplotypes.unsqueeze(0), ids=[id],
+                                mother_ids=[mother_id], father_ids=[father_id])
+        if breeding_values is not None:
+            population.breeding_values = breeding_values.view(1, -1)
+        if phenotypes is not None:
+            population.phenotypes = phenotypes.view(1, -1)
+        self._population = population
+        self._index = 0
 
     @classmethod
-    def create_random_individual(cls, genome: 'Genome', id: Optional[str] = None) -> 'Individual':
+    def _view(cls, population: 'Population', index: int) -> 'Individual':
+        """Creates a view of row `index` of `population` without copying any data."""
+        individual = cls.__new__(cls)
+        individual._population = population
+        individual._index = index
+        return individual
+
+    @staticmethod
+    def _optional_id(ids: torch.Tensor, index: int) -> Optional[int]:
+        value = int(ids[index])
+        return None if value < 0 else value
+
+    @property
+    def genome(self) -> 'Genome':
+        return self._population.genome
+
+    @property
+    def haplotypes(self) -> torch.Tensor:
+        """Haplotypes of the individual (ploidy, n_chromosomes, n_loci_per_chromosome), a view into the population."""
+        population = self._population
+        return population._unpacked(population._storage[population._row(self._index)])
+
+    @property
+    def id(self) -> Optional[int]:
+        return self._optional_id(self._population.ids, self._index)
+
+    @property
+    def mother_id(self) -> Optional[int]:
+        return self._optional_id(self._population.mother_ids, self._index)
+
+    @property
+    def father_id(self) -> Optional[int]:
+        return self._optional_id(self._population.father_ids, self._index)
+
+    @property
+    def breeding_values(self) -> Optional[torch.Tensor]:
+        values = self._population.breeding_values
+        return None if values is None else values[self._index]
+
+    @property
+    def phenotypes(self) -> Optional[torch.Tensor]:
+        values = self._population.phenotypes
+        return None if values is None else values[self._index]
+
+    @classmethod
+    def create_random_individual(cls, genome: 'Genome', id: Optional[int] = None) -> 'Individual':
         """
         Creates a random individual with the specified genome.
 
         Args:
             genome (Genome): The genome object.
-            id (Optional[str]): Unique identifier for the individual.
+            id (Optional[int]): Unique identifier for the individual.
 
         Returns:
             Individual: A new Individual object with random haplotypes.
         """
-        haplotypes = torch.randint(0, 2, genome.shape(), device=genome.device)
+        haplotypes = torch.randint(0, 2, genome.shape(), device=genome.device, dtype=HAPLOTYPE_DTYPE)
         return cls(genome=genome, haplotypes=haplotypes, id=id)
 
 
+class _IndividualViews(list):
+    """`Population.individuals`: a snapshot of views whose `append` and `extend` add to the population."""
+
+    def __init__(self, population: 'Population'):
+        super().__init__(Individual._view(population, i) for i in range(population.size()))
+        self._population = population
+
+    def append(self, individual: Individual):
+        self._population.add_individual(individual)
+        super().append(Individual._view(self._population, self._population.size() - 1))
+
+    def extend(self, individuals):
+        for individual in individuals:
+            self.append(individual)
+
+    def __iadd__(self, individuals):
+        self.extend(individuals)
+        return self
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Population.individuals only supports append and extend. Use `population.select` to keep "
+                        "individuals, `population.replace_individuals` to replace them, or assign a new list to "
+                        "`population.individuals`.")
+
+    __setitem__ = __delitem__ = insert = pop = remove = clear = sort = reverse = _read_only
+
+
+def bivalent_homologs(pairing: torch.Tensor, masks: torch.Tensor) -> torch.Tensor:
+    """
+    The homolog passed on at every locus by each bivalent.
+
+    Args:
+        pairing (torch.Tensor): Homolog order (..., n_chromosomes, ploidy); entries 2k and 2k + 1 form bivalent k.
+        masks (torch.Tensor): Crossover masks (..., ploidy // 2, n_chromosomes, n_loci_per_chromosome),
+                              set where bivalent k passes on its second homolog.
+
+    Returns:
+        torch.Tensor: Homolog indices (..., ploidy // 2, n_chromosomes, n_loci_per_chromosome).
+    """
+    first = pairing[..., 0::2].transpose(-1, -2).unsqueeze(-1)
+    second = pairing[..., 1::2].transpose(-1, -2).unsqueeze(-1)
+    return torch.where(masks, second, first)
+
+
 class Population:
     """
-    Represents a population of individuals.
+    Represents a population of individuals as a struct of arrays.
+
+    The haplotypes of every individual are stored in one contiguous `HAPLOTYPE_DTYPE` tensor with
+    parallel `ids`, `mother_ids` and `father_ids` index arrays (-1 marks an unknown id). Selecting
+    individuals only records row indices into the shared storage; haplotypes are gathered when a
+    kernel needs them. With `packed=True` the haplotypes are bit-packed 8 loci per byte (see
+    `pack_haplotypes`) and dosages, allele frequencies and heterozygosity are computed from the
+    packed words.
+
+    Per-locus allele and heterozygote counts and per-individual heterozygous locus counts are kept
+    as running accumulators. They are updated with only the rows that change when individuals are
+    added, dropped by `select` or replaced, so frequency, MAF, expected heterozygosity, fixation and
+    heterozygosity queries do not rescan the haplotypes.
 
     Args:
         individuals (List[Individual], optional): List of Individual objects in the population. Defaults to None.
         id (Optional[str]): Unique identifier for the population. Defaults to None.
+        genome (Genome, optional): The genome object. Inferred from `individuals` when omitted.
+        haplotypes (torch.Tensor, optional): Haplotypes of all individuals.
+                                             Shape: (population_size, ploidy, n_chromosomes, n_loci_per_chromosome).
+        ids (torch.Tensor, optional): Individual identifiers (population_size,). Defaults to consecutive integers.
+        mother_ids (torch.Tensor, optional): Mother identifiers (population_size,). Defaults to -1.
+        father_ids (torch.Tensor, optional): Father identifiers (population_size,). Defaults to -1.
+        packed (bool): Store haplotypes bit-packed along the loci axis. Defaults to False.
+        pedigree (Pedigree, optional): Pedigree the ids refer to. Random founders are added to it, and
+                                       `make_crosses` and `random_crosses` record their progeny in it. Defaults to None.
     """
 
-    def __init__(self, individuals: Optional[List[Individual]] = None, id: Optional[str] = None):
-        self.individuals = individuals if individuals is not None else []
+    def __init__(self, individuals: Optional[List[Individual]] = None, id: Optional[str] = None,
+                 genome: Optional['Genome'] = None, haplotypes: Optional[torch.Tensor] = None,
+                 ids=None, mother_ids=None, father_ids=None, packed: bool = False, pedigree: Optional['Pedigree'] = None):
         self.id = id
+        self.genome = genome
+        self.packed = packed
+        self.pedigree = pedigree
+        self.breeding_values = None
+        self.phenotypes = None
+
+        if individuals:
+            self.genome = individuals[0].genome
+            haplotypes = torch.stack([individual.haplotypes for individual in individuals])
+            ids = [individual.id for individual in individuals]
+            mother_ids = [individual.mother_id for individual in individuals]
+            father_ids = [individual.father_id for individual in individuals]
+            if all(individual.phenotypes is not None for individual in individuals):
+                self.phenotypes = torch.stack([individual.phenotypes for individual in individuals])
+            if all(individual.breeding_values is not None for individual in individuals):
+                self.breeding_values = torch.stack([individual.breeding_values for individual in individuals])
+
+        self._set_arrays(haplotypes, ids, mother_ids, father_ids)
+
+    def _set_arrays(self, haplotypes: Optional[torch.Tensor], ids=None, mother_ids=None, father_ids=None):
+        """Replaces the haplotype storage and the parallel id arrays."""
+        device = self.genome.device if self.genome is not None else torch.device('cpu')
+        if haplotypes is None:
+            shape = self.genome.shape() if self.genome is not None else (0, 0, 0)
+            haplotypes = torch.zeros((0, *shape), dtype=HAPLOTYPE_DTYPE, device=device)
+        self._storage = self._packed(haplotypes.to(device=device, dtype=HAPLOTYPE_DTYPE))
+        self._rows = None
+        n = self._storage.shape[0]
+        self.ids = torch.arange(n, device=device) if ids is None else _as_id_tensor(ids, n, device)
+        self.mother_ids = _as_id_tensor(mother_ids, n, device)
+        self.father_ids = _as_id_tensor(father_ids, n, device)
+        self._set_counts()
+
+    def _count(self, storage: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Allele and heterozygote counts per locus and heterozygous loci per individual of storage rows."""
+        if storage.shape[0] == 0:
+            shape = self.genome.shape()[1:] if self.genome is not None else (0, 0)
+            zeros = torch.zeros(shape, dtype=torch.long, device=storage.device)
+            return zeros, zeros.clone(), torch.zeros(0, dtype=torch.long, device=storage.device)
+        if self.packed:
+            n_loci = self.genome.n_loci_per_chromosome
+            heterozygous = _packed_heterozygous_words(storage)
+            return (_packed_bit_counts(storage, n_loci, dim=(0, 1)), _packed_bit_counts(heterozygous, n_loci, dim=0),
+                    packed_popcount(heterozygous).sum(dim=(1, 2), dtype=torch.long))
+        heterozygous = storage.amax(dim=1) != storage.amin(dim=1)
+        return (storage.sum(dim=(0, 1), dtype=torch.long), heterozygous.sum(dim=0, dtype=torch.long),
+                heterozygous.sum(dim=(1, 2), dtype=torch.long))
+
+    def _set_counts(self):
+        """Recomputes the accumulators from the whole population."""
+        self._allele_counts, self._heterozygous_counts, self._heterozygous_loci = self._count(self._gathered_storage())
+
+    def _packed(self, haplotypes: torch.Tensor) -> torch.Tensor:
+        """Converts dense haplotypes to the storage layout of this population."""
+        return pack_haplotypes(haplotypes) if self.packed else haplotypes
+
+    def _unpacked(self, storage: torch.Tensor) -> torch.Tensor:
+        """Converts rows of the haplotype storage to dense haplotypes."""
+        return unpack_haplotypes(storage, self.genome.n_loci_per_chromosome) if self.packed else storage
+
+    def _row(self, index):
+        """Maps population positions to rows of the haplotype storage."""
+        return index if self._rows is None else self._rows[index]
+
+    def _next_id(self) -> int:
+        return int(self.ids.max()) + 1 if len(self.ids) > 0 else 0
 
     def create_random_founder_population(self, genome: 'Genome', n_founders: int):
         """
@@ -135,45 +336,370 @@ class Population:
             genome (Genome): The genome object.
             n_founders (int): The number of founder individuals to create.
         """
-        self.individuals = [Individual.create_random_individual(genome, id=str(i)) 
-                            for i in range(n_founders)]
+        self.genome = genome
+        if self.packed:
+            # draw random bytes directly and clear the padding bits of the last word
+            ploidy, n_chromosomes, n_loci = genome.shape()
+            n_words = n_packed_words(n_loci)
+            words = torch.randint(0, 256, (n_founders, ploidy, n_chromosomes, n_words), device=genome.device, dtype=torch.uint8)
+            words[..., -1] &= (1 << (n_loci - 8 * (n_words - 1))) - 1
+            self._set_arrays(None)
+            self._storage = words
+            self.ids = torch.arange(n_founders, device=genome.device)
+            self.mother_ids = torch.full((n_founders,), -1, dtype=torch.long, device=genome.device)
+            self.father_ids = self.mother_ids.clone()
+            self._set_counts()
+        else:
+            haplotypes = torch.randint(0, 2, (n_founders, *genome.shape()), device=genome.device, dtype=HAPLOTYPE_DTYPE)
+            self._set_arrays(haplotypes)
+        if self.pedigree is not None:
+            self.ids = self.pedigree.add_founders(n_founders).to(genome.device)
+        self.breeding_values = None
+        self.phenotypes = None
 
     def size(self) -> int:
         """Returns the number of individuals in the population."""
-        return len(self.individuals)
+        return len(self.ids)
+
+    def __len__(self) -> int:
+        return self.size()
+
+    def __getitem__(self, key) -> Union[Individual, 'Population']:
+        """Returns an `Individual` view for an integer key and a sub-population for slices or index tensors."""
+        if isinstance(key, int):
+            if key < 0:
+                key += self.size()
+            return Individual._view(self, key)
+        return self.select(key)
+
+    @property
+    def individuals(self) -> List[Individual]:
+        """Views of every individual in the population; appending to the list adds individuals."""
+        return _IndividualViews(self)
+
+    @individuals.setter
+    def individuals(self, individuals: List[Individual]):
+        """Replaces the individuals of the population."""
+        population = Population(list(individuals), self.id, self.genome, packed=self.packed, pedigree=self.pedigree)
+        self.__dict__.update(population.__dict__)
+
+    @property
+    def haplotypes(self) -> torch.Tensor:
+        """
+        Haplotypes of all individuals.
+
+        Returns:
+            torch.Tensor: Shape (population_size, ploidy, n_chromosomes, n_loci_per_chromosome).
+        """
+        return self._unpacked(self.get_packed() if self.packed else self._gathered_storage())
+
+    def _gathered_storage(self) -> torch.Tensor:
+        return self._storage if self._rows is None else self._storage[self._rows]
+
+    def get_packed(self, indices: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Returns bit-packed haplotypes, packing on the fly when the population is stored dense.
 
-    def get_genotypes(self) -> torch.Tensor:
+        Args:
+            indices (Optional[torch.Tensor]): Positions to gather. Defaults to the whole population.
+
+        Returns:
+            torch.Tensor: Packed uint8 haplotypes (population_size, ploidy, n_chromosomes, ceil(n_loci / 8)).
+        """
+        storage = self._gathered_storage() if indices is None else self._storage[self._row(indices)]
+        return storage if self.packed else pack_haplotypes(storage)
+
+    def select(self, indices: Union[torch.Tensor, slice, List[int]]) -> 'Population':
+        """
+        Returns the sub-population at `indices` (e.g. the output of `torch.topk(...).indices`).
+
+        The haplotype storage is shared with this population; only the row indices are recorded.
+
+        Args:
+            indices (Union[torch.Tensor, slice, List[int]]): Positions of the selected individuals.
+
+        Returns:
+            Population: The selected individuals.
+        """
+        if isinstance(indices, slice):
+            positions = torch.arange(self.size(), device=self.ids.device)[indices]
+        else:
+            positions = torch.as_tensor(indices, dtype=torch.long, device=self.ids.device).view(-1)
+
+        selected = Population.__new__(Population)
+        selected.id = self.id
+        selected.genome = self.genome
+        selected.packed = self.packed
+        selected.pedigree = self.pedigree
+        selected._storage = self._storage
+        selected._rows = self._row(positions)
+        selected.ids = self.ids[positions]
+        selected.mother_ids = self.mother_ids[positions]
+        selected.father_ids = self.father_ids[positions]
+        selected.breeding_values = None if self.breeding_values is None else self.breeding_values[positions]
+        selected.phenotypes = None if self.phenotypes is None else self.phenotypes[positions]
+
+        selected._heterozygous_loci = self._heterozygous_loci[positions]
+        kept = torch.zeros(self.size(), dtype=torch.bool, device=positions.device)
+        kept[positions] = True
+        n_kept = int(kept.sum())
+        if n_kept == len(positions) and 2 * n_kept > self.size():
+            # most individuals are kept exactly once: subtract the dropped ones
+            dropped = self._count(self._storage[self._row((~kept).nonzero().squeeze(1))])
+            selected._allele_counts = self._allele_counts - dropped[0]
+            selected._heterozygous_counts = self._heterozygous_counts - dropped[1]
+        else:
+            selected._allele_counts, selected._heterozygous_counts, _ = self._count(self._storage[selected._rows])
+        return selected
+
+    def get_genotypes(self, indices: Optional[torch.Tensor] = None) -> torch.Tensor:
         """
         Returns a tensor of all genotypes in the population.
 
+        Args:
+            indices (Optional[torch.Tensor]): Positions to gather. Defaults to the whole population.
+
         Returns:
-            torch.Tensor: Genotype tensor with shape 
+            torch.Tensor: Genotype tensor with shape
                           (population_size, ploidy, n_chromosomes, n_loci_per_chromosome).
         """
-        return torch.stack([individual.haplotypes for individual in self.individuals])
+        if indices is None:
+            return self.haplotypes
+        return self._unpacked(self._storage[self._row(indices)])
 
-    def get_dosages(self) -> torch.Tensor:
+    def get_gametes(self, parents: torch.Tensor, masks: torch.Tensor,
+                    pairing: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Recombines homolog pairs of the individuals at `parents` straight from the haplotype storage.
+
+        Pair k of a parent passes on its first homolog where the mask is False and its second where it is set.
+        Dense storage is read with a single gather, without copying the parents' haplotypes first.
+
+        Args:
+            parents (torch.Tensor): Positions of the parents, any shape (...).
+            masks (torch.Tensor): Crossover masks (..., ploidy // 2, n_chromosomes, n_loci_per_chromosome),
+                                  e.g. from `chewc.meiosis.crossover_masks`.
+            pairing (Optional[torch.Tensor]): Homolog order (..., n_chromosomes, ploidy) whose entries 2k and
+                                              2k + 1 form pair k, e.g. from `chewc.meiosis.pair_homologs`.
+                                              Defaults to pairing homologs 2k and 2k + 1.
+
+        Returns:
+            torch.Tensor: Gametes (..., ploidy // 2, n_chromosomes, n_loci_per_chromosome).
+        """
+        rows = self._row(parents)
+        n_pairs, n_chromosomes, n_loci = masks.shape[-3:]
+        device = masks.device
+        if pairing is None:
+            pairing = torch.arange(2 * n_pairs, device=device).expand(*masks.shape[:-3], n_chromosomes, -1)
+        if self.packed:
+            packed = self._storage[rows]
+            homologs = pairing.transpose(-1, -2).unsqueeze(-1).expand(*packed.shape)
+            gametes = packed_select(torch.gather(packed, -3, homologs[..., 0::2, :, :]),
+                                    torch.gather(packed, -3, homologs[..., 1::2, :, :]), pack_haplotypes(masks))
+            return self._unpacked(gametes)
+        homologs = bivalent_homologs(pairing, masks)
+        return self._storage[rows.view(*rows.shape, 1, 1, 1), homologs,
+                             torch.arange(n_chromosomes, device=device).view(-1, 1),
+                             torch.arange(n_loci, device=device)]
+
+    def get_dosages(self, loci: Optional[torch.Tensor] = None) -> torch.Tensor:
         """
         Calculates the allele dosage for each locus in the population by summing over the ploidy.
 
+        Args:
+            loci (Optional[torch.Tensor]): Flat locus indices into (n_chromosomes * n_loci_per_chromosome),
+                                           e.g. the QTL of a trait. Only these columns are gathered.
+
+        Returns:
+            torch.Tensor: Allele dosage tensor with shape
+                          (population_size, n_chromosomes, n_loci_per_chromosome),
+                          or (population_size, len(loci)) when `loci` is given.
+        """
+        if loci is not None:
+            return self.get_alleles(loci).sum(dim=1, dtype=HAPLOTYPE_DTYPE)
+        if self.packed:
+            return packed_dosages(self._gathered_storage(), self.genome.n_loci_per_chromosome)
+        return self.haplotypes.sum(dim=1, dtype=HAPLOTYPE_DTYPE)  # Sum over the ploidy dimension
+
+    def get_alleles(self, loci: torch.Tensor) -> torch.Tensor:
+        """
+        Gathers the alleles of every haplotype at a subset of loci.
+
+        Args:
+            loci (torch.Tensor): Flat locus indices into (n_chromosomes * n_loci_per_chromosome).
+
         Returns:
-            torch.Tensor: Allele dosage tensor with shape 
-                          (population_size, n_chromosomes, n_loci_per_chromosome).
+            torch.Tensor: Alleles (population_size, ploidy, len(loci)).
         """
-        return self.get_genotypes().sum(dim=1)  # Sum over the ploidy dimension
+        columns = loci
+        if self.packed:
+            n_loci = self.genome.n_loci_per_chromosome
+            chromosomes, positions = loci // n_loci, loci % n_loci
+            columns = chromosomes * n_packed_words(n_loci) + positions // 8
+
+        storage = self._storage.flatten(2)
+        if self._rows is None:
+            values = storage.index_select(2, columns)
+        else:
+            ploids = torch.arange(storage.shape[1], device=storage.device)
+            values = storage[self._rows.view(-1, 1, 1), ploids.view(1, -1, 1), columns.view(1, 1, -1)]
+
+        if self.packed:
+            values = ((values >> (positions % 8).to(torch.uint8)) & 1).to(HAPLOTYPE_DTYPE)
+        return values
 
     def add_individual(self, individual: Individual):
         """Adds an individual to the population."""
-        self.individuals.append(individual)
+        if self.genome is None:
+            self.genome = individual.genome
+            self._set_arrays(None)
+        self.add_haplotypes(individual.haplotypes.unsqueeze(0), mother_ids=[individual.mother_id],
+                            father_ids=[individual.father_id], ids=None if individual.id is None else [individual.id])
+
+    def add_haplotypes(self, haplotypes: torch.Tensor, mother_ids=None, father_ids=None, ids=None) -> torch.Tensor:
+        """
+        Appends a batch of individuals to the population in one operation.
+
+        Args:
+            haplotypes (torch.Tensor): Haplotypes of the new individuals (n_new, ploidy, n_chromosomes, n_loci_per_chromosome).
+            mother_ids (torch.Tensor, optional): Mother identifiers (n_new,). Defaults to -1.
+            father_ids (torch.Tensor, optional): Father identifiers (n_new,). Defaults to -1.
+            ids (torch.Tensor, optional): Identifiers of the new individuals, e.g. from a `Pedigree`.
+                                          Defaults to the ids following the largest id.
+
+        Returns:
+            torch.Tensor: The ids assigned to the new individuals.
+
+        Note:
+            Breeding values and phenotypes are reset because they no longer cover every individual.
+        """
+        n_new = haplotypes.shape[0]
+        device = self.ids.device
+        if ids is None:
+            new_ids = torch.arange(self._next_id(), self._next_id() + n_new, device=device)
+        else:
+            new_ids = _as_id_tensor(ids, n_new, device)
+        new_storage = self._packed(haplotypes.to(device=device, dtype=HAPLOTYPE_DTYPE))
+        self._storage = torch.cat([self._gathered_storage(), new_storage])
+        self._rows = None
+        self.ids = torch.cat([self.ids, new_ids])
+        self.mother_ids = torch.cat([self.mother_ids, _as_id_tensor(mother_ids, n_new, device)])
+        self.father_ids = torch.cat([self.father_ids, _as_id_tensor(father_ids, n_new, device)])
+        allele_counts, heterozygous_counts, heterozygous_loci = self._count(new_storage)
+        self._allele_counts = self._allele_counts + allele_counts
+        self._heterozygous_counts = self._heterozygous_counts + heterozygous_counts
+        self._heterozygous_loci = torch.cat([self._heterozygous_loci, heterozygous_loci])
+        self.breeding_values = None
+        self.phenotypes = None
+        return new_ids
+
+    def replace_individuals(self, indices: torch.Tensor, haplotypes: torch.Tensor, mother_ids=None,
+                            father_ids=None, ids=None) -> torch.Tensor:
+        """
+        Replaces the individuals at `indices` by new ones, e.g. culled individuals by progeny.
+
+        Args:
+            indices (torch.Tensor): Distinct positions of the replaced individuals (n_new,).
+            haplotypes (torch.Tensor): Haplotypes of the new individuals (n_new, ploidy, n_chromosomes, n_loci_per_chromosome).
+            mother_ids (torch.Tensor, optional): Mother identifiers (n_new,). Defaults to -1.
+            father_ids (torch.Tensor, optional): Father identifiers (n_new,). Defaults to -1.
+            ids (torch.Tensor, optional): Identifiers of the new individuals, e.g. from a `Pedigree`.
+                                          Defaults to the ids following the largest id.
+
+        Returns:
+            torch.Tensor: The ids assigned to the new individuals.
+
+        Note:
+            Breeding values and phenotypes are reset because they no longer match every individual.
+        """
+        device = self.ids.device
+        positions = torch.as_tensor(indices, dtype=torch.long, device=device).view(-1)
+        n_new = len(positions)
+        if ids is None:
+            new_ids = torch.arange(self._next_id(), self._next_id() + n_new, device=device)
+        else:
+            new_ids = _as_id_tensor(ids, n_new, device)
+        new_storage = self._packed(haplotypes.to(device=device, dtype=HAPLOTYPE_DTYPE))
+        old_counts = self._count(self._storage[self._row(positions)])
+        new_counts = self._count(new_storage)
+
+        # the storage may be shared with selections, so the replaced rows are written to a copy
+        storage = self._gathered_storage().clone()
+        storage[positions] = new_storage
+        self._storage, self._rows = storage, None
+        for name, values in (('ids', new_ids), ('mother_ids', _as_id_tensor(mother_ids, n_new, device)),
+                             ('father_ids', _as_id_tensor(father_ids, n_new, device))):
+            column = getattr(self, name).clone()
+            column[positions] = values
+            setattr(self, name, column)
+        self._allele_counts = self._allele_counts - old_counts[0] + new_counts[0]
+        self._heterozygous_counts = self._heterozygous_counts - old_counts[1] + new_counts[1]
+        self._heterozygous_loci = self._heterozygous_loci.clone()
+        self._heterozygous_loci[positions] = new_counts[2]
+        self.breeding_values = None
+        self.phenotypes = None
+        return new_ids
+
+    @property
+    def allele_counts(self) -> torch.Tensor:
+        """Number of copies of allele 1 at each locus (n_chromosomes, n_loci_per_chromosome)."""
+        return self._allele_counts
+
+    def _n_haplotypes(self) -> int:
+        return self.size() * self._storage.shape[1]
 
     def calculate_allele_frequencies(self) -> torch.Tensor:
         """
-        Calculates allele frequencies for each locus in the population.
+        Calculates allele frequencies for each locus in the population from the running allele counts.
 
         Returns:
             torch.Tensor: Allele frequencies (n_chromosomes, n_loci_per_chromosome).
         """
-        return self.get_genotypes().float().mean(dim=(0, 1)) # Average over ploidy and individuals
+        return self._allele_counts.float() / self._n_haplotypes()
+
+    def calculate_minor_allele_frequencies(self) -> torch.Tensor:
+        """
+        Calculates the frequency of the less common allele at each locus.
+
+        Returns:
+            torch.Tensor: Minor allele frequencies (n_chromosomes, n_loci_per_chromosome).
+        """
+        minor_counts = torch.minimum(self._allele_counts, self._n_haplotypes() - self._allele_counts)
+        return minor_counts.float() / self._n_haplotypes()
+
+    def calculate_expected_heterozygosity(self) -> torch.Tensor:
+        """
+        Calculates the heterozygosity expected under Hardy-Weinberg equilibrium, 2p(1 - p).
+
+        Returns:
+            torch.Tensor: Expected heterozygosity (n_chromosomes, n_loci_per_chromosome).
+        """
+        allele_frequencies = self.calculate_allele_frequencies()
+        return 2 * allele_frequencies * (1 - allele_frequencies)
+
+    def fixed_loci(self) -> torch.Tensor:
+        """
+        Finds the loci where one allele has been fixed.
+
+        Returns:
+            torch.Tensor: Boolean mask (n_chromosomes, n_loci_per_chromosome).
+        """
+        return (self._allele_counts == 0) | (self._allele_counts == self._n_haplotypes())
+
+    def calculate_heterozygosity(self, per_locus: bool = False) -> torch.Tensor:
+        """
+        Calculates observed heterozygosity (loci where the homologs carry different alleles).
+
+        Args:
+            per_locus (bool): Return the fraction of heterozygous individuals per locus instead of
+                              the fraction of heterozygous loci per individual. Defaults to False.
+
+        Returns:
+            torch.Tensor: (population_size,) or (n_chromosomes, n_loci_per_chromosome) heterozygosity.
+        """
+        if per_locus:
+            return self._heterozygous_counts.float() / self.size()
+        return self._heterozygous_loci.float() / self._heterozygous_counts.numel()
 
     def calculate_genetic_diversity(self) -> torch.Tensor:
         """
@@ -185,7 +711,119 @@ class Population:
         allele_frequencies = self.calculate_allele_frequencies()
         return 1.0 - (allele_frequencies**2 + (1 - allele_frequencies)**2)
 
-# %% ../nbs/01_core.ipynb 8
+# %% ../nbs/01_core.ipynb 10
+_BIT_SHIFTS = torch.arange(8, dtype=torch.uint8)
+_POPCOUNT_TABLE = torch.tensor([bin(i).count('1') for i in range(256)], dtype=torch.uint8)
+
+def n_packed_words(n_loci: int) -> int:
+    """Number of uint8 words needed to store `n_loci` bits."""
+    return (n_loci + 7) // 8
+
+def pack_haplotypes(haplotypes: torch.Tensor) -> torch.Tensor:
+    """
+    Packs 0/1 haplotypes into bits, 8 loci per byte along the last (loci) axis.
+
+    Locus `8 * w + b` is stored in bit `b` of word `w`; padding bits are zero.
+
+    Args:
+        haplotypes (torch.Tensor): Haplotypes with loci on the last axis, e.g.
+                                   (population_size, ploidy, n_chromosomes, n_loci_per_chromosome).
+
+    Returns:
+        torch.Tensor: Packed uint8 haplotypes (..., ceil(n_loci / 8)).
+    """
+    n_loci = haplotypes.shape[-1]
+    padding = n_packed_words(n_loci) * 8 - n_loci
+    bits = torch.nn.functional.pad(haplotypes.to(torch.uint8), (0, padding))
+    bits = bits.view(*bits.shape[:-1], n_packed_words(n_loci), 8) << _BIT_SHIFTS.to(haplotypes.device)
+    return bits.sum(dim=-1, dtype=torch.uint8)
+
+def unpack_haplotypes(packed: torch.Tensor, n_loci: int, dtype: torch.dtype = HAPLOTYPE_DTYPE) -> torch.Tensor:
+    """
+    Unpacks bit-packed haplotypes into one value per locus.
+
+    Args:
+        packed (torch.Tensor): Packed uint8 haplotypes (..., n_words).
+        n_loci (int): Number of loci per chromosome.
+        dtype (torch.dtype): Output dtype. Defaults to `HAPLOTYPE_DTYPE`.
+
+    Returns:
+        torch.Tensor: Dense haplotypes (..., n_loci).
+    """
+    bits = (packed.unsqueeze(-1) >> _BIT_SHIFTS.to(packed.device)) & 1
+    return bits.flatten(-2)[..., :n_loci].to(dtype)
+
+def packed_select(first: torch.Tensor, second: torch.Tensor, packed_mask: torch.Tensor) -> torch.Tensor:
+    """Bitwise mask select of packed haplotypes: bits of `second` where the mask is set, `first` elsewhere."""
+    return (first & ~packed_mask) | (second & packed_mask)
+
+def packed_popcount(packed: torch.Tensor) -> torch.Tensor:
+    """Number of set bits in every packed word."""
+    return _POPCOUNT_TABLE.to(packed.device)[packed.long()]
+
+def packed_dosages(packed: torch.Tensor, n_loci: int) -> torch.Tensor:
+    """
+    Allele dosages computed from packed haplotypes, one ploid at a time.
+
+    Args:
+        packed (torch.Tensor): Packed haplotypes (population_size, ploidy, n_chromosomes, n_words).
+        n_loci (int): Number of loci per chromosome.
+
+    Returns:
+        torch.Tensor: Allele dosages (population_size, n_chromosomes, n_loci).
+    """
+    dosages = unpack_haplotypes(packed[:, 0], n_loci)
+    for ploid in range(1, packed.shape[1]):
+        dosages += unpack_haplotypes(packed[:, ploid], n_loci)
+    return dosages
+
+def _packed_bit_counts(packed: torch.Tensor, n_loci: int, dim) -> torch.Tensor:
+    """Counts set bits per locus over `dim`, extracting one bit plane at a time."""
+    counts = torch.stack([((packed >> shift) & 1).sum(dim=dim, dtype=torch.long) for shift in range(8)], dim=-1)
+    return counts.flatten(-2)[..., :n_loci]
+
+def packed_allele_frequencies(packed: torch.Tensor, n_loci: int) -> torch.Tensor:
+    """
+    Allele frequencies computed from packed haplotypes.
+
+    Args:
+        packed (torch.Tensor): Packed haplotypes (population_size, ploidy, n_chromosomes, n_words).
+        n_loci (int): Number of loci per chromosome.
+
+    Returns:
+        torch.Tensor: Allele frequencies (n_chromosomes, n_loci).
+    """
+    n_haplotypes = packed.shape[0] * packed.shape[1]
+    return _packed_bit_counts(packed, n_loci, dim=(0, 1)).float() / n_haplotypes
+
+def _packed_heterozygous_words(packed: torch.Tensor) -> torch.Tensor:
+    """Words whose bits are set where the homologs of an individual carry different alleles."""
+    union, intersection = packed[:, 0], packed[:, 0]
+    for ploid in range(1, packed.shape[1]):
+        union = union | packed[:, ploid]
+        intersection = intersection & packed[:, ploid]
+    return union ^ intersection
+
+def packed_heterozygosity(packed: torch.Tensor, n_loci: int, per_locus: bool = False) -> torch.Tensor:
+    """
+    Observed heterozygosity computed from packed haplotypes with popcounts.
+
+    Args:
+        packed (torch.Tensor): Packed haplotypes (population_size, ploidy, n_chromosomes, n_words).
+        n_loci (int): Number of loci per chromosome.
+        per_locus (bool): Return the fraction of heterozygous individuals per locus instead of the
+                          fraction of heterozygous loci per individual. Defaults to False.
+
+    Returns:
+        torch.Tensor: (population_size,) or (n_chromosomes, n_loci) heterozygosity.
+    """
+    heterozygous = _packed_heterozygous_words(packed)
+    if per_locus:
+        return _packed_bit_counts(heterozygous, n_loci, dim=0).float() / packed.shape[0]
+    counts = packed_popcount(heterozygous).sum(dim=(1, 2), dtype=torch.long)
+    return counts.float() / (packed.shape[2] * n_loci)
+
+# %% ../nbs/01_core.ipynb 13
 from torch.utils.data import Dataset, DataLoader
 
 class PopulationDataset(Dataset):
@@ -198,7 +836,7 @@ class PopulationDataset(Dataset):
         return self.population.size()
 
     def __getitem__(self, idx):
-        genotype = self.population.individuals[idx].haplotypes
+        genotype = self.population[idx].haplotypes
         if self.transform:
             genotype = self.transform(genotype)
         return genotype
@@ -1,53 +1,126 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/04_cross.ipynb.
 
 # %% auto 0
-__all__ = ['random_crosses']
+__all__ = ['factorial_plan', 'diallel_plan', 'homolog_pairing', 'make_crosses', 'random_crosses']
 
 # %% ../nbs/04_cross.ipynb 3
 from .core import *
 from .trait import *
 from .meiosis import *
+from .pedigree import *
 from typing import Tuple, Optional, List, Union
 
 import torch
 
 # %% ../nbs/04_cross.ipynb 4
-def random_crosses( genome: Genome, population: Population, n_crosses: int, reps: int) -> torch.Tensor:
+def factorial_plan(females: torch.Tensor, males: torch.Tensor) -> torch.Tensor:
     """
-    Generate random crosses from a set of parent haplotypes.
+    Mating plan crossing every female with every male.
 
     Args:
     ----
-        parent_haplotypes (torch.Tensor): Haplotypes of the parents.
-                                           Shape: (n_parents, ploidy, chr, loci)
-        n_crosses (int): Number of crosses to generate.
-        genome (Genome): Genome object.
+        females (torch.Tensor): Positions of the females (n_females,).
+        males (torch.Tensor): Positions of the males (n_males,).
 
     Returns:
     -------
-        torch.Tensor: Haplotypes of the progeny.
-                      Shape: (n_crosses, ploidy, chr, loci)
+        torch.Tensor: Plan of (mother, father) positions (n_females * n_males, 2).
     """
+    females, males = torch.as_tensor(females).view(-1), torch.as_tensor(males).view(-1)
+    return torch.cartesian_prod(females, males).view(-1, 2)
 
-    # assert len(parent_haplotypes.shape) == 4, f"Your input was {parent_haplotypes.shape} when it should be (#parents,ploidy,#chr,#loci)"
-    device = genome.device
-    n_parents = population.size()
+def diallel_plan(parents: torch.Tensor, selfs: bool = False, reciprocals: bool = False) -> torch.Tensor:
+    """
+    Mating plan of a diallel among `parents`.
 
-    parent_haplotypes = population.get_genotypes()
-    # Randomly select parents for each cross
-    female_indices = torch.randint(0, n_parents, (n_crosses,), device=device)
-    male_indices = torch.randint(0, n_parents, (n_crosses,), device=device)
+    Args:
+    ----
+        parents (torch.Tensor): Positions of the parents (n_parents,).
+        selfs (bool): Include the selfings. Defaults to False.
+        reciprocals (bool): Include both directions of every cross. Defaults to False (half diallel).
 
-    parent_haplotypes = parent_haplotypes.to(device)
-    # Extract haplotypes of the selected parents
-    female_haplotypes = parent_haplotypes[female_indices]
-    male_haplotypes = parent_haplotypes[male_indices]
+    Returns:
+    -------
+        torch.Tensor: Plan of (mother, father) positions (n_crosses, 2).
+    """
+    parents = torch.as_tensor(parents).view(-1)
+    mothers, fathers = torch.meshgrid(torch.arange(len(parents)), torch.arange(len(parents)), indexing='ij')
+    keep = mothers != fathers if reciprocals else mothers < fathers
+    if selfs:
+        keep |= mothers == fathers
+    return torch.stack([parents[mothers[keep]], parents[fathers[keep]]], dim=1)
+
+def homolog_pairing(genome: Genome, batch_shape: Tuple[int, ...], subgenomes: Optional[int] = None,
+                    preferential: float = 1.0) -> Optional[torch.Tensor]:
+    """Random bivalents for polyploid meiosis (see `pair_homologs`), None for diploids."""
+    if genome.ploidy == 2:
+        return None
+    return pair_homologs(batch_shape, genome.ploidy, genome.n_chromosomes, subgenomes, preferential, genome.device)
+
+def make_crosses(genome: Genome, population: Population, plan: torch.Tensor, n_progeny: Union[int, torch.Tensor] = 1,
+                 pedigree: Optional[Pedigree] = None, subgenomes: Optional[int] = None,
+                 preferential: float = 1.0) -> torch.Tensor:
+    """
+    Carries out a mating plan in one vectorized pass.
+
+    Crossover masks are drawn for both parents of every progeny. The gametes are gathered straight from
+    the population storage (see `Population.get_gametes`), so the parents are never copied per progeny.
+
+    Args:
+    ----
+        genome (Genome): Genome object.
+        population (Population): Parent population.
+        plan (torch.Tensor): Positions of the (mother, father) of every cross (n_crosses, 2).
+        n_progeny (Union[int, torch.Tensor]): Progeny per cross, one number or one per cross (n_crosses,).
+        pedigree (Optional[Pedigree]): Pedigree to record the progeny in, as one cohort whose ids are
+                                       `pedigree.last_cohort()`. The ids of `population` are taken as
+                                       pedigree ids. Defaults to `population.pedigree`.
+        subgenomes (Optional[int]): Subgenomes of an allopolyploid, see `pair_homologs`. Defaults to None.
+        preferential (float): Probability of pairing within subgenomes. Defaults to 1.
 
-    # Simulate gametes
-    female_gametes = simulate_gametes(genome, female_haplotypes, reps = reps,)
-    male_gametes = simulate_gametes(genome, male_haplotypes, reps=reps)
+    Returns:
+    -------
+        torch.Tensor: Haplotypes of the progeny, grouped by cross.
+                      Shape: (n_progeny, ploidy, chr, loci)
+    """
+    pedigree = population.pedigree if pedigree is None else pedigree
+    device = genome.device
+    plan = torch.as_tensor(plan, dtype=torch.long, device=device).view(-1, 2)
+    if isinstance(n_progeny, int):
+        parents = plan.repeat_interleave(n_progeny, dim=0)
+    else:
+        parents = plan.repeat_interleave(torch.as_tensor(n_progeny, device=device), dim=0)
 
-    # Combine gametes to form progeny haplotypes
-    progeny_haplotypes = torch.cat([female_gametes, male_gametes], dim=2)
+    # both gametes of a progeny in one draw: (n_progeny, mother/father, ploidy//2, chr, loci)
+    masks = crossover_masks(genome, (len(parents), 2, genome.ploidy // 2))
+    pairing = homolog_pairing(genome, (len(parents), 2), subgenomes, preferential)
+    progeny_haplotypes = population.get_gametes(parents, masks, pairing).flatten(1, 2)
 
+    if pedigree is not None:
+        parent_ids = population.ids[parents]
+        pedigree.add(parent_ids[:, 0], parent_ids[:, 1])
     return progeny_haplotypes
+
+def random_crosses( genome: Genome, population: Population, n_crosses: int, reps: int,
+                    pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Generate random crosses from a set of parent haplotypes.
+
+    Args:
+    ----
+        genome (Genome): Genome object.
+        population (Population): Parent population.
+        n_crosses (int): Number of crosses to generate.
+        reps (int): Number of progeny per cross.
+        pedigree (Optional[Pedigree]): Pedigree to record the progeny in, as one cohort whose ids are
+                                       `pedigree.last_cohort()` in cross-major order. The ids of `population`
+                                       are taken as pedigree ids. Defaults to `population.pedigree`.
+
+    Returns:
+    -------
+        torch.Tensor: Haplotypes of the progeny.
+                      Shape: (n_crosses, reps, ploidy, chr, loci)
+    """
+    # Randomly select parents for each cross
+    plan = torch.randint(0, population.size(), (n_crosses, 2), device=genome.device)
+    return make_crosses(genome, population, plan, reps, pedigree).view(n_crosses, reps, *genome.shape())
@@ -0,0 +1,124 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/07_env.ipynb.
+
+# %% auto 0
+__all__ = ['VecBreedingEnv']
+
+# %% ../nbs/07_env.ipynb 3
+from .chewc import *
+from typing import Tuple, Optional, List, Union, Dict
+
+import torch
+
+# %% ../nbs/07_env.ipynb 5
+class VecBreedingEnv:
+    """
+    Batched breeding environments with per-env actions and automatic reset.
+
+    Args:
+        G (Genome): Genome of the simulated programs.
+        T (Trait): Trait used for breeding values and phenotypes.
+        h2 (float): Heritability of the phenotypes.
+        n_envs (int): Number of environments stepped together.
+        pop_size (int): Number of individuals per environment and generation.
+        max_generations (int): Episode length; finished envs are reset from the founders.
+        founder_haplotypes (Optional[torch.Tensor]): Founder haplotypes (pop_size, ploidy, n_chr, n_loci).
+                                                     Random founders are created when omitted.
+        recombination_rate (float): Per-locus recombination rate passed to `breed`. Defaults to 0.1.
+    """
+    n_observations = 5  # matches `num_meta_features` of `CompleteNetwork`
+
+    def __init__(self, G, T, h2, n_envs, pop_size, max_generations, founder_haplotypes=None, recombination_rate=0.1):
+        self.G = G
+        self.T = T
+        self.h2 = h2
+        self.n_envs = n_envs
+        self.pop_size = pop_size
+        self.max_generations = max_generations
+        self.recombination_rate = recombination_rate
+
+        founders = founder_haplotypes if founder_haplotypes is not None else create_random_pop(G, pop_size)
+        # RL runs step for many episodes, so no pedigree is kept
+        founders = create_pop(G, founders.expand(n_envs, *founders.shape).clone(), pedigree=False)
+        bv(founders, T)
+        phenotype(founders, T, h2)
+        # cached founder state used for every (auto-)reset
+        self.founders = founders
+        self.population = None
+        self.generation = torch.zeros(n_envs, dtype=torch.long, device=founders.haplotypes.device)
+
+    def reset(self) -> torch.Tensor:
+        """Resets every env to the founder population and returns the observations (n_envs, n_observations)."""
+        self.population = create_pop(self.G, self.founders.haplotypes.clone(), pedigree=False)
+        self.population.breeding_values = self.founders.breeding_values.clone()
+        self.population.phenotypes = self.founders.phenotypes.clone()
+        self.generation.zero_()
+        return self.observe()
+
+    def observe(self) -> torch.Tensor:
+        """
+        Summary features of every env.
+
+        Returns:
+            torch.Tensor: (n_envs, 5) mean and standard deviation of the phenotypes, mean breeding value,
+                          fraction of heterozygous loci and fraction of the episode elapsed.
+        """
+        P = self.population
+        heterozygosity = P.heterozygosity.mean(dim=-1)
+        progress = self.generation.float() / self.max_generations
+        return torch.stack([P.phenotypes.mean(dim=-1), P.phenotypes.std(dim=-1), P.breeding_values.mean(dim=-1),
+                            heterozygosity, progress], dim=-1)
+
+    def _selection_sizes(self, actions: torch.Tensor) -> torch.Tensor:
+        """Number of parents per env; floating point actions are selection fractions."""
+        actions = torch.as_tensor(actions, device=self.generation.device)
+        if actions.is_floating_point():
+            actions = torch.round(actions * self.pop_size)
+        return actions.long().clamp(1, self.pop_size).expand(self.n_envs)
+
+    def step(self, actions) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, Dict[str, torch.Tensor]]:
+        """
+        Advances every env by one generation.
+
+        The top `actions[e]` individuals of env `e` by phenotype are selected and `pop_size` progeny are
+        bred from random pairs of them.
+
+        Args:
+            actions (torch.Tensor): Selection sizes (n_envs,) as integers, or selection fractions as floats.
+
+        Returns:
+            Tuple: observations (n_envs, n_observations), rewards (n_envs,), dones (n_envs,) and an info dict
+                   holding the `terminal_observation` of every env before auto-reset.
+        """
+        if self.population is None:
+            self.reset()
+        P = self.population
+        n_selected = self._selection_sizes(actions)
+
+        # rank individuals by phenotype, then draw parents uniformly among each env's top n_selected
+        ranking = torch.argsort(P.phenotypes, dim=-1, descending=True)
+        ranks = (torch.rand(self.n_envs, 2 * self.pop_size, device=ranking.device) * n_selected.unsqueeze(-1)).long()
+        parents = torch.gather(ranking, -1, ranks)
+        mothers = select_individuals(P.haplotypes, parents[:, :self.pop_size])
+        fathers = select_individuals(P.haplotypes, parents[:, self.pop_size:])
+
+        progeny = breed(mothers, fathers, self.recombination_rate)
+        update_pop(P, progeny)
+        bv(P, self.T)
+        phenotype(P, self.T, self.h2)
+
+        rewards = P.phenotypes.mean(dim=-1)
+        self.generation += 1
+        dones = self.generation >= self.max_generations
+        terminal_observation = self.observe()
+
+        # auto-reset finished envs from the cached founders without leaving the device
+        done_mask = dones.view(-1, 1)
+        P.haplotypes = torch.where(done_mask.view(-1, 1, 1, 1, 1), self.founders.haplotypes, P.haplotypes)
+        P.dosages = torch.where(done_mask.view(-1, 1, 1, 1), self.founders.dosages, P.dosages)
+        P.allele_counts = torch.where(done_mask.view(-1, 1, 1), self.founders.allele_counts, P.allele_counts)
+        P.heterozygosity = torch.where(done_mask, self.founders.heterozygosity, P.heterozygosity)
+        P.breeding_values = torch.where(done_mask, self.founders.breeding_values, P.breeding_values)
+        P.phenotypes = torch.where(done_mask, self.founders.phenotypes, P.phenotypes)
+        self.generation = torch.where(dones, torch.zeros_like(self.generation), self.generation)
+
+        return self.observe(), rewards, dones, {'terminal_observation': terminal_observation}
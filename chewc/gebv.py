@@ -0,0 +1,218 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/11_gebv.ipynb.
+
+# %% auto 0
+__all__ = ['conjugate_gradient', 'GenomicPredictor', 'IncrementalGenomicPredictor']
+
+# %% ../nbs/11_gebv.ipynb 3
+from typing import Tuple, Optional, List, Union, Callable
+
+import collections
+import torch
+
+# %% ../nbs/11_gebv.ipynb 5
+def conjugate_gradient(matvec: Callable[[torch.Tensor], torch.Tensor], b: torch.Tensor, diagonal: torch.Tensor,
+                       tol: float = 1e-6, max_iter: int = 1000, x0: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    Jacobi-preconditioned conjugate gradients for symmetric positive definite systems A x = b.
+
+    Args:
+        matvec (Callable): Computes A @ v for v shaped like `b`.
+        b (torch.Tensor): Right-hand sides (..., m, k); every column is solved independently.
+        diagonal (torch.Tensor): Diagonal of A (..., m, 1), used as preconditioner.
+        tol (float): Relative residual norm at which to stop. Defaults to 1e-6.
+        max_iter (int): Maximum number of iterations. Defaults to 1000.
+        x0 (Optional[torch.Tensor]): Starting point, e.g. a previous solution. Defaults to zeros.
+
+    Returns:
+        torch.Tensor: The solution (..., m, k).
+    """
+    x = torch.zeros_like(b) if x0 is None else x0.clone()
+    r = b.clone() if x0 is None else b - matvec(x)
+    z = r / diagonal
+    direction = z.clone()
+    rz = (r * z).sum(dim=-2, keepdim=True)
+    threshold = tol * b.norm(dim=-2, keepdim=True)
+    for _ in range(max_iter):
+        A_direction = matvec(direction)
+        alpha = rz / (direction * A_direction).sum(dim=-2, keepdim=True).clamp_min(torch.finfo(b.dtype).tiny)
+        x += alpha * direction
+        r -= alpha * A_direction
+        if (r.norm(dim=-2, keepdim=True) <= threshold).all():
+            break
+        z = r / diagonal
+        rz_new = (r * z).sum(dim=-2, keepdim=True)
+        direction = z + rz_new / rz.clamp_min(torch.finfo(b.dtype).tiny) * direction
+        rz = rz_new
+    return x
+
+class GenomicPredictor:
+    """
+    Ridge-regression marker effects for genomic estimated breeding values (GEBVs).
+
+    Args:
+        ridge (Optional[float]): Ridge parameter lambda. Derived from `h2` when omitted.
+        h2 (float): Heritability used to derive the ridge parameter. Defaults to 0.5.
+        solver (str): 'direct', 'cg' or 'auto' (direct up to `direct_limit` unknowns). Defaults to 'auto'.
+        direct_limit (int): Largest system solved by Cholesky factorization with 'auto'. Defaults to 4096.
+        tol (float): Relative tolerance of the conjugate gradient solver. Defaults to 1e-6.
+        max_iter (int): Iteration limit of the conjugate gradient solver. Defaults to 1000.
+        dtype (torch.dtype): Dtype of the fit. Defaults to torch.float32.
+    """
+    def __init__(self, ridge: Optional[float] = None, h2: float = 0.5, solver: str = 'auto', direct_limit: int = 4096,
+                 tol: float = 1e-6, max_iter: int = 1000, dtype: torch.dtype = torch.float32):
+        if solver not in ('auto', 'direct', 'cg'):
+            raise ValueError(f"Unknown solver {solver!r}, expected 'auto', 'direct' or 'cg'.")
+        self.ridge = ridge
+        self.h2 = h2
+        self.solver = solver
+        self.direct_limit = direct_limit
+        self.tol = tol
+        self.max_iter = max_iter
+        self.dtype = dtype
+        self.effects = None
+
+    def fit(self, dosages: torch.Tensor, phenotypes: torch.Tensor) -> 'GenomicPredictor':
+        """
+        Fits marker effects on a training population.
+
+        Args:
+            dosages (torch.Tensor): Training dosages (..., n, p), e.g. `population.get_dosages().flatten(1)`.
+            phenotypes (torch.Tensor): Training phenotypes (..., n) or (..., n, n_traits).
+
+        Returns:
+            GenomicPredictor: The fitted model.
+        """
+        X = dosages.to(self.dtype)
+        self._single_trait = phenotypes.dim() == X.dim() - 1
+        y = phenotypes.to(self.dtype)
+        y = y.unsqueeze(-1) if self._single_trait else y
+
+        self.marker_means = X.mean(dim=-2, keepdim=True)
+        self.intercept = y.mean(dim=-2, keepdim=True)
+        X = X - self.marker_means
+        y = y - self.intercept
+        n, p = X.shape[-2:]
+        if self.ridge is not None:
+            ridge = torch.tensor(self.ridge, dtype=self.dtype)
+        else:
+            ridge = (X.var(dim=-2).sum(dim=-1) * (1 - self.h2) / self.h2)[..., None, None]
+        self.effects = self._solve(X, y, ridge, dual=n <= p)
+        return self
+
+    def update(self, dosages: torch.Tensor, phenotypes: torch.Tensor) -> 'GenomicPredictor':
+        """Absorbs a new training cohort; this model keeps no earlier data, so it is a refit (see `IncrementalGenomicPredictor`)."""
+        return self.fit(dosages, phenotypes)
+
+    def _solve(self, X: torch.Tensor, y: torch.Tensor, ridge: torch.Tensor, dual: bool) -> torch.Tensor:
+        """Marker effects from the n x n (dual) or p x p (primal) ridge system."""
+        m = X.shape[-2] if dual else X.shape[-1]
+        direct = self.solver == 'direct' or (self.solver == 'auto' and m <= self.direct_limit)
+        eye = torch.eye(m, dtype=self.dtype, device=X.device)
+        if dual:
+            if direct:
+                weights = torch.cholesky_solve(y, torch.linalg.cholesky(X @ X.mT + ridge * eye))
+            else:
+                weights = conjugate_gradient(lambda v: X @ (X.mT @ v) + ridge * v, y,
+                                             (X ** 2).sum(dim=-1, keepdim=True) + ridge, self.tol, self.max_iter)
+            return X.mT @ weights
+        Xy = X.mT @ y
+        if direct:
+            return torch.cholesky_solve(Xy, torch.linalg.cholesky(X.mT @ X + ridge * eye))
+        return conjugate_gradient(lambda v: X.mT @ (X @ v) + ridge * v, Xy,
+                                  (X ** 2).sum(dim=-2).unsqueeze(-1) + ridge, self.tol, self.max_iter)
+
+    def predict(self, dosages: torch.Tensor, batch_size: int = 65536) -> torch.Tensor:
+        """
+        Scores candidates in batches of individuals.
+
+        Args:
+            dosages (torch.Tensor): Candidate dosages (..., n_candidates, p).
+            batch_size (int): Candidates scored per matrix product. Defaults to 65536.
+
+        Returns:
+            torch.Tensor: GEBVs (..., n_candidates), or (..., n_candidates, n_traits) for multiple traits.
+        """
+        if self.effects is None:
+            raise RuntimeError("The model has to be fitted before predicting.")
+        scores = torch.cat([(batch.to(self.dtype) - self.marker_means) @ self.effects + self.intercept
+                            for batch in dosages.split(batch_size, dim=-2)], dim=-2)
+        return scores.squeeze(-1) if self._single_trait else scores
+
+# %% ../nbs/11_gebv.ipynb 8
+class IncrementalGenomicPredictor(GenomicPredictor):
+    """
+    Ridge-regression marker effects updated one cohort at a time from sufficient statistics.
+
+    An update costs O(k p^2) for k new records plus a warm-started solve of the p x p system, independent of
+    the number of records accumulated before.
+
+    Args:
+        ridge (Optional[float]): Ridge parameter lambda. Derived from `h2` when omitted.
+        h2 (float): Heritability used to derive the ridge parameter. Defaults to 0.5.
+        window (Optional[int]): Number of most recent cohorts to keep. Defaults to all cohorts, in which case
+                                only the statistics are stored and memory does not grow with the cohorts.
+        tol (float): Relative tolerance of the conjugate gradient solver. Defaults to 1e-6.
+        max_iter (int): Iteration limit of the conjugate gradient solver. Defaults to 1000.
+        dtype (torch.dtype): Dtype of the statistics; float64 keeps subtraction of old cohorts exact enough.
+                             Defaults to torch.float64.
+    """
+    def __init__(self, ridge: Optional[float] = None, h2: float = 0.5, window: Optional[int] = None,
+                 tol: float = 1e-6, max_iter: int = 1000, dtype: torch.dtype = torch.float64):
+        super().__init__(ridge, h2, solver='cg', tol=tol, max_iter=max_iter, dtype=dtype)
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Forgets all cohorts."""
+        self._cohorts = collections.deque()
+        self._statistics = None  # count, column sums of X and y, X'X and X'y
+        self.effects = None
+
+    def _accumulate(self, X: torch.Tensor, y: torch.Tensor, sign: int):
+        statistics = [X.shape[-2], X.sum(dim=-2, keepdim=True), y.sum(dim=-2, keepdim=True), X.mT @ X, X.mT @ y]
+        if self._statistics is None:
+            self._statistics = statistics
+        else:
+            self._statistics = [total + sign * new for total, new in zip(self._statistics, statistics)]
+
+    def update(self, dosages: torch.Tensor, phenotypes: torch.Tensor) -> 'IncrementalGenomicPredictor':
+        """
+        Absorbs a cohort of training records and re-solves the marker effects.
+
+        Args:
+            dosages (torch.Tensor): Dosages of the cohort (..., k, p).
+            phenotypes (torch.Tensor): Phenotypes of the cohort (..., k) or (..., k, n_traits).
+
+        Returns:
+            IncrementalGenomicPredictor: The updated model.
+        """
+        X = dosages.to(self.dtype)
+        self._single_trait = phenotypes.dim() == X.dim() - 1
+        y = phenotypes.to(self.dtype)
+        y = y.unsqueeze(-1) if self._single_trait else y
+        self._accumulate(X, y, 1)
+        if self.window is not None:
+            # only a window needs the records, to subtract them once they fall out of it
+            self._cohorts.append((X, y))
+            while len(self._cohorts) > self.window:
+                self._accumulate(*self._cohorts.popleft(), -1)
+
+        n, sum_x, sum_y, xtx, xty = self._statistics
+        self.marker_means, self.intercept = sum_x / n, sum_y / n
+        # centered statistics: X_c'X_c = X'X - n mean_x' mean_x and X_c'y_c = X'y - n mean_x' mean_y
+        gram = xtx - n * self.marker_means.mT @ self.marker_means
+        cross = xty - n * self.marker_means.mT @ self.intercept
+        if self.ridge is not None:
+            ridge = torch.tensor(self.ridge, dtype=self.dtype)
+        else:
+            ridge = (gram.diagonal(dim1=-2, dim2=-1).sum(dim=-1) / (n - 1) * (1 - self.h2) / self.h2)[..., None, None]
+        warm_start = self.effects if self.effects is not None and self.effects.shape == cross.shape else None
+        self.effects = conjugate_gradient(lambda v: gram @ v + ridge * v, cross,
+                                          gram.diagonal(dim1=-2, dim2=-1).unsqueeze(-1) + ridge,
+                                          self.tol, self.max_iter, warm_start)
+        return self
+
+    def fit(self, dosages: torch.Tensor, phenotypes: torch.Tensor) -> 'IncrementalGenomicPredictor':
+        """Fits on a single cohort, forgetting earlier ones."""
+        self.reset()
+        return self.update(dosages, phenotypes)
@@ -0,0 +1,115 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/17_generation.ipynb.
+
+# %% auto 0
+__all__ = ['generation_step', 'GenerationKernel']
+
+# %% ../nbs/17_generation.ipynb 3
+from .chewc import (Trait, NonAdditiveTrait, calculate_breeding_value, genetic_components, create_pop,
+                         create_random_pop)
+from typing import Tuple, Optional, List, Union
+
+import torch
+
+# %% ../nbs/17_generation.ipynb 5
+def _genetic_values(dosages: torch.Tensor, trait: Trait) -> torch.Tensor:
+    if isinstance(trait, NonAdditiveTrait):
+        return sum(genetic_components(dosages, trait))
+    return calculate_breeding_value(dosages, trait.effects)
+
+def generation_step(parents: torch.Tensor, progeny: torch.Tensor, trait: Trait, h2: float, n_selected: int, reps: int,
+                    recombination_rate: float = 0.1) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    One generation of phenotypic truncation selection, written into `progeny`.
+
+    Args:
+        parents (torch.Tensor): Diploid haplotypes ([n_replicates,] pop_size, 2, n_chr, n_loci).
+        progeny (torch.Tensor): Buffer of the same shape, overwritten with the next generation.
+        trait (Trait): The trait selected on, additive or a `NonAdditiveTrait`.
+        h2 (float): Heritability; the error variance follows from the genetic variance of `parents`.
+        n_selected (int): Parents selected per replicate; `n_selected * reps` must equal pop_size.
+        reps (int): Progeny per pair of parent gametes.
+        recombination_rate (float): Probability that a locus comes from the second homolog. Defaults to 0.1.
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor]: Phenotypes and genetic values of the parents ([n_replicates,] pop_size).
+    """
+    dosages = parents.sum(dim=-3, dtype=torch.float32)
+    genetic_values = _genetic_values(dosages, trait)
+    environmental_variance = (1 - h2) / h2 * genetic_values.var(dim=-1, keepdim=True)
+    phenotypes = genetic_values + torch.randn_like(genetic_values) * torch.sqrt(environmental_variance)
+    top = torch.topk(phenotypes, n_selected, dim=-1).indices
+    selected = torch.take_along_dim(parents, top[..., None, None, None], dim=-4)  # (..., n_selected, 2, n_chr, n_loci)
+    # one egg and one pollen gamete per selected parent: (..., 2, n_selected, n_chr, n_loci)
+    crossovers = torch.rand(*top.shape[:-1], 2, n_selected, *selected.shape[-2:], device=parents.device) < recombination_rate
+    gametes = torch.where(crossovers, selected[..., 1, :, :].unsqueeze(-4), selected[..., 0, :, :].unsqueeze(-4))
+    # every rep pairs a fresh permutation of the eggs with one of the pollen
+    shuffled = torch.rand(*top.shape[:-1], 2, reps, n_selected, device=parents.device).argsort(dim=-1).flatten(-2)
+    progeny.copy_(torch.take_along_dim(gametes, shuffled[..., None, None], dim=-3).movedim(-4, -3))
+    return phenotypes, genetic_values
+
+class GenerationKernel:
+    """
+    Runs `generation_step`, compiled, on two preallocated haplotype buffers that swap roles every generation.
+
+    Args:
+        G (Genome): Diploid genome of the population.
+        T (Trait): The trait selected on.
+        h2 (float): Heritability of the phenotypes.
+        reps (int): Progeny per pair of parent gametes.
+        pop_size (int): Individuals per generation.
+        selection_fraction (float): Share of the population selected as parents.
+        haplotypes (Optional[torch.Tensor]): Founder haplotypes ([n_replicates,] pop_size, 2, n_chr, n_loci).
+                                             Defaults to a random population.
+        n_replicates (Optional[int]): Independent programs along a leading axis when `haplotypes` is None.
+        recombination_rate (float): Probability that a locus comes from the second homolog. Defaults to 0.1.
+        dtype (torch.dtype): Dtype of the haplotype buffers. Defaults to torch.int8.
+        compile (bool): Whether to compile the step with `torch.compile`. Defaults to True.
+    """
+    def __init__(self, G, T: Trait, h2: float, reps: int, pop_size: int, selection_fraction: float,
+                 haplotypes: Optional[torch.Tensor] = None, n_replicates: Optional[int] = None,
+                 recombination_rate: float = 0.1, dtype: torch.dtype = torch.int8, compile: bool = True):
+        if G.ploidy != 2:
+            raise ValueError(f"generation_step breeds diploids, got a genome of ploidy {G.ploidy}.")
+        self.n_selected = int(pop_size * selection_fraction)
+        if self.n_selected * reps != pop_size:
+            raise ValueError(f"{self.n_selected} parents with {reps} reps give {self.n_selected * reps} progeny, "
+                             f"but the buffers hold pop_size={pop_size}.")
+        self.G, self.T, self.h2, self.reps = G, T, h2, reps
+        self.recombination_rate = recombination_rate
+        haplotypes = create_random_pop(G, pop_size, n_replicates) if haplotypes is None else haplotypes
+        # the buffers are overwritten in place, so they never alias the caller's founders
+        self._buffers = (haplotypes.to(dtype, copy=True), torch.empty_like(haplotypes, dtype=dtype))
+        self._current = 0
+        self._step = torch.compile(generation_step) if compile else generation_step
+
+    @property
+    def haplotypes(self) -> torch.Tensor:
+        """Haplotypes of the current generation; a view of a buffer that is overwritten two steps later."""
+        return self._buffers[self._current]
+
+    def population(self):
+        """The current generation as a `chewc.chewc.Population`, copied out of the buffers."""
+        return create_pop(self.G, self.haplotypes.clone())
+
+    def step(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Breeds the next generation into the idle buffer and swaps the buffers.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Phenotypes and genetic values of the parent generation
+                                               ([n_replicates,] pop_size).
+        """
+        parents, progeny = self._buffers[self._current], self._buffers[1 - self._current]
+        phenotypes, genetic_values = self._step(parents, progeny, self.T, self.h2, self.n_selected, self.reps,
+                                                self.recombination_rate)
+        self._current = 1 - self._current
+        return phenotypes, genetic_values
+
+    def run(self, n_generations: int) -> torch.Tensor:
+        """
+        Runs `n_generations` steps without reading anything back to the host.
+
+        Returns:
+            torch.Tensor: Mean genetic value of every parent generation (n_generations, [n_replicates]).
+        """
+        return torch.stack([self.step()[1].mean(dim=-1) for _ in range(n_generations)])
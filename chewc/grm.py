@@ -0,0 +1,111 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/10_grm.ipynb.
+
+# %% auto 0
+__all__ = ['GenomicRelationship', 'genomic_relationship_matrix']
+
+# %% ../nbs/10_grm.ipynb 3
+from .core import *
+from typing import Tuple, Optional, List, Union
+
+import torch
+
+# %% ../nbs/10_grm.ipynb 5
+class GenomicRelationship:
+    """
+    VanRaden genomic relationship matrix of a population, computed in tiles.
+
+    Args:
+        population (Population): Genotyped individuals; dense or packed storage.
+        frequencies (Optional[torch.Tensor]): Base allele frequencies (n_chromosomes, n_loci_per_chromosome)
+                                              used for centering. Defaults to the population's current
+                                              allele frequencies, which stay fixed across updates.
+        block_size (int): Number of individuals per tile. Defaults to 1024.
+        dtype (torch.dtype): Accumulation and output dtype, float32 or float64. Defaults to torch.float32.
+        path (Optional[str]): File to memory-map the matrix to. Defaults to an in-memory matrix.
+        capacity (Optional[int]): Number of individuals to allocate for. Defaults to the population size;
+                                  the matrix is re-laid out when it grows past it.
+    """
+    def __init__(self, population: Population, frequencies: Optional[torch.Tensor] = None, block_size: int = 1024,
+                 dtype: torch.dtype = torch.float32, path: Optional[str] = None, capacity: Optional[int] = None):
+        self.population = population
+        self.block_size = block_size
+        self.dtype = dtype
+        self.path = path
+        if frequencies is None:
+            frequencies = population.calculate_allele_frequencies()
+        ploidy = population.genome.ploidy
+        self.frequencies = frequencies.flatten().to(torch.float64)
+        self._offset = (ploidy * self.frequencies).to(dtype)
+        self._scale = float(ploidy * (self.frequencies * (1 - self.frequencies)).sum())
+
+        self.size = 0
+        self.capacity = 0
+        self._storage = None
+        self._reserve(capacity or population.size())
+        self.update()
+
+    @property
+    def matrix(self) -> torch.Tensor:
+        """The relationship matrix (n_individuals, n_individuals), a view of the (mapped) storage."""
+        return self._storage[:self.capacity * self.capacity].view(self.capacity, self.capacity)[:self.size, :self.size]
+
+    def _reserve(self, n: int):
+        """Grows the storage to hold at least `n` individuals, moving existing rows to their new stride."""
+        if n <= self.capacity:
+            return
+        capacity = max(n, 2 * self.capacity)
+        if self.path is None:
+            storage = torch.empty(capacity * capacity, dtype=self.dtype)
+            if self._storage is not None:
+                storage.view(capacity, capacity)[:self.size, :self.size] = self.matrix
+        else:
+            storage = torch.from_file(self.path, shared=True, size=capacity * capacity, dtype=self.dtype)
+            # in place, last row first: a row's new offset never overlaps a row that has not moved yet
+            for row in reversed(range(self.size)):
+                storage[row * capacity:row * capacity + self.size] = storage[row * self.capacity:row * self.capacity + self.size].clone()
+        self._storage, self.capacity = storage, capacity
+
+    def _centered(self, start: int, end: int) -> torch.Tensor:
+        """Centered dosages Z of individuals start:end (end - start, n_loci)."""
+        # gather the storage rows directly; select() would rebuild the allele accumulators of every tile
+        population = self.population
+        storage = population._storage[population._row(slice(start, end))]
+        if population.packed:
+            dosages = packed_dosages(storage, population.genome.n_loci_per_chromosome)
+        else:
+            dosages = storage.sum(dim=1, dtype=HAPLOTYPE_DTYPE)
+        return dosages.flatten(1).to(self.dtype) - self._offset
+
+    def update(self, population: Optional[Population] = None) -> torch.Tensor:
+        """
+        Adds the rows of individuals appended since the last update.
+
+        Args:
+            population (Optional[Population]): Population whose first rows are the individuals already in
+                                               the matrix. Defaults to the population given at construction.
+
+        Returns:
+            torch.Tensor: The updated relationship matrix.
+        """
+        if population is not None:
+            self.population = population
+        n_old, n = self.size, self.population.size()
+        self._reserve(n)
+        G = self._storage[:self.capacity * self.capacity].view(self.capacity, self.capacity)
+        for row_start in range(n_old, n, self.block_size):
+            row_end = min(row_start + self.block_size, n)
+            Z_rows = self._centered(row_start, row_end)
+            for col_start in range(0, row_end, self.block_size):
+                col_end = min(col_start + self.block_size, row_end)
+                Z_cols = Z_rows[col_start - row_start:] if col_start >= row_start else self._centered(col_start, col_end)
+                tile = Z_rows @ Z_cols[:col_end - col_start].T / self._scale
+                G[row_start:row_end, col_start:col_end] = tile
+                G[col_start:col_end, row_start:row_end] = tile.T
+        self.size = n
+        return self.matrix
+
+def genomic_relationship_matrix(population: Population, frequencies: Optional[torch.Tensor] = None,
+                                block_size: int = 1024, dtype: torch.dtype = torch.float32,
+                                path: Optional[str] = None) -> torch.Tensor:
+    """Builds the VanRaden genomic relationship matrix of `population` (see `GenomicRelationship`)."""
+    return GenomicRelationship(population, frequencies, block_size, dtype, path).matrix
@@ -0,0 +1,199 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/15_history.ipynb.
+
+# %% auto 0
+__all__ = ['HistoryLog']
+
+# %% ../nbs/15_history.ipynb 3
+from typing import Tuple, Optional, List, Union, Dict
+
+import glob
+import os
+
+import torch
+
+# %% ../nbs/15_history.ipynb 5
+class HistoryLog:
+    """
+    Per-generation statistics in a preallocated columnar buffer, flushed in batches.
+
+    Args:
+        path (Optional[str]): Directory for the `.pt` part files. Defaults to keeping flushed rows in memory.
+        capacity (int): Rows buffered between flushes. Defaults to 256.
+        dtype (torch.dtype): Dtype of the buffer. Defaults to torch.float64, which keeps counts exact.
+        device (Optional[torch.device]): Device of the buffer, e.g. that of the population. Defaults to the
+                                         device of the first tensor recorded.
+    """
+    def __init__(self, path: Optional[str] = None, capacity: int = 256, dtype: torch.dtype = torch.float64,
+                 device: Optional[torch.device] = None):
+        self.path = path
+        self.capacity = capacity
+        self.dtype = dtype
+        self.device = None if device is None else torch.device(device)
+        self._layout = {}  # name -> (offset, shape, dtype); the presence flag follows the values
+        self._width = 0
+        self._buffer = None
+        self._row = 0
+        self._parts = []  # flushed (layout, rows) pairs, or part file names with a path
+        self._part_sizes = []
+        self._n_flushed = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __len__(self) -> int:
+        return self._n_flushed + self._row
+
+    def _add_columns(self, columns: Dict[str, Tuple[Tuple[int, ...], torch.dtype]]):
+        """Lays out new columns after the existing ones, growing the buffer geometrically when it is full."""
+        width = self._width
+        for name, (shape, dtype) in columns.items():
+            self._layout[name] = (width, tuple(shape), dtype)
+            width += int(torch.Size(shape).numel()) + 1
+        if self._buffer is None or width > self._buffer.shape[1]:
+            allocated = width if self._buffer is None else max(width, 2 * self._buffer.shape[1])
+            buffer = torch.full((self.capacity, allocated), float('nan'), dtype=self.dtype, device=self.device)
+            if self._buffer is not None:
+                buffer[:, :self._width] = self._buffer[:, :self._width]
+            self._buffer = buffer
+        self._width = width
+
+    def record(self, **values):
+        """
+        Appends a row. Values are tensors or numbers of a fixed shape per column; new columns may appear at any row.
+
+        Values are copied into the buffer on its device, so tensors on that device are never read on the host.
+        """
+        if self._row == self.capacity:
+            self.flush()
+        if self.device is None:
+            self.device = next((value.device for value in values.values() if isinstance(value, torch.Tensor)),
+                               torch.device('cpu'))
+        # the columns of a row are laid out together, e.g. all columns of the first row in one allocation
+        new_columns = {name: ((tuple(value.shape), value.dtype) if isinstance(value, torch.Tensor)
+                              else ((), torch.as_tensor(value).dtype))
+                       for name, value in values.items() if name not in self._layout}
+        if new_columns:
+            self._add_columns(new_columns)
+        row = self._buffer[self._row]
+        for name, value in values.items():
+            offset, shape, _ = self._layout[name]
+            if not isinstance(value, torch.Tensor):
+                if shape != ():
+                    raise ValueError(f"Column {name!r} has shape {shape}, got a number.")
+                row[offset] = value
+                row[offset + 1] = 1.0
+                continue
+            if tuple(value.shape) != shape:
+                raise ValueError(f"Column {name!r} has shape {shape}, got a value of shape {tuple(value.shape)}.")
+            numel = value.numel()
+            row[offset:offset + numel] = value.detach().flatten()  # copy_ casts to the buffer's dtype and device
+            row[offset + numel] = 1.0
+        self._row += 1
+
+    def _columns_of(self, layout: Dict, rows: torch.Tensor) -> Dict[str, Tuple[torch.Tensor, torch.Tensor]]:
+        """Splits host rows into (values, present) per column, in the dtypes they were recorded with."""
+        columns = {}
+        for name, (offset, shape, dtype) in layout.items():
+            numel = int(torch.Size(shape).numel())
+            values = rows[:, offset:offset + numel].reshape(len(rows), *shape)
+            values = values.to(dtype) if dtype.is_floating_point else values.nan_to_num(0).to(dtype)
+            columns[name] = (values, rows[:, offset + numel] == 1.0)
+        return columns
+
+    def flush(self):
+        """Moves the buffered rows to the host in one transfer and stores them as a part."""
+        if self._row == 0:
+            return
+        rows = self._buffer[:self._row, :self._width].to('cpu', copy=True)
+        layout = dict(self._layout)
+        if self.path is None:
+            self._parts.append((layout, rows))
+        else:
+            columns = self._columns_of(layout, rows)
+            tensors = {**{f'{name}': values for name, (values, _) in columns.items()},
+                       **{f'{name}.present': present for name, (_, present) in columns.items()}}
+            part = os.path.join(self.path, f'part_{len(self._parts):06d}.pt')
+            torch.save(tensors, part + '.tmp')
+            os.replace(part + '.tmp', part)
+            self._parts.append(part)
+        self._part_sizes.append(self._row)
+        self._n_flushed += self._row
+        self._row = 0
+        self._buffer.fill_(float('nan'))
+
+    def _read_part(self, part) -> Dict[str, Tuple[torch.Tensor, torch.Tensor]]:
+        if isinstance(part, str):
+            tensors = torch.load(part, weights_only=True)
+            return {name: (values, tensors[f'{name}.present'])
+                    for name, values in tensors.items() if not name.endswith('.present')}
+        return self._columns_of(*part)
+
+    def _buffered(self) -> Dict[str, Tuple[torch.Tensor, torch.Tensor]]:
+        return self._columns_of(self._layout, self._buffer[:self._row, :self._width].cpu())
+
+    def columns(self) -> Dict[str, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        Every column over all rows, flushed or buffered.
+
+        Returns:
+            Dict[str, Tuple[torch.Tensor, torch.Tensor]]: Values (n_rows, *shape), NaN (0 for integer columns)
+                                                          where the column was not recorded, and the
+                                                          presence mask (n_rows,).
+        """
+        parts = [self._read_part(part) for part in self._parts]
+        sizes = list(self._part_sizes)
+        if self._row:
+            parts.append(self._buffered())
+            sizes.append(self._row)
+        columns = {}
+        for name, (_, shape, dtype) in self._layout.items():
+            values, present = [], []
+            for part, n_rows in zip(parts, sizes):
+                if name in part:
+                    values.append(part[name][0])
+                    present.append(part[name][1])
+                else:
+                    values.append(torch.full((n_rows, *shape), float('nan') if dtype.is_floating_point else 0, dtype=dtype))
+                    present.append(torch.zeros(n_rows, dtype=torch.bool))
+            columns[name] = (torch.cat(values), torch.cat(present))
+        return columns
+
+    @staticmethod
+    def _records(columns: Dict, indices) -> List[Dict]:
+        to_python = lambda value: value.item() if value.dim() == 0 else value.tolist()
+        return [{name: to_python(values[i]) for name, (values, present) in columns.items() if present[i]}
+                for i in indices]
+
+    def __getitem__(self, key: Union[str, int, slice]):
+        """A column (n_rows, *shape) by name, or the row dict(s) of a generation index or slice."""
+        if isinstance(key, str):
+            return self.columns()[key][0]
+        if isinstance(key, slice):
+            return self._records(self.columns(), range(len(self))[key])
+        # a single row only reads the part holding it
+        index = range(len(self))[key]
+        if index >= self._n_flushed:
+            return self._records(self._buffered(), [index - self._n_flushed])[0]
+        for part, size in zip(self._parts, self._part_sizes):
+            if index < size:
+                return self._records(self._read_part(part), [index])[0]
+            index -= size
+
+    def __iter__(self):
+        return iter(self[:])
+
+    @classmethod
+    def load(cls, path: str) -> 'HistoryLog':
+        """Reopens the flushed part files under `path`."""
+        log = cls(path, device='cpu')
+        log._parts = sorted(glob.glob(os.path.join(path, 'part_*.pt')))
+        parts = [log._read_part(part) for part in log._parts]
+        log._part_sizes = [len(next(iter(part.values()))[0]) for part in parts]
+        log._n_flushed = sum(log._part_sizes)
+        columns = {}
+        for part in parts:
+            for name, (values, _) in part.items():
+                if name not in log._layout:
+                    columns.setdefault(name, (tuple(values.shape[1:]), values.dtype))
+        if columns:
+            log._add_columns(columns)
+        return log
@@ -0,0 +1,110 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/13_ld.ipynb.
+
+# %% auto 0
+__all__ = ['band_distances', 'window_for_distance', 'banded_ld', 'windowed_ld', 'ld_decay']
+
+# %% ../nbs/13_ld.ipynb 3
+from .core import *
+from .metrics import register_metric
+from typing import Tuple, Optional, List, Union
+
+import torch
+
+# %% ../nbs/13_ld.ipynb 5
+def band_distances(genetic_map: torch.Tensor, window: int) -> torch.Tensor:
+    """
+    Map distances between every marker and the next `window` markers of its chromosome.
+
+    Args:
+        genetic_map (torch.Tensor): Marker positions in cM (n_chromosomes, n_loci).
+        window (int): Number of following markers.
+
+    Returns:
+        torch.Tensor: Distances in cM (n_chromosomes, n_loci, window), inf past the chromosome end.
+    """
+    n_loci = genetic_map.shape[-1]
+    padded = torch.nn.functional.pad(genetic_map, (0, window), value=float('inf'))
+    partners = torch.arange(n_loci, device=genetic_map.device).view(-1, 1) + torch.arange(1, window + 1, device=genetic_map.device)
+    return padded[..., partners] - genetic_map.unsqueeze(-1)
+
+def window_for_distance(genetic_map: torch.Tensor, max_distance: float) -> int:
+    """Largest number of following markers within `max_distance` cM of any marker."""
+    following = torch.searchsorted(genetic_map.contiguous(), (genetic_map + max_distance).contiguous(), right=True)
+    return max(int((following - torch.arange(1, genetic_map.shape[-1] + 1, device=genetic_map.device)).max()), 1)
+
+def banded_ld(dosages: torch.Tensor, window: int) -> torch.Tensor:
+    """
+    r² between every marker and the next `window` markers of its chromosome.
+
+    Args:
+        dosages (torch.Tensor): Dosages (..., n_individuals, n_chromosomes, n_loci).
+        window (int): Number of following markers paired with every marker.
+
+    Returns:
+        torch.Tensor: r² (..., n_chromosomes, n_loci, window), NaN past the chromosome end.
+    """
+    X = dosages.float()
+    centered = X - X.mean(dim=-3, keepdim=True)
+    standardized = centered / centered.pow(2).mean(dim=-3, keepdim=True).sqrt()
+    n_loci = X.shape[-1]
+    r2 = torch.full((*X.shape[:-3], *X.shape[-2:], window), float('nan'), device=X.device)
+    for offset in range(1, min(window, n_loci - 1) + 1):
+        correlation = (standardized[..., :-offset] * standardized[..., offset:]).mean(dim=-3)
+        r2[..., :n_loci - offset, offset - 1] = correlation ** 2
+    return r2
+
+def windowed_ld(dosages: torch.Tensor, genetic_map: torch.Tensor, max_distance: Optional[float] = None,
+                window: Optional[int] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Banded r² limited to a map distance and/or a number of markers.
+
+    Args:
+        dosages (torch.Tensor): Dosages (..., n_individuals, n_chromosomes, n_loci).
+        genetic_map (torch.Tensor): Marker positions in cM (n_chromosomes, n_loci), e.g. `genome.genetic_map`.
+        max_distance (Optional[float]): Largest map distance in cM of a pair.
+        window (Optional[int]): Largest number of markers between a pair. At least one limit is required.
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor]: r² (..., n_chromosomes, n_loci, window) with NaN outside the
+                                           limits, and the pair distances (n_chromosomes, n_loci, window).
+    """
+    if max_distance is None and window is None:
+        raise ValueError("Give a max_distance, a window or both.")
+    if max_distance is not None:
+        distance_window = window_for_distance(genetic_map, max_distance)
+        window = distance_window if window is None else min(window, distance_window)
+    distances = band_distances(genetic_map, window)
+    r2 = banded_ld(dosages, window)
+    if max_distance is not None:
+        r2 = r2.masked_fill(distances > max_distance, float('nan'))
+    return r2, distances
+
+def ld_decay(r2: torch.Tensor, distances: torch.Tensor, bin_edges: torch.Tensor) -> torch.Tensor:
+    """
+    Mean r² of the pairs in each distance bin.
+
+    Args:
+        r2 (torch.Tensor): Banded r² (..., n_chromosomes, n_loci, window), e.g. from `windowed_ld`.
+        distances (torch.Tensor): Pair distances (n_chromosomes, n_loci, window).
+        bin_edges (torch.Tensor): Increasing bin edges in cM (n_bins + 1,).
+
+    Returns:
+        torch.Tensor: Mean r² per bin (..., n_bins), NaN for empty bins.
+    """
+    n_bins = len(bin_edges) - 1
+    bins = torch.bucketize(distances.flatten(), bin_edges.to(distances.device), right=True) - 1
+    bins = torch.where((bins >= 0) & (bins < n_bins), bins, n_bins)  # out of range pairs go to a dropped bin
+    values = r2.flatten(-3)
+    observed = ~torch.isnan(values)
+    sums = torch.zeros(*values.shape[:-1], n_bins + 1, device=values.device).index_add_(-1, bins, values.nan_to_num(0.0))
+    counts = torch.zeros_like(sums).index_add_(-1, bins, observed.float())
+    return (sums / counts)[..., :n_bins]
+
+@register_metric('ld_decay')
+def _ld_decay(metrics):
+    # needs `genetic_map`; `ld_bin_edges` in cM defaults to 0.5 cM bins up to 5 cM
+    genetic_map = metrics.context['genetic_map']
+    bin_edges = metrics.context.get('ld_bin_edges', torch.linspace(0, 5, 11))
+    dosages = metrics.dosages.view(*metrics.dosages.shape[:-1], *genetic_map.shape)
+    r2, distances = windowed_ld(dosages, genetic_map, max_distance=float(bin_edges[-1]))
+    return ld_decay(r2, distances, bin_edges)
@@ -0,0 +1,194 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/16_mating.ipynb.
+
+# %% auto 0
+__all__ = ['self_population', 'doubled_haploids', 'single_seed_descent', 'topcross', 'backcross', 'three_way_crosses']
+
+# %% ../nbs/16_mating.ipynb 3
+from .core import *
+from .meiosis import *
+from .pedigree import *
+from .cross import make_crosses, homolog_pairing
+from typing import Tuple, Optional, List, Union
+
+import torch
+
+# %% ../nbs/16_mating.ipynb 5
+def _positions(population: Population, positions: Optional[torch.Tensor]) -> torch.Tensor:
+    """Parent positions as a long tensor on the population device, all individuals when omitted."""
+    if positions is None:
+        return torch.arange(population.size(), device=population.ids.device)
+    return torch.as_tensor(positions, dtype=torch.long, device=population.ids.device).view(-1)
+
+def _gametes(genome: Genome, haplotypes: torch.Tensor, reps: int = 1) -> torch.Tensor:
+    """`reps` gametes of every individual of a haplotype tensor, grouped by individual (n * reps, ploidy // 2, chr, loci)."""
+    return simulate_gametes(genome, haplotypes, reps=reps).flatten(0, 1)
+
+def self_population(genome: Genome, population: Population, parents: Optional[torch.Tensor] = None,
+                    n_progeny: Union[int, torch.Tensor] = 1, pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Selfs every parent.
+
+    Args:
+        genome (Genome): Genome object.
+        population (Population): Parent population.
+        parents (Optional[torch.Tensor]): Positions of the parents. Defaults to the whole population.
+        n_progeny (Union[int, torch.Tensor]): Progeny per parent, one number or one per parent.
+        pedigree (Optional[Pedigree]): Pedigree to record the progeny in; their ids are `pedigree.last_cohort()`.
+                                       Defaults to `population.pedigree`.
+
+    Returns:
+        torch.Tensor: Progeny haplotypes (n_progeny, ploidy, chr, loci).
+    """
+    parents = _positions(population, parents)
+    return make_crosses(genome, population, torch.stack([parents, parents], dim=1), n_progeny, pedigree)
+
+def doubled_haploids(genome: Genome, population: Population, parents: Optional[torch.Tensor] = None,
+                     n_lines: int = 1, pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Doubled haploid lines: one recombined gamete of a parent, duplicated to the full ploidy.
+
+    Args:
+        genome (Genome): Genome object.
+        population (Population): Parent population, usually F1s.
+        parents (Optional[torch.Tensor]): Positions of the parents. Defaults to the whole population.
+        n_lines (int): Lines per parent. Defaults to 1.
+        pedigree (Optional[Pedigree]): Pedigree to record the lines in, as selfs of their parent; their
+                                       pedigree inbreeding therefore understates the actual homozygosity.
+                                       Their ids are `pedigree.last_cohort()`. Defaults to `population.pedigree`.
+
+    Returns:
+        torch.Tensor: Fully homozygous haplotypes (n_parents * n_lines, ploidy, chr, loci).
+    """
+    pedigree = population.pedigree if pedigree is None else pedigree
+    parents = _positions(population, parents).repeat_interleave(n_lines)
+    gametes = population.get_gametes(parents, crossover_masks(genome, (len(parents), genome.ploidy // 2)),
+                                     homolog_pairing(genome, (len(parents),)))
+    if pedigree is not None:
+        parent_ids = population.ids[parents]
+        pedigree.add(parent_ids, parent_ids)
+    return torch.cat([gametes, gametes], dim=1)
+
+def single_seed_descent(genome: Genome, population: Population, generations: int,
+                        parents: Optional[torch.Tensor] = None, pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Single-seed descent: every line is advanced by `generations` rounds of selfing with one seed per plant.
+
+    The crossovers (and polyploid pairings) of both gametes of every line in all generations are drawn in
+    one call. The generations are then composed on a map of the parental homolog every locus descends
+    from, and the parents' haplotypes are gathered once, so no intermediate generation is built.
+
+    Args:
+        genome (Genome): Genome object.
+        population (Population): Parent population, e.g. F2 plants.
+        generations (int): Number of selfing generations.
+        parents (Optional[torch.Tensor]): Positions of the founders of the lines. Defaults to the whole population.
+        pedigree (Optional[Pedigree]): Pedigree to record every generation in; the ids of the lines are
+                                       `pedigree.last_cohort()`. Defaults to `population.pedigree`.
+
+    Returns:
+        torch.Tensor: Haplotypes of the lines (n_lines, ploidy, chr, loci).
+    """
+    pedigree = population.pedigree if pedigree is None else pedigree
+    parents = _positions(population, parents)
+    ploidy = genome.ploidy
+    # (generations, n_lines, egg/pollen, ploidy // 2, chr, loci)
+    masks = crossover_masks(genome, (generations, len(parents), 2, ploidy // 2))
+    pairing = homolog_pairing(genome, (generations, len(parents), 2))
+    source = None
+    for generation in range(generations):
+        # the homolog of the previous generation that every homolog copies at every locus
+        homologs = (masks[generation].long() if pairing is None
+                    else bivalent_homologs(pairing[generation], masks[generation])).flatten(1, 2)
+        source = homologs if source is None else torch.gather(source, 1, homologs)
+    lines = torch.gather(population.get_genotypes(parents), 1, source)
+    if pedigree is not None:
+        ids = population.ids[parents]
+        for _ in range(generations):
+            ids = pedigree.add(ids, ids)
+    return lines
+
+def _cross_progeny(genome: Genome, mothers: torch.Tensor, mother_ids: Optional[torch.Tensor], population: Population,
+                   fathers: torch.Tensor, n_progeny: int, pedigree: Optional[Pedigree]) -> torch.Tensor:
+    """Crosses a haplotype tensor of mothers with fathers at positions of `population`, `n_progeny` each."""
+    fathers = fathers.repeat_interleave(n_progeny)
+    eggs = _gametes(genome, mothers, reps=n_progeny)
+    pollen = population.get_gametes(fathers, crossover_masks(genome, (len(fathers), genome.ploidy // 2)),
+                                    homolog_pairing(genome, (len(fathers),)))
+    if pedigree is not None:
+        pedigree.add(mother_ids.repeat_interleave(n_progeny), population.ids[fathers])
+    return torch.cat([eggs, pollen], dim=1)
+
+def topcross(genome: Genome, population: Population, lines: torch.Tensor, tester: Union[int, torch.Tensor],
+             n_progeny: Union[int, torch.Tensor] = 1, pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Crosses every line (as mother) to a common tester, or to one tester per line.
+
+    Args:
+        genome (Genome): Genome object.
+        population (Population): Population holding lines and testers.
+        lines (torch.Tensor): Positions of the lines (n_lines,).
+        tester (Union[int, torch.Tensor]): Position of the tester, or one per line (n_lines,).
+        n_progeny (Union[int, torch.Tensor]): Progeny per line, one number or one per line.
+        pedigree (Optional[Pedigree]): Pedigree to record the progeny in; their ids are `pedigree.last_cohort()`.
+                                       Defaults to `population.pedigree`.
+
+    Returns:
+        torch.Tensor: Progeny haplotypes (n_progeny, ploidy, chr, loci).
+    """
+    lines = _positions(population, lines)
+    testers = _positions(population, tester).expand(len(lines))
+    return make_crosses(genome, population, torch.stack([lines, testers], dim=1), n_progeny, pedigree)
+
+def backcross(genome: Genome, population: Population, donors: torch.Tensor, recurrent: Union[int, torch.Tensor],
+              generations: int = 1, n_progeny: int = 1, pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Backcrosses donors (e.g. F1s) to a recurrent parent for `generations` generations.
+
+    Every generation crosses one progeny per line, as mother, back to the recurrent parent. The last
+    generation yields `n_progeny` per line.
+
+    Args:
+        genome (Genome): Genome object.
+        population (Population): Population holding donors and recurrent parents.
+        donors (torch.Tensor): Positions of the donors (n_lines,).
+        recurrent (Union[int, torch.Tensor]): Position of the recurrent parent, or one per line (n_lines,).
+        generations (int): Number of backcross generations, 1 for BC1. Defaults to 1.
+        n_progeny (int): Progeny per line in the last generation. Defaults to 1.
+        pedigree (Optional[Pedigree]): Pedigree to record every generation in; the ids of the last one are
+                                       `pedigree.last_cohort()`. Defaults to `population.pedigree`.
+
+    Returns:
+        torch.Tensor: BC progeny haplotypes (n_lines * n_progeny, ploidy, chr, loci).
+    """
+    pedigree = population.pedigree if pedigree is None else pedigree
+    donors = _positions(population, donors)
+    recurrent = _positions(population, recurrent).expand(len(donors))
+    progeny = make_crosses(genome, population, torch.stack([donors, recurrent], dim=1),
+                           n_progeny if generations == 1 else 1, pedigree)
+    for generation in range(1, generations):
+        ids = None if pedigree is None else pedigree.last_cohort().to(donors.device)
+        progeny = _cross_progeny(genome, progeny, ids, population, recurrent,
+                                 n_progeny if generation == generations - 1 else 1, pedigree)
+    return progeny
+
+def three_way_crosses(genome: Genome, population: Population, plan: torch.Tensor, n_progeny: int = 1,
+                      pedigree: Optional[Pedigree] = None) -> torch.Tensor:
+    """
+    Three-way crosses (A x B) x C: one F1 of A x B per cross is crossed, as mother, to C.
+
+    Args:
+        genome (Genome): Genome object.
+        population (Population): Parent population.
+        plan (torch.Tensor): Positions of (A, B, C) for every cross (n_crosses, 3).
+        n_progeny (int): Progeny per three-way cross. Defaults to 1.
+        pedigree (Optional[Pedigree]): Pedigree to record the F1s and the progeny in; the ids of the progeny
+                                       are `pedigree.last_cohort()`. Defaults to `population.pedigree`.
+
+    Returns:
+        torch.Tensor: Progeny haplotypes (n_crosses * n_progeny, ploidy, chr, loci).
+    """
+    pedigree = population.pedigree if pedigree is None else pedigree
+    plan = torch.as_tensor(plan, dtype=torch.long, device=population.ids.device).view(-1, 3)
+    f1 = make_crosses(genome, population, plan[:, :2], 1, pedigree)
+    f1_ids = None if pedigree is None else pedigree.last_cohort().to(plan.device)
+    return _cross_progeny(genome, f1, f1_ids, population, plan[:, 2], n_progeny, pedigree)
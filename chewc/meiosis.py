@@ -1,88 +1,274 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/03_meiosis.ipynb.
 
 # %% auto 0
-__all__ = ['simulate_gametes', 'poisson_crossing_over']
+__all__ = ['sample_crossovers', 'sample_switch_loci', 'switch_masks', 'crossover_masks', 'pair_homologs', 'simulate_gametes',
+           'poisson_crossing_over', 'simulate_packed_gametes']
 
 # %% ../nbs/03_meiosis.ipynb 4
 import torch
 from .core import *
 from typing import Tuple, Optional, List, Union
 import torch
+import math
 
-def simulate_gametes(genome, parent_genomes, rate=1, shape=1, reps=1):
+def _max_crossovers(length_cm: float, rate: float = 1.0) -> int:
+    """Padding size that holds the chiasmata of a chromosome of `length_cm` with overwhelming probability."""
+    expected = 2 * rate * length_cm / 100
+    return int(expected + 6 * expected ** 0.5) + 6
+
+def _map_lengths(genome) -> Tuple[torch.Tensor, float]:
+    """Length in cM of every chromosome of the genetic map (its last locus) and the longest, cached per map tensor."""
+    cached = getattr(genome, '_map_lengths', None)
+    if cached is None or cached[0] is not genome.genetic_map:
+        lengths = genome.genetic_map[:, -1].float()
+        cached = (genome.genetic_map, lengths, float(lengths.max()))
+        genome._map_lengths = cached
+    return cached[1], cached[2]
+
+def sample_crossovers(chrom_lengths: torch.Tensor, n_gametes: int, rate: float = 1.0, shape: float = 1.0,
+                      p_no_interference: float = 0.0, max_crossovers: Optional[int] = None) -> Tuple[torch.Tensor, torch.Tensor]:
     """
-    Simulate the formation of gametes for multiple parents using vectorized operations.
+    Sample crossover locations for every gamete and chromosome at once.
+
+    With `shape=1` crossovers follow a Poisson process with rate/100 crossovers per cM. Other shapes
+    use the gamma model of crossover interference: chiasmata on the bivalent form a stationary
+    renewal process with Gamma(shape, 2 * shape) spacings (in Morgans), each passed to the gamete
+    with probability 1/2. `p_no_interference` mixes in a non-interfering Poisson pathway (Stahl model).
 
     Args:
-        genome (Genome): The Genome instance containing the genetic map and other parameters.
-        parent_genomes (torch.Tensor): Genomes of the parents.
-                                       Shape: (num_individuals, ploidy, num_chromosomes, num_loci)
-        rate (float): Rate parameter for the crossover model.
-        shape (float): Shape parameter for the crossover model.
-        reps (int): Number of repetitions to generate novel gametes.
+        chrom_lengths (torch.Tensor): A 1D tensor containing the lengths of the chromosomes in centiMorgans.
+        n_gametes (int): Number of gametes to sample.
+        rate (float): Crossovers per Morgan. Defaults to 1.
+        shape (float): Gamma interference parameter, 1 means no interference. Defaults to 1.
+        p_no_interference (float): Proportion of crossovers from the non-interfering pathway. Defaults to 0.
+        max_crossovers (Optional[int]): Padding size of the output. Derived from the longest chromosome
+                                        when omitted, which costs one device to host copy.
 
     Returns:
-        torch.Tensor: The resultant gametes.
-                      Shape: (num_individuals, reps, ploidy//2, num_chromosomes, num_loci)
+        Tuple[torch.Tensor, torch.Tensor]: Sorted crossover locations in cM padded with `inf`
+            (n_gametes, n_chromosomes, max_crossovers) and the number of crossovers (n_gametes, n_chromosomes).
+    """
+    device = chrom_lengths.device
+    if max_crossovers is None:
+        max_crossovers = _max_crossovers(float(chrom_lengths.max()), rate)
+    lengths = chrom_lengths.float() * rate / 100  # Morgans
+    batch_shape = (n_gametes, len(chrom_lengths))
+
+    if shape == 1 or p_no_interference >= 1:
+        counts = torch.poisson(lengths.expand(batch_shape)).clamp(max=max_crossovers)
+        positions = torch.rand(*batch_shape, max_crossovers, device=device) * lengths[:, None]
+        unused = torch.arange(max_crossovers, device=device) >= counts.unsqueeze(-1)
+    else:
+        # Interfering pathway: chiasmata of a stationary gamma renewal process, thinned by 1/2.
+        interfering_rate = 2 * shape * (1 - p_no_interference)
+        first = torch.rand(*batch_shape, 1, device=device) * torch.distributions.Gamma(
+            torch.tensor(shape + 1.0, device=device), torch.tensor(interfering_rate, device=device)).sample((*batch_shape, 1))
+        spacings = torch.distributions.Gamma(
+            torch.tensor(float(shape), device=device), torch.tensor(interfering_rate, device=device)).sample((*batch_shape, max_crossovers - 1))
+        chiasmata = torch.cat([first, first + spacings.cumsum(dim=-1)], dim=-1)
+        kept = (chiasmata < lengths[:, None]) & (torch.rand_like(chiasmata) < 0.5)
+        # Non-interfering pathway: Poisson crossovers with rate p_no_interference per Morgan.
+        poisson_counts = torch.poisson((lengths * p_no_interference).expand(batch_shape))
+        poisson_positions = torch.rand(*batch_shape, max_crossovers, device=device) * lengths[:, None]
+        poisson_kept = torch.arange(max_crossovers, device=device) < poisson_counts.unsqueeze(-1)
+
+        positions = torch.cat([chiasmata, poisson_positions], dim=-1)
+        unused = ~torch.cat([kept, poisson_kept], dim=-1)
+        counts = (~unused).sum(dim=-1).clamp(max=max_crossovers)
+
+    positions = positions.masked_fill(unused, float('inf'))
+    positions = torch.sort(positions, dim=-1).values[..., :max_crossovers] * 100 / rate
+    return positions, counts.long()
+
+def sample_switch_loci(genome, batch_shape: Tuple[int, ...], rate: float = 1.0, shape: float = 1.0,
+                       p_no_interference: float = 0.0) -> torch.Tensor:
+    """
+    Sample the loci at which each gamete switches between the two homologs of a pair.
+
+    Crossover locations come from `sample_crossovers` and are mapped onto loci of the genetic map.
+    Every chromosome is as long as its map, so chromosomes of different lengths get different numbers of
+    crossovers; crossovers beyond the last locus would not change the gamete and are not drawn.
+    A switch at locus 0 means the gamete starts on the second homolog, which happens with probability 1/2.
+
+    Args:
+        genome (Genome): The Genome instance containing the genetic map.
+        batch_shape (Tuple[int, ...]): Leading batch dimensions, e.g. (num_individuals, reps, ploidy//2).
+        rate (float): Crossovers per Morgan. Defaults to 1.
+        shape (float): Gamma interference parameter, 1 means no interference. Defaults to 1.
+        p_no_interference (float): Proportion of crossovers from the non-interfering pathway. Defaults to 0.
+
+    Returns:
+        torch.Tensor: Sorted switch loci padded with `num_loci` (*batch_shape, num_chromosomes, max_switches).
+    """
+    genetic_map = genome.genetic_map
+    num_chromosomes, num_loci = genetic_map.shape
+    n_gametes = math.prod(batch_shape)
+
+    chrom_lengths, longest = _map_lengths(genome)
+    positions, _ = sample_crossovers(chrom_lengths, n_gametes, rate, shape, p_no_interference,
+                                     max_crossovers=_max_crossovers(longest, rate))
+    # Locus index of every crossover; padding (inf) maps to num_loci.
+    loci = torch.searchsorted(genetic_map, positions.transpose(0, 1).reshape(num_chromosomes, -1).contiguous())
+    loci = loci.view(num_chromosomes, n_gametes, -1).transpose(0, 1)
+
+    start = torch.randint(0, 2, (n_gametes, num_chromosomes, 1), device=genetic_map.device) * -num_loci + num_loci
+    switch_loci = torch.sort(torch.cat([start, loci], dim=-1), dim=-1).values
+    return switch_loci.view(*batch_shape, num_chromosomes, -1)
+
+def switch_masks(switch_loci: torch.Tensor, num_loci: int) -> torch.Tensor:
+    """
+    Parity masks marking the loci inherited from the second homolog of a pair.
+
+    Args:
+        switch_loci (torch.Tensor): Switch loci padded with `num_loci` (..., max_switches), see `sample_switch_loci`.
+        num_loci (int): Number of loci per chromosome.
+
+    Returns:
+        torch.Tensor: Boolean masks (..., num_loci).
+    """
+    switches = torch.zeros(*switch_loci.shape[:-1], num_loci + 1, device=switch_loci.device, dtype=torch.uint8)
+    switches.scatter_add_(-1, switch_loci, torch.ones_like(switch_loci, dtype=torch.uint8))
+    masks = torch.cumsum(switches[..., :num_loci], dim=-1, dtype=torch.uint8) & 1  # uint8 wraps at 256, parity is kept
+    return masks.bool()
+
+def crossover_masks(genome, batch_shape: Tuple[int, ...], rate: float = 1.0, shape: float = 1.0,
+                    p_no_interference: float = 0.0) -> torch.Tensor:
     """
-    device = genome.device
-    genetic_map = genome.genetic_map  # torch.Size([num_chromosomes, num_loci])
-    num_individuals, ploidy, num_chromosomes, num_loci = parent_genomes.shape
+    Draw independent crossover parity masks for a batch of gametes in a single pass.
 
-    chromosome_lengths = genetic_map.max(dim=1).values
+    Switch loci come from `sample_switch_loci` and the cumulative parity of the switches marks the
+    loci inherited from the second homolog of a pair.
 
-    # Simulate crossover positions for all chromosomes at once
-    all_crossovers = poisson_crossing_over(chromosome_lengths)
+    Args:
+        genome (Genome): The Genome instance containing the genetic map.
+        batch_shape (Tuple[int, ...]): Leading batch dimensions, e.g. (num_individuals, reps, ploidy//2).
+        rate (float): Crossovers per Morgan. Defaults to 1.
+        shape (float): Gamma interference parameter, 1 means no interference. Defaults to 1.
+        p_no_interference (float): Proportion of crossovers from the non-interfering pathway. Defaults to 0.
+
+    Returns:
+        torch.Tensor: Boolean masks (*batch_shape, num_chromosomes, num_loci).
+    """
+    switch_loci = sample_switch_loci(genome, batch_shape, rate, shape, p_no_interference)
+    return switch_masks(switch_loci, genome.n_loci_per_chromosome)
 
-    # Initialize gametes tensor with an additional dimension for repetitions
-    gametes = torch.zeros(num_individuals, reps, ploidy // 2, num_chromosomes, num_loci, device=device, dtype=parent_genomes.dtype)
+def pair_homologs(batch_shape: Tuple[int, ...], ploidy: int, num_chromosomes: int, subgenomes: Optional[int] = None,
+                  preferential: float = 1.0, device: Union[str, torch.device] = 'cpu') -> torch.Tensor:
+    """
+    Randomly pair the homologs of every chromosome into bivalents.
 
-    for rep in range(reps):
-        for chr_idx in range(num_chromosomes):
-            crossovers = all_crossovers[chr_idx]
+    Any two homologs can pair, as in autopolyploids. With `subgenomes` the homologs are split into that
+    many consecutive groups, e.g. the A, B and D genomes of hexaploid wheat. With probability
+    `preferential` a chromosome pairs within its groups only (allopolyploids), and otherwise at random.
 
-            if len(crossovers) > 0:
-                crossover_mask = torch.zeros(num_loci, device=device, dtype=torch.bool)
-                positions_idx = torch.searchsorted(genetic_map[chr_idx], crossovers)
-                crossover_mask[positions_idx] = True
+    Args:
+        batch_shape (Tuple[int, ...]): Leading batch dimensions, e.g. (num_individuals, reps).
+        ploidy (int): Number of homologs per chromosome.
+        num_chromosomes (int): Number of chromosomes.
+        subgenomes (Optional[int]): Number of subgenomes, each with an even number of homologs. Defaults to None.
+        preferential (float): Probability of pairing within subgenomes. Defaults to 1.
+        device (Union[str, torch.device]): Device of the result. Defaults to 'cpu'.
 
-                parent_genome_1 = parent_genomes[:, ::2, chr_idx]
-                parent_genome_2 = parent_genomes[:, 1::2, chr_idx]
+    Returns:
+        torch.Tensor: Homolog order (*batch_shape, num_chromosomes, ploidy); entries 2k and 2k + 1 form bivalent k.
+    """
+    keys = torch.rand(*batch_shape, num_chromosomes, ploidy, device=device)
+    if subgenomes is not None:
+        group_size = ploidy // subgenomes
+        if group_size * subgenomes != ploidy or group_size % 2:
+            raise ValueError(f"Ploidy {ploidy} does not split into {subgenomes} subgenomes of an even number of homologs.")
+        groups = torch.arange(ploidy, device=device) // group_size
+        preferred = torch.rand(*batch_shape, num_chromosomes, 1, device=device) < preferential
+        keys = keys + preferred * groups  # sorting keeps the groups apart, shuffled within
+    return keys.argsort(dim=-1)
 
-                for ploid_idx in range(ploidy // 2):
-                    gametes[:, rep, ploid_idx, chr_idx] = torch.where(crossover_mask.unsqueeze(0),
-                                                                      parent_genome_1[:, ploid_idx],
-                                                                      parent_genome_2[:, ploid_idx])
-            else:
-                gametes[:, rep, :, chr_idx] = parent_genomes[:, ::2, chr_idx]
+def simulate_gametes(genome, parent_genomes, rate=1, shape=1, reps=1, p_no_interference=0.0, subgenomes=None,
+                     preferential=1.0):
+    """
+    Simulate the formation of gametes for multiple parents using vectorized operations.
 
-    return gametes
+    Crossovers are drawn independently for every individual, repetition, chromosome and homolog
+    pair (see `crossover_masks` and `sample_crossovers`), without Python loops over the batch.
+    Polyploid parents first pair their homologs into random bivalents per chromosome (see `pair_homologs`);
+    all bivalents then recombine in one batched gather.
 
-# Define your Genome class or struct here if needed, ensuring it includes 'device' and 'genetic_map'
+    Args:
+        genome (Genome): The Genome instance containing the genetic map and other parameters.
+        parent_genomes (torch.Tensor): Genomes of the parents.
+                                       Shape: (num_individuals, ploidy, num_chromosomes, num_loci), optionally
+                                       with a leading replicate axis (num_replicates, num_individuals, ...).
+        rate (float): Rate parameter for the crossover model (crossovers per Morgan).
+        shape (float): Shape parameter for the crossover model (gamma interference, 1 means none).
+        reps (int): Number of repetitions to generate novel gametes.
+        p_no_interference (float): Proportion of crossovers escaping interference (Stahl model).
+        subgenomes (Optional[int]): Subgenomes of an allopolyploid, see `pair_homologs`. Defaults to None.
+        preferential (float): Probability of pairing within subgenomes. Defaults to 1.
+
+    Returns:
+        torch.Tensor: The resultant gametes.
+                      Shape: (num_individuals, reps, ploidy//2, num_chromosomes, num_loci), after any leading replicate axis.
+    """
+    *batch_shape, ploidy, num_chromosomes, num_loci = parent_genomes.shape
+
+    masks = crossover_masks(genome, (*batch_shape, reps, ploidy // 2), rate, shape, p_no_interference)
+    if ploidy == 2:
+        # a single bivalent; the random start homolog of the masks already randomizes its orientation
+        first = parent_genomes[..., None, ::2, :, :]
+        second = parent_genomes[..., None, 1::2, :, :]
+        return torch.where(masks, second, first)
+    pairing = pair_homologs((*batch_shape, reps), ploidy, num_chromosomes, subgenomes, preferential, parent_genomes.device)
+    parents = parent_genomes.unsqueeze(-4).expand(*batch_shape, reps, ploidy, num_chromosomes, num_loci)
+    return torch.gather(parents, -3, bivalent_homologs(pairing, masks))
 
 def poisson_crossing_over(chrom_lengths: torch.Tensor) -> list:
     """
     Generate crossing over locations for each chromosome given its length.
 
+    Kept for backwards compatibility; use `sample_crossovers` to sample many gametes at once.
+
     Args:
     chrom_lengths (torch.Tensor): A 1D tensor containing the lengths of the chromosomes in centiMorgans.
 
     Returns:
     list of tensors: A list of tensors, each containing the crossing over locations for a chromosome.
     """
-    # Assuming 'tensor' is your tensor and 'indices' are your indices
-    if torch.cuda.is_available():
-      device = torch.device('cuda')
-    else:
-      device = torch.device('cpu')
-    crossing_over_locations = []
-    for length in chrom_lengths:
-        # Generate a random number of crossing over points for each chromosome
-        num_crossovers = torch.randint(1, 5, (1,)).item() # Random number between 1 and 5
-        # Generate random crossing over locations within the chromosome length
-        crossovers = torch.rand(num_crossovers).to(device) * length
-        # Sort the crossing over locations
-        crossovers, _ = torch.sort(crossovers)
-        crossing_over_locations.append(crossovers)
-
-    return crossing_over_locations
+    positions, counts = sample_crossovers(chrom_lengths, 1)
+    return [chromosome[:count] for chromosome, count in zip(positions[0], counts[0].tolist())]
+
+# %% ../nbs/03_meiosis.ipynb 9
+def simulate_packed_gametes(genome, packed_parents, reps=1, subgenomes=None, preferential=1.0, rate=1, shape=1,
+                            p_no_interference=0.0):
+    """
+    Simulate gametes from bit-packed parents with bitwise mask selection.
+
+    Crossovers follow the same model as `simulate_gametes`, and polyploid parents pair their homologs
+    into random bivalents as there.
+
+    Args:
+        genome (Genome): The Genome instance containing the genetic map and other parameters.
+        packed_parents (torch.Tensor): Packed haplotypes of the parents (see `pack_haplotypes`).
+                                       Shape: (num_individuals, ploidy, num_chromosomes, num_words), optionally
+                                       with a leading replicate axis.
+        reps (int): Number of repetitions to generate novel gametes.
+        subgenomes (Optional[int]): Subgenomes of an allopolyploid, see `pair_homologs`. Defaults to None.
+        preferential (float): Probability of pairing within subgenomes. Defaults to 1.
+        rate (float): Rate parameter for the crossover model (crossovers per Morgan).
+        shape (float): Shape parameter for the crossover model (gamma interference, 1 means none).
+        p_no_interference (float): Proportion of crossovers escaping interference (Stahl model).
+
+    Returns:
+        torch.Tensor: The packed gametes.
+                      Shape: (num_individuals, reps, ploidy//2, num_chromosomes, num_words), after any leading replicate axis.
+    """
+    *batch_shape, ploidy, num_chromosomes, num_words = packed_parents.shape
+    packed_masks = pack_haplotypes(crossover_masks(genome, (*batch_shape, reps, ploidy // 2), rate, shape,
+                                                   p_no_interference))
+    if ploidy == 2:
+        first = packed_parents[..., None, ::2, :, :]
+        second = packed_parents[..., None, 1::2, :, :]
+        return packed_select(first, second, packed_masks)
+    pairing = pair_homologs((*batch_shape, reps), ploidy, num_chromosomes, subgenomes, preferential, packed_parents.device)
+    parents = packed_parents.unsqueeze(-4).expand(*batch_shape, reps, ploidy, num_chromosomes, num_words)
+    homologs = pairing.transpose(-1, -2).unsqueeze(-1).expand(*batch_shape, reps, ploidy, num_chromosomes, num_words)
+    return packed_select(torch.gather(parents, -3, homologs[..., 0::2, :, :]),
+                         torch.gather(parents, -3, homologs[..., 1::2, :, :]), packed_masks)
@@ -0,0 +1,165 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/12_metrics.ipynb.
+
+# %% auto 0
+__all__ = ['DEFAULT_SCHEDULE', 'register_metric', 'available_metrics', 'PopulationMetrics', 'MetricsTracker']
+
+# %% ../nbs/12_metrics.ipynb 3
+from typing import Tuple, Optional, List, Union, Dict, Callable, Iterable
+
+import torch
+
+# %% ../nbs/12_metrics.ipynb 5
+_METRICS = {}
+
+def register_metric(name: str, summary: Optional[Callable[[torch.Tensor], torch.Tensor]] = None):
+    """
+    Registers `function(metrics) -> value` as metric `name`.
+
+    Args:
+        name (str): Name of the metric.
+        summary (Optional[Callable]): Reduces the value to what is tracked per generation. Defaults to the value.
+    """
+    def decorator(function):
+        _METRICS[name] = (function, summary)
+        return function
+    return decorator
+
+def available_metrics() -> List[str]:
+    """Names of all registered metrics."""
+    return list(_METRICS)
+
+class PopulationMetrics:
+    """
+    Statistics of one population snapshot, each computed on first access and then cached.
+
+    Args:
+        dosages (torch.Tensor): Dosages (..., n_individuals, n_markers); leading dims such as replicates are kept.
+        ploidy (int): Ploidy of the individuals. Defaults to 2.
+        **context: Extra inputs that metrics may use, e.g. `allele_counts` or `subpopulations`.
+    """
+    def __init__(self, dosages: torch.Tensor, ploidy: int = 2, **context):
+        self.dosages = dosages
+        self.ploidy = ploidy
+        self.context = context
+        self._values = {}
+
+    def __getitem__(self, name: str):
+        if name not in self._values:
+            if name not in _METRICS:
+                raise KeyError(f"Unknown metric {name!r}; registered metrics are {available_metrics()}.")
+            self._values[name] = _METRICS[name][0](self)
+        return self._values[name]
+
+    def summary(self, name: str):
+        """The tracked summary of metric `name`."""
+        summary = _METRICS[name][1]
+        return self[name] if summary is None else summary(self[name])
+
+_marker_mean = lambda value: value.mean(dim=-1)
+
+@register_metric('allele_frequencies', summary=_marker_mean)
+def _allele_frequencies(metrics):
+    # running `allele_counts` (..., n_markers) kept by the population avoid a pass over the dosages
+    if 'allele_counts' in metrics.context:
+        return metrics.context['allele_counts'].float() / (metrics.ploidy * metrics.dosages.size(-2))
+    return metrics.dosages.float().mean(dim=-2) / metrics.ploidy
+
+@register_metric('maf', summary=_marker_mean)
+def _maf(metrics):
+    frequencies = metrics['allele_frequencies']
+    return torch.minimum(frequencies, 1 - frequencies)
+
+@register_metric('heterozygous', summary=_marker_mean)
+def _heterozygous(metrics):
+    # heterozygous genotypes (..., n_individuals, n_markers), shared by the heterozygosity metrics
+    return (metrics.dosages > 0) & (metrics.dosages < metrics.ploidy)
+
+@register_metric('heterozygosity', summary=_marker_mean)
+def _heterozygosity(metrics):
+    return metrics['heterozygous'].float().mean(dim=-2)
+
+@register_metric('expected_heterozygosity', summary=_marker_mean)
+def _expected_heterozygosity(metrics):
+    frequencies = metrics['allele_frequencies']
+    return 2 * frequencies * (1 - frequencies)
+
+@register_metric('inbreeding_coefficient', summary=_marker_mean)
+def _inbreeding_coefficient(metrics):
+    observed = metrics['heterozygous'].float().mean(dim=-1)
+    return 1 - observed / metrics['expected_heterozygosity'].mean(dim=-1, keepdim=True)
+
+@register_metric('effective_population_size')
+def _effective_population_size(metrics):
+    n_individuals = metrics.dosages.size(-2)
+    return (n_individuals - 1) / (2 * torch.var(metrics['allele_frequencies'], dim=-1))
+
+@register_metric('genotype_frequencies', summary=lambda value: torch.tensor([len(counts) for _, counts in value]))
+def _genotype_frequencies(metrics):
+    # unique genotype rows and their frequencies, one pair per replicate
+    dosages = metrics.dosages.reshape(-1, *metrics.dosages.shape[-2:])
+    frequencies = []
+    for replicate in dosages:
+        unique, counts = torch.unique(replicate, dim=0, return_counts=True)
+        frequencies.append((unique, counts.float() / replicate.size(0)))
+    return frequencies
+
+@register_metric('ld_matrix', summary=lambda value: (value ** 2).nanmean(dim=(-2, -1)))
+def _ld_matrix(metrics):
+    # all-pairs marker correlation, O(n_markers^2) memory
+    centered = metrics.dosages.float() - metrics.dosages.float().mean(dim=-2, keepdim=True)
+    covariance = centered.transpose(-1, -2) @ centered
+    std = torch.sqrt(torch.diagonal(covariance, dim1=-2, dim2=-1))
+    return covariance / (std.unsqueeze(-1) * std.unsqueeze(-2))
+
+@register_metric('fst', summary=_marker_mean)
+def _fst(metrics):
+    # needs `subpopulations`: a list of index tensors into the individuals
+    subpopulations = metrics.context['subpopulations']
+    total = metrics['expected_heterozygosity']
+    within = torch.stack([2 * f * (1 - f) for f in
+                          (metrics.dosages[..., subpopulation, :].float().mean(dim=-2) / metrics.ploidy
+                           for subpopulation in subpopulations)]).mean(dim=0)
+    return (total - within) / total
+
+DEFAULT_SCHEDULE = {'allele_frequencies': 1, 'heterozygosity': 1, 'maf': 1,
+                    'inbreeding_coefficient': 1, 'effective_population_size': 1}
+
+class MetricsTracker:
+    """
+    Computes the summaries of scheduled metrics for each generation.
+
+    Args:
+        schedule (Optional[Union[Dict[str, int], Iterable[str]]]): Metric names mapped to "every k generations"
+                                                                  (0 for on demand only); a list of names
+                                                                  means every generation. Defaults to
+                                                                  `DEFAULT_SCHEDULE`.
+    """
+    def __init__(self, schedule: Optional[Union[Dict[str, int], Iterable[str]]] = None):
+        schedule = DEFAULT_SCHEDULE if schedule is None else schedule
+        self.schedule = dict(schedule) if isinstance(schedule, dict) else {name: 1 for name in schedule}
+        unknown = [name for name in self.schedule if name not in _METRICS]
+        if unknown:
+            raise KeyError(f"Unknown metrics {unknown}; registered metrics are {available_metrics()}.")
+
+    def due(self, generation: int) -> List[str]:
+        """Names of the metrics scheduled for `generation`."""
+        return [name for name, every in self.schedule.items() if every and generation % every == 0]
+
+    def compute(self, dosages: torch.Tensor, generation: int, on_demand: Iterable[str] = (), ploidy: int = 2,
+                **context) -> Dict[str, torch.Tensor]:
+        """
+        Summaries of the metrics due at `generation` plus those requested `on_demand`.
+
+        Args:
+            dosages (torch.Tensor): Dosages (..., n_individuals, n_markers).
+            generation (int): Generation number, checked against the schedule.
+            on_demand (Iterable[str]): Further metrics to compute this time.
+            ploidy (int): Ploidy of the individuals. Defaults to 2.
+            **context: Extra inputs for the metrics (see `PopulationMetrics`).
+
+        Returns:
+            Dict[str, torch.Tensor]: Summary per computed metric.
+        """
+        metrics = PopulationMetrics(dosages, ploidy, **context)
+        names = dict.fromkeys([*self.due(generation), *on_demand])
+        return {name: metrics.summary(name) for name in names}
@@ -0,0 +1,216 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/09_pedigree.ipynb.
+
+# %% auto 0
+__all__ = ['Pedigree']
+
+# %% ../nbs/09_pedigree.ipynb 3
+from typing import Tuple, Optional, List, Union
+
+import torch
+
+# %% ../nbs/09_pedigree.ipynb 5
+class Pedigree:
+    """
+    Append-only pedigree with one int32 column per parent; unknown parents are -1.
+
+    Args:
+        capacity (int): Initial number of rows allocated; the columns grow geometrically. Defaults to 1024.
+        max_cached (int): Largest number of individuals whose relationships are kept between cohorts.
+                          Defaults to 8192.
+    """
+    def __init__(self, capacity: int = 1024, max_cached: int = 8192):
+        self._mothers = torch.empty(capacity, dtype=torch.int32)
+        self._fathers = torch.empty(capacity, dtype=torch.int32)
+        self._levels = torch.empty(capacity, dtype=torch.int32)
+        self._size = 0
+        self._cohorts = []  # first id of every `add` call
+        self._last_start = 0  # first id of the last `add` call, even an empty one
+        self.max_cached = max_cached
+        # inbreeding of the first len(self._inbreeding) individuals, and the relationships among the
+        # last cohort and its parents, both extended on demand by `inbreeding`
+        self._inbreeding = torch.empty(0, dtype=torch.float64)
+        self._cached_ids, self._cached_relationships = None, None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def mothers(self) -> torch.Tensor:
+        return self._mothers[:self._size]
+
+    @property
+    def fathers(self) -> torch.Tensor:
+        return self._fathers[:self._size]
+
+    @property
+    def levels(self) -> torch.Tensor:
+        """Generation depth of every individual: 0 without known parents, else 1 + the deepest parent."""
+        return self._levels[:self._size]
+
+    def add(self, mother_ids: torch.Tensor, father_ids: torch.Tensor) -> torch.Tensor:
+        """
+        Appends a cohort of individuals with the given parents.
+
+        Args:
+            mother_ids (torch.Tensor): Pedigree ids of the mothers, any shape; -1 for unknown.
+            father_ids (torch.Tensor): Pedigree ids of the fathers, same shape as `mother_ids`.
+
+        Returns:
+            torch.Tensor: The ids of the new individuals, shaped like `mother_ids`.
+        """
+        mother_ids, father_ids = torch.as_tensor(mother_ids), torch.as_tensor(father_ids)
+        shape, device = mother_ids.shape, mother_ids.device
+        mothers = mother_ids.reshape(-1).to('cpu', torch.int32)
+        fathers = father_ids.reshape(-1).to('cpu', torch.int32)
+        parents = torch.cat([mothers, fathers])
+        if len(parents) and (parents.max() >= self._size or parents.min() < -1):
+            raise ValueError("Parents must already be in the pedigree (or -1 if unknown).")
+
+        n_new = len(mothers)
+        if self._size + n_new > len(self._mothers):
+            capacity = max(2 * len(self._mothers), self._size + n_new)
+            grow = lambda column: torch.cat([column[:self._size], torch.empty(capacity - self._size, dtype=torch.int32)])
+            self._mothers, self._fathers, self._levels = grow(self._mothers), grow(self._fathers), grow(self._levels)
+        parent_levels = torch.cat([self.levels, torch.tensor([-1], dtype=torch.int32)])
+        levels = 1 + torch.maximum(parent_levels[mothers.long()], parent_levels[fathers.long()])
+        self._mothers[self._size:self._size + n_new] = mothers
+        self._fathers[self._size:self._size + n_new] = fathers
+        self._levels[self._size:self._size + n_new] = levels
+        if n_new:
+            self._cohorts.append(self._size)
+        ids = torch.arange(self._size, self._size + n_new, device=device)
+        self._last_start = self._size
+        self._size += n_new
+        return ids.view(shape)
+
+    def last_cohort(self) -> torch.Tensor:
+        """Ids of the individuals appended by the last `add` call, e.g. the progeny of `make_crosses` (n_added,)."""
+        return torch.arange(self._last_start, self._size)
+
+    def add_founders(self, shape: Union[int, Tuple[int, ...]]) -> torch.Tensor:
+        """Appends founders with unknown parents and returns their ids in the given shape."""
+        unknown = torch.full((shape,) if isinstance(shape, int) else tuple(shape), -1, dtype=torch.int32)
+        return self.add(unknown, unknown)
+
+    def _mendelian_variances(self, inbreeding: torch.Tensor) -> torch.Tensor:
+        """Within-family variances d_i = 1/2 - (F_mother + F_father)/4 of the first len(inbreeding) individuals, with F = -1 for unknown parents."""
+        n = len(inbreeding)
+        parent_inbreeding = torch.cat([inbreeding, torch.tensor([-1.0], dtype=inbreeding.dtype)])
+        return 0.5 - 0.25 * (parent_inbreeding[self._mothers[:n].long()] + parent_inbreeding[self._fathers[:n].long()])
+
+    def relationships(self, ids: torch.Tensor, n: Optional[int] = None) -> torch.Tensor:
+        """
+        Rows of the numerator relationship matrix A = T D T' by Colleau's indirect method.
+
+        Both products with the triangular factor T are one vectorized sweep per generation level, so
+        no animal-by-animal loop is needed.
+
+        Args:
+            ids (torch.Tensor): Individuals whose rows are computed (k,).
+            n (Optional[int]): Only relate to the first `n` individuals. Defaults to all.
+
+        Returns:
+            torch.Tensor: Relationships A[ids, :n] (k, n) in float64.
+        """
+        n = self._size if n is None else n
+        ids = torch.as_tensor(ids, dtype=torch.long).view(-1)
+        if len(self._inbreeding) < n:
+            self.inbreeding()
+        variances = self._mendelian_variances(self._inbreeding[:n])
+        # unknown parents point at a sink column n that is zeroed between the sweeps
+        mothers = torch.where(self._mothers[:n] >= 0, self._mothers[:n].long(), n)
+        fathers = torch.where(self._fathers[:n] >= 0, self._fathers[:n].long(), n)
+        levels = self._levels[:n].long()
+        by_level = torch.argsort(levels, stable=True).split(torch.bincount(levels).tolist()) if n else []
+
+        x = torch.zeros(len(ids), n + 1, dtype=torch.float64)
+        x[torch.arange(len(ids)), ids] = 1.0
+        for members in reversed(by_level[1:]):  # y = T' x, youngest level first
+            x.index_add_(1, mothers[members], 0.5 * x[:, members])
+            x.index_add_(1, fathers[members], 0.5 * x[:, members])
+        x[:, n] = 0.0
+        x[:, :n] *= variances
+        for members in by_level[1:]:  # z = T D y, oldest level first
+            x[:, members] += 0.5 * (x[:, mothers[members]] + x[:, fathers[members]])
+        return x[:, :n]
+
+    def _relationships_among(self, ids: torch.Tensor, n: int) -> torch.Tensor:
+        """Relationships among sorted `ids` (all < n), from the cache when possible."""
+        if self._cached_ids is not None and len(self._cached_ids):
+            positions = torch.searchsorted(self._cached_ids, ids).clamp(max=len(self._cached_ids) - 1)
+            if (self._cached_ids[positions] == ids).all():
+                return self._cached_relationships[positions][:, positions]
+        if ((self._mothers[ids] < 0) & (self._fathers[ids] < 0)).all():
+            return torch.eye(len(ids), dtype=torch.float64)
+        chunk = max(1, 2**24 // max(n, 1))
+        return torch.cat([self.relationships(rows, n)[:, ids] for rows in ids.split(chunk)])
+
+    def _add_cohort(self, start: int, end: int):
+        """Inbreeding of the cohort start:end from the relationships among its parents."""
+        mothers, fathers = self._mothers[start:end].long(), self._fathers[start:end].long()
+        parents = torch.cat([mothers, fathers])
+        parents = torch.unique(parents[parents >= 0])
+        n_parents = len(parents)
+        # relationships among the parents, padded with a zero row and column for unknown parents
+        among = torch.zeros(n_parents + 1, n_parents + 1, dtype=torch.float64)
+        among[:n_parents, :n_parents] = self._relationships_among(parents, start)
+        m = torch.where(mothers >= 0, torch.searchsorted(parents, mothers), n_parents)
+        f = torch.where(fathers >= 0, torch.searchsorted(parents, fathers), n_parents)
+        inbreeding = 0.5 * among[m, f]
+        self._inbreeding = torch.cat([self._inbreeding, inbreeding])
+
+        if n_parents + end - start > self.max_cached:
+            self._cached_ids, self._cached_relationships = None, None
+            return
+        cross = 0.5 * (among[m] + among[f])  # A[cohort, parents | unknown]
+        within = 0.5 * (cross[:, m] + cross[:, f])
+        within.diagonal().copy_(1.0 + inbreeding)
+        cross = cross[:, :n_parents]
+        self._cached_ids = torch.cat([parents, torch.arange(start, end)])
+        self._cached_relationships = torch.cat([torch.cat([among[:n_parents, :n_parents], cross.T], dim=1),
+                                                torch.cat([cross, within], dim=1)])
+
+    def inbreeding(self) -> torch.Tensor:
+        """
+        Inbreeding coefficients of all individuals.
+
+        Cohorts (one per `add` call) are processed in order from the relationships among their parents.
+        These come from the cached relationships of the previous cohort when possible, and from
+        `relationships` otherwise. Coefficients are cached, so repeated calls only process new cohorts.
+
+        Returns:
+            torch.Tensor: Inbreeding coefficients (n_individuals,) in float64.
+        """
+        bounds = self._cohorts + [self._size]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if start >= len(self._inbreeding):
+                self._add_cohort(start, end)
+        return self._inbreeding
+
+    def a_inverse(self) -> torch.Tensor:
+        """
+        Sparse inverse of the numerator relationship matrix from Henderson's rules with inbreeding.
+
+        Returns:
+            torch.Tensor: Coalesced sparse COO tensor (n_individuals, n_individuals) in float64.
+        """
+        n = self._size
+        b = 1.0 / self._mendelian_variances(self.inbreeding())
+        ids = torch.arange(n)
+        mothers, fathers = self.mothers.long(), self.fathers.long()
+        has_mother, has_father = mothers >= 0, fathers >= 0
+        both = has_mother & has_father
+
+        rows, cols, values = [ids], [ids], [b]
+        for parent, known in ((mothers, has_mother), (fathers, has_father)):
+            i, p, bk = ids[known], parent[known], b[known]
+            rows += [i, p, p]
+            cols += [p, i, p]
+            values += [-0.5 * bk, -0.5 * bk, 0.25 * bk]
+        m, f, bb = mothers[both], fathers[both], 0.25 * b[both]
+        rows += [m, f]
+        cols += [f, m]
+        values += [bb, bb]
+
+        indices = torch.stack([torch.cat(rows), torch.cat(cols)])
+        return torch.sparse_coo_tensor(indices, torch.cat(values), (n, n), check_invariants=False).coalesce()
@@ -0,0 +1,129 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/06_segments.ipynb.
+
+# %% auto 0
+__all__ = ['SegmentInheritance']
+
+# %% ../nbs/06_segments.ipynb 3
+from .core import *
+from .trait import *
+from .meiosis import *
+from typing import Tuple, Optional, List, Union
+
+import torch
+
+# %% ../nbs/06_segments.ipynb 5
+class SegmentInheritance:
+    """
+    Computes the breeding values of gametes and progeny from their crossover points.
+
+    Per-haplotype prefix sums of the (scaled) QTL effects are cached for a parent population once;
+    afterwards every gamete is valued from its switch loci (see `sample_switch_loci`) and homolog
+    pairing (see `pair_homologs`) without materializing its haplotypes.
+
+    Args:
+        genome (Genome): The genome object.
+        trait (TraitModule): Trait whose QTL effects are inherited.
+        parents (Population): Parent population whose haplotypes are cached.
+    """
+    def __init__(self, genome: Genome, trait: TraitModule, parents: Population):
+        self.genome = genome
+        self.trait = trait
+        self.parents = parents
+
+        alleles = parents.get_alleles(trait.qtl_indices).float()  # (n_parents, ploidy, n_qtl)
+        contributions = alleles.unsqueeze(-1) * trait.effects  # (n_parents, ploidy, n_qtl, n_traits)
+        self.prefix_sums = torch.nn.functional.pad(contributions.cumsum(dim=2), (0, 0, 1, 0))
+
+        # qtl_rank[c, t]: number of QTL before locus t of chromosome c in the flat QTL order
+        n_chr, n_loci = trait.qtl_loci.shape
+        qtl_counts = torch.nn.functional.pad(trait.qtl_loci.flatten().long().cumsum(0), (1, 0))
+        flat_loci = torch.arange(n_chr, device=qtl_counts.device).view(-1, 1) * n_loci + torch.arange(n_loci + 1, device=qtl_counts.device)
+        self.qtl_rank = qtl_counts[flat_loci]  # (n_chr, n_loci + 1)
+
+    def gamete_values(self, parent_indices: torch.Tensor, switch_loci: torch.Tensor,
+                      pairing: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Values gametes from their switch loci.
+
+        Prefix sums are only read at chromosome ends and switch ranks, so a gamete costs
+        O(n_chromosomes + crossovers) and no per-gamete slice of the QTL axis is built.
+
+        Args:
+            parent_indices (torch.Tensor): Parent of every gamete (n_gametes,).
+            switch_loci (torch.Tensor): Switch loci (n_gametes, ploidy//2, n_chromosomes, max_switches)
+                                        padded with `n_loci_per_chromosome`.
+            pairing (Optional[torch.Tensor]): Homolog order (n_gametes, n_chromosomes, ploidy) from `pair_homologs`;
+                                              entries 2k and 2k + 1 form bivalent k. Defaults to homologs
+                                              paired in order.
+
+        Returns:
+            torch.Tensor: Additive value of each gamete (n_gametes, n_traits), intercept excluded.
+        """
+        n_gametes, n_pairs, n_chr, max_switches = switch_loci.shape
+        if pairing is None:
+            pairing = self._ordered_pairing(n_gametes, n_chr, switch_loci.device)
+        parents = parent_indices.view(-1, 1, 1)
+        first = pairing[..., 0::2].transpose(-1, -2)  # (n_gametes, n_pairs, n_chr)
+        second = pairing[..., 1::2].transpose(-1, -2)
+        starts, ends = self.qtl_rank[:, 0], self.qtl_rank[:, -1]
+
+        # the first homolog over the whole chromosome, (n_gametes, n_pairs, n_chr, n_traits)
+        values = self.prefix_sums[parents, first, ends] - self.prefix_sums[parents, first, starts]
+        end_differences = self.prefix_sums[parents, second, ends] - self.prefix_sums[parents, first, ends]
+
+        # every switch flips the homolog for the rest of the chromosome; padding switches add 0
+        chromosomes = torch.arange(n_chr, device=switch_loci.device).view(1, 1, -1, 1)
+        ranks = self.qtl_rank[chromosomes, switch_loci]  # (n_gametes, n_pairs, n_chr, max_switches)
+        parents, first, second = parents.unsqueeze(-1), first.unsqueeze(-1), second.unsqueeze(-1)
+        differences = self.prefix_sums[parents, second, ranks] - self.prefix_sums[parents, first, ranks]
+        signs = 1 - 2 * (torch.arange(max_switches, device=switch_loci.device) % 2)
+        tails = (end_differences.unsqueeze(-2) - differences) * signs.view(-1, 1)
+
+        return values.sum(dim=(1, 2)) + tails.sum(dim=(1, 2, 3))
+
+    def _ordered_pairing(self, n_gametes: int, n_chr: int, device: Union[str, torch.device]) -> torch.Tensor:
+        """Homologs paired in order, (0, 1), (2, 3), ..., for every gamete and chromosome."""
+        return torch.arange(self.genome.ploidy, device=device).expand(n_gametes, n_chr, -1)
+
+    def cross(self, mother_indices: torch.Tensor, father_indices: torch.Tensor, materialize: bool = False,
+              rate: float = 1.0, shape: float = 1.0, p_no_interference: float = 0.0,
+              subgenomes: Optional[int] = None, preferential: float = 1.0
+              ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        Breeding values of progeny from crosses between cached parents.
+
+        Polyploid parents pair their homologs into random bivalents per gamete and chromosome, as in
+        `simulate_gametes`; the same pairing values the gametes and builds their haplotypes.
+
+        Args:
+            mother_indices (torch.Tensor): Mother of every progeny (n_progeny,).
+            father_indices (torch.Tensor): Father of every progeny (n_progeny,).
+            materialize (bool): Also build the progeny haplotypes. Defaults to False, which is enough
+                                for phenotype-only screening stages.
+            rate (float): Crossovers per Morgan. Defaults to 1.
+            shape (float): Gamma interference parameter. Defaults to 1.
+            p_no_interference (float): Proportion of non-interfering crossovers. Defaults to 0.
+            subgenomes (Optional[int]): Subgenomes of an allopolyploid, see `pair_homologs`. Defaults to None.
+            preferential (float): Probability of pairing within subgenomes. Defaults to 1.
+
+        Returns:
+            torch.Tensor: Breeding values (n_progeny, n_traits), plus haplotypes
+                          (n_progeny, ploidy, n_chromosomes, n_loci_per_chromosome) when `materialize` is set.
+        """
+        parent_indices = torch.cat([mother_indices, father_indices])
+        ploidy, n_chr = self.genome.ploidy, self.genome.n_chromosomes
+        switch_loci = sample_switch_loci(self.genome, (len(parent_indices), ploidy // 2), rate, shape, p_no_interference)
+        if ploidy == 2:
+            # a single bivalent; the random start homolog of the switches already randomizes its orientation
+            pairing = self._ordered_pairing(len(parent_indices), n_chr, switch_loci.device)
+        else:
+            pairing = pair_homologs((len(parent_indices),), ploidy, n_chr, subgenomes, preferential, switch_loci.device)
+        values = self.gamete_values(parent_indices, switch_loci, pairing)
+        breeding_values = values[:len(mother_indices)] + values[len(mother_indices):] + self.trait.intercepts
+        if not materialize:
+            return breeding_values
+
+        masks = switch_masks(switch_loci, self.genome.n_loci_per_chromosome)
+        gametes = self.parents.get_gametes(parent_indices, masks, pairing)
+        haplotypes = torch.cat([gametes[:len(mother_indices)], gametes[len(mother_indices):]], dim=1)
+        return breeding_values, haplotypes
@@ -0,0 +1,242 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/14_store.ipynb.
+
+# %% auto 0
+__all__ = ['PopulationStore']
+
+# %% ../nbs/14_store.ipynb 3
+from .core import *
+from .meiosis import simulate_packed_gametes
+from .pedigree import Pedigree
+from typing import Tuple, Optional, List, Union, Iterator
+
+import json
+import os
+
+import torch
+
+# %% ../nbs/14_store.ipynb 5
+class PopulationStore:
+    """
+    A population held in memory-mapped, bit-packed chunk files.
+
+    Args:
+        path (str): Directory of the store. An existing store is reopened.
+        genome (Genome): Genome of the individuals.
+        chunk_size (int): Individuals per chunk file, fixed when the store is created. Defaults to 65536.
+    """
+    def __init__(self, path: str, genome: Genome, chunk_size: int = 65536):
+        self.path = path
+        self.genome = genome
+        self._words = n_packed_words(genome.n_loci_per_chromosome)
+        self._chunks = {}
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if tuple(meta['shape']) != tuple(genome.shape()):
+                raise ValueError(f"The store holds haplotypes of shape {meta['shape']}, the genome has {genome.shape()}.")
+            chunk_size = meta['chunk_size']
+        else:
+            meta = {'n_individuals': 0, 'next_id': 0}
+        self.chunk_size = chunk_size
+        self.n_individuals = meta['n_individuals']
+        self._next_id = meta['next_id']
+        self._allele_counts = torch.from_file(os.path.join(path, 'allele_counts.bin'), shared=True,
+                                              size=genome.n_chromosomes * genome.n_loci_per_chromosome,
+                                              dtype=torch.long).view(genome.n_chromosomes, genome.n_loci_per_chromosome)
+        self._write_meta()
+
+    def _write_meta(self):
+        """Writes the metadata to a temporary file and renames it over the old one."""
+        meta = {'n_individuals': self.n_individuals, 'next_id': self._next_id, 'chunk_size': self.chunk_size,
+                'shape': list(self.genome.shape())}
+        meta_path = os.path.join(self.path, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _chunk(self, index: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Mapped haplotypes (chunk_size, ploidy, n_chromosomes, n_words) and ids (chunk_size, 3) of a chunk."""
+        if index not in self._chunks:
+            ploidy, n_chromosomes, _ = self.genome.shape()
+            haplotypes = torch.from_file(os.path.join(self.path, f'haplotypes_{index:06d}.bin'), shared=True,
+                                         size=self.chunk_size * ploidy * n_chromosomes * self._words, dtype=torch.uint8)
+            ids = torch.from_file(os.path.join(self.path, f'ids_{index:06d}.bin'), shared=True,
+                                  size=self.chunk_size * 3, dtype=torch.long)
+            self._chunks[index] = (haplotypes.view(self.chunk_size, ploidy, n_chromosomes, self._words),
+                                   ids.view(self.chunk_size, 3))
+        return self._chunks[index]
+
+    def __len__(self) -> int:
+        return self.n_individuals
+
+    def size(self) -> int:
+        """Returns the number of individuals in the store."""
+        return self.n_individuals
+
+    def append(self, haplotypes: torch.Tensor, mother_ids=None, father_ids=None, ids=None,
+               packed: bool = False) -> torch.Tensor:
+        """
+        Appends a batch of individuals to the store.
+
+        Args:
+            haplotypes (torch.Tensor): Haplotypes (n_new, ploidy, n_chromosomes, n_loci_per_chromosome),
+                                       or packed haplotypes (n_new, ploidy, n_chromosomes, n_words) with `packed`.
+            mother_ids (torch.Tensor, optional): Mother identifiers (n_new,). Defaults to -1.
+            father_ids (torch.Tensor, optional): Father identifiers (n_new,). Defaults to -1.
+            ids (torch.Tensor, optional): Identifiers of the new individuals, e.g. from a `Pedigree`.
+                                          Defaults to the ids following the largest id.
+            packed (bool): Whether `haplotypes` are already bit-packed. Defaults to False.
+
+        Returns:
+            torch.Tensor: The ids assigned to the new individuals.
+        """
+        words = haplotypes.cpu() if packed else pack_haplotypes(haplotypes.cpu().to(HAPLOTYPE_DTYPE))
+        n_new = words.shape[0]
+        ids = torch.arange(self._next_id, self._next_id + n_new) if ids is None else torch.as_tensor(ids).view(-1).cpu()
+        columns = [ids, *(torch.full((n_new,), -1) if parent_ids is None else torch.as_tensor(parent_ids).view(-1).cpu()
+                          for parent_ids in (mother_ids, father_ids))]
+        columns = torch.stack(columns, dim=1).long()
+
+        written = 0
+        while written < n_new:
+            index, offset = divmod(self.n_individuals + written, self.chunk_size)
+            n = min(self.chunk_size - offset, n_new - written)
+            chunk_haplotypes, chunk_ids = self._chunk(index)
+            chunk_haplotypes[offset:offset + n] = words[written:written + n]
+            chunk_ids[offset:offset + n] = columns[written:written + n]
+            written += n
+        self._allele_counts += packed_dosages(words, self.genome.n_loci_per_chromosome).sum(dim=0, dtype=torch.long)
+        self.n_individuals += n_new
+        self._next_id = max(self._next_id, int(ids.max()) + 1) if n_new > 0 else self._next_id
+        self._write_meta()
+        return ids
+
+    def batches(self, batch_size: Optional[int] = None, start: int = 0,
+                end: Optional[int] = None) -> Iterator[Tuple[int, torch.Tensor]]:
+        """
+        Iterates over consecutive individuals without crossing chunk boundaries.
+
+        Args:
+            batch_size (Optional[int]): Individuals per batch. Defaults to the chunk size.
+            start (int): First position. Defaults to 0.
+            end (Optional[int]): Position after the last one. Defaults to the store size.
+
+        Yields:
+            Tuple[int, torch.Tensor]: The first position of the batch and its mapped packed haplotypes
+                                      (batch, ploidy, n_chromosomes, n_words).
+        """
+        batch_size = batch_size or self.chunk_size
+        end = self.n_individuals if end is None else end
+        position = start
+        while position < end:
+            index, offset = divmod(position, self.chunk_size)
+            n = min(batch_size, self.chunk_size - offset, end - position)
+            yield position, self._chunk(index)[0][offset:offset + n]
+            position += n
+
+    def _gather(self, positions: torch.Tensor, column: Optional[int] = None) -> torch.Tensor:
+        """Gathers packed haplotypes (or one id column) of arbitrary positions, one chunk at a time."""
+        positions = torch.as_tensor(positions, dtype=torch.long).view(-1).cpu()
+        chunks, offsets = positions // self.chunk_size, positions % self.chunk_size
+        if column is None:
+            out = torch.empty((len(positions), self.genome.ploidy, self.genome.n_chromosomes, self._words), dtype=torch.uint8)
+        else:
+            out = torch.empty(len(positions), dtype=torch.long)
+        for index in chunks.unique().tolist():
+            in_chunk = (chunks == index).nonzero().squeeze(1)
+            haplotypes, ids = self._chunk(index)
+            out[in_chunk] = haplotypes[offsets[in_chunk]] if column is None else ids[offsets[in_chunk], column]
+        return out
+
+    def get_packed(self, positions: torch.Tensor) -> torch.Tensor:
+        """Packed haplotypes of the individuals at `positions` (n, ploidy, n_chromosomes, n_words)."""
+        return self._gather(positions)
+
+    def get_ids(self, positions: torch.Tensor) -> torch.Tensor:
+        """Ids of the individuals at `positions`."""
+        return self._gather(positions, column=0)
+
+    def get_parents(self, positions: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Mother and father ids of the individuals at `positions`."""
+        return self._gather(positions, column=1), self._gather(positions, column=2)
+
+    def population(self, start: int = 0, end: Optional[int] = None) -> Population:
+        """Loads individuals start:end into an in-memory packed `Population`."""
+        end = self.n_individuals if end is None else end
+        positions = torch.arange(start, end)
+        haplotypes = unpack_haplotypes(self.get_packed(positions), self.genome.n_loci_per_chromosome)
+        mother_ids, father_ids = self.get_parents(positions)
+        return Population(genome=self.genome, haplotypes=haplotypes.to(self.genome.device), ids=self.get_ids(positions),
+                          mother_ids=mother_ids, father_ids=father_ids, packed=True)
+
+    @property
+    def allele_counts(self) -> torch.Tensor:
+        """Number of copies of allele 1 at each locus (n_chromosomes, n_loci_per_chromosome)."""
+        return self._allele_counts
+
+    def calculate_allele_frequencies(self) -> torch.Tensor:
+        """Allele frequencies (n_chromosomes, n_loci_per_chromosome) from the running allele counts."""
+        return self._allele_counts.float() / (self.n_individuals * self.genome.ploidy)
+
+    def calculate_breeding_values(self, trait, batch_size: int = 65536) -> torch.Tensor:
+        """
+        Breeding values of every individual, streaming over the store.
+
+        Only the QTL bits of a batch are extracted before the product with the effects.
+
+        Args:
+            trait (TraitModule): Trait whose `qtl_indices` and effects are used.
+            batch_size (int): Individuals per batch. Defaults to 65536.
+
+        Returns:
+            torch.Tensor: Breeding values (n_individuals, n_traits).
+        """
+        n_loci = self.genome.n_loci_per_chromosome
+        chromosomes, loci = trait.qtl_indices.cpu() // n_loci, trait.qtl_indices.cpu() % n_loci
+        shifts = (loci % 8).to(torch.uint8)
+        breeding_values = []
+        for _, words in self.batches(batch_size):
+            alleles = (words[:, :, chromosomes, loci // 8] >> shifts) & 1
+            dosages = alleles.sum(dim=1, dtype=HAPLOTYPE_DTYPE).to(trait.effects.device)
+            breeding_values.append(trait.calculate_breeding_values(dosages))
+        return torch.cat(breeding_values) if breeding_values else torch.empty(0, trait.n_traits)
+
+    def cross(self, mothers: torch.Tensor, fathers: torch.Tensor, output: 'PopulationStore', reps: int = 1,
+              batch_size: int = 65536, pedigree: Optional[Pedigree] = None, rate: float = 1.0, shape: float = 1.0,
+              p_no_interference: float = 0.0) -> torch.Tensor:
+        """
+        Crosses individuals of this store and appends the progeny to `output`, `batch_size` crosses at a time.
+
+        Args:
+            mothers (torch.Tensor): Positions of the mothers (n_crosses,).
+            fathers (torch.Tensor): Positions of the fathers (n_crosses,).
+            output (PopulationStore): Store receiving the progeny, e.g. the next generation.
+            reps (int): Progeny per cross. Defaults to 1.
+            batch_size (int): Crosses per batch. Defaults to 65536.
+            pedigree (Optional[Pedigree]): Pedigree to record the progeny in; the store ids are pedigree ids.
+            rate (float): Crossovers per Morgan. Defaults to 1.
+            shape (float): Gamma interference parameter, 1 means no interference. Defaults to 1.
+            p_no_interference (float): Proportion of crossovers from the non-interfering pathway. Defaults to 0.
+
+        Returns:
+            torch.Tensor: Ids of the progeny (n_crosses * reps,), cross-major.
+        """
+        mothers = torch.as_tensor(mothers, dtype=torch.long).view(-1)
+        fathers = torch.as_tensor(fathers, dtype=torch.long).view(-1)
+        progeny_ids = []
+        for start in range(0, len(mothers), batch_size):
+            batch_mothers, batch_fathers = mothers[start:start + batch_size], fathers[start:start + batch_size]
+            device = self.genome.device
+            crossover_model = dict(rate=rate, shape=shape, p_no_interference=p_no_interference)
+            eggs = simulate_packed_gametes(self.genome, self.get_packed(batch_mothers).to(device), reps=reps,
+                                           **crossover_model)
+            pollen = simulate_packed_gametes(self.genome, self.get_packed(batch_fathers).to(device), reps=reps,
+                                             **crossover_model)
+            progeny = torch.cat([eggs, pollen], dim=2).flatten(0, 1)
+            mother_ids = self.get_ids(batch_mothers).repeat_interleave(reps)
+            father_ids = self.get_ids(batch_fathers).repeat_interleave(reps)
+            ids = None if pedigree is None else pedigree.add(mother_ids, father_ids)
+            progeny_ids.append(output.append(progeny, mother_ids, father_ids, ids=ids, packed=True))
+        return torch.cat(progeny_ids) if progeny_ids else torch.empty(0, dtype=torch.long)
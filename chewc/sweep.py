@@ -0,0 +1,117 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/08_sweep.ipynb.
+
+# %% auto 0
+__all__ = ['sweep_grid', 'run_sweep']
+
+# %% ../nbs/08_sweep.ipynb 3
+from .chewc import *
+from .pedigree import Pedigree
+from typing import Tuple, Optional, List, Union, Dict, Iterator
+
+import itertools
+import queue as queue_module
+from concurrent.futures import ProcessPoolExecutor
+import torch
+import torch.multiprocessing as mp
+
+# %% ../nbs/08_sweep.ipynb 5
+def sweep_grid(**parameters) -> List[Dict]:
+    """
+    Builds the full factorial of scenario parameters.
+
+    Args:
+        **parameters: Lists of values per parameter, e.g. `h2=[0.3, 0.6], pop_size=[100, 200]`.
+
+    Returns:
+        List[Dict]: One scenario dict per combination of values.
+    """
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*parameters.values())]
+
+_worker_state = {}
+
+def _init_worker(genome, trait, founders, queue, threads_per_worker):
+    """Pool initializer: limits torch threads and keeps the shared inputs of the sweep."""
+    torch.set_num_threads(threads_per_worker)
+    _worker_state.update(genome=genome, trait=trait, founders=founders, queue=queue)
+
+def _run_scenario(task):
+    """Runs one scenario in a worker and streams a record per generation back to the parent."""
+    index, scenario, seed, n_generations, pedigree = task
+    queue = _worker_state['queue']
+    try:
+        # the scenario's own stream; the worker's global RNG is left untouched
+        generator = torch.Generator().manual_seed(seed)
+        G, T, founders = _worker_state['genome'], _worker_state['trait'], _worker_state['founders']
+        pop_size = scenario['pop_size']
+        sim = BreedingSimulation(G, T, scenario['h2'], scenario['reps'], pop_size, scenario['selection_fraction'],
+                                 generator=generator)
+        sim.population = create_pop(G, founders[:pop_size], Pedigree() if pedigree else False)
+        n_selected = max(1, int(pop_size * scenario['selection_fraction']))
+        for _ in range(n_generations):
+            sim.step(n_selected)
+            # the statistics just recorded, without reading the history log back
+            record = {name: value.tolist() if isinstance(value, torch.Tensor) else value
+                      for name, value in sim.last_record.items()}
+            queue.put({'scenario': index, **scenario, **record})
+    finally:
+        # always signal the end of the scenario, errors are re-raised by the parent
+        queue.put(index)
+
+def run_sweep(G, T, founders, scenarios, n_generations, n_workers=2, threads_per_worker=1, seed=0,
+              start_method='spawn', poll_interval=1.0, pedigree=False) -> Iterator[Dict]:
+    """
+    Runs breeding scenarios in parallel and streams their per-generation results.
+
+    A worker that dies without reporting back (e.g. killed for running out of memory) breaks the pool;
+    the parent notices while polling for records and raises instead of waiting forever.
+
+    Args:
+        G (Genome): Genome shared by all scenarios.
+        T (Trait): Trait shared by all scenarios.
+        founders (torch.Tensor): Founder haplotypes (n_founders, ploidy, n_chr, n_loci); a scenario with
+                                 `pop_size` p starts from the first p founders.
+        scenarios (List[Dict]): Scenario parameters with keys `h2`, `selection_fraction`, `reps` and
+                                `pop_size` (see `sweep_grid`).
+        n_generations (int): Number of generations simulated per scenario.
+        n_workers (int): Number of worker processes. Defaults to 2.
+        threads_per_worker (int): Torch intra-op threads per worker. Defaults to 1.
+        seed (int): Seed of the generator drawing the per-scenario seeds. Defaults to 0.
+        start_method (str): Multiprocessing start method. Defaults to 'spawn'.
+        poll_interval (float): Seconds to wait for a record before checking the workers. Defaults to 1.
+        pedigree (bool): Keep a pedigree per scenario. Defaults to False.
+
+    Yields:
+        Dict: The `BreedingSimulation.history` entry of one generation, together with the scenario
+              parameters and the `scenario` index, in order of arrival.
+    """
+    if any(scenario['pop_size'] > len(founders) for scenario in scenarios):
+        raise ValueError("Every scenario's pop_size must not exceed the number of founders.")
+    founders.share_memory_()
+    T.effects.share_memory_()
+
+    generator = torch.Generator().manual_seed(seed)
+    seeds = torch.randint(2**62, (len(scenarios),), generator=generator).tolist()
+    tasks = [(index, scenario, seeds[index], n_generations, pedigree) for index, scenario in enumerate(scenarios)]
+
+    ctx = mp.get_context(start_method)
+    queue = ctx.Queue()
+    # unlike multiprocessing.Pool, the executor fails the pending futures when a worker process dies
+    with ProcessPoolExecutor(n_workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(G, T, founders, queue, threads_per_worker)) as pool:
+        futures = [pool.submit(_run_scenario, task) for task in tasks]
+        remaining = len(tasks)
+        while remaining:
+            try:
+                record = queue.get(timeout=poll_interval)
+            except queue_module.Empty:
+                for future in futures:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()  # e.g. BrokenProcessPool after a worker was killed
+                continue
+            if isinstance(record, int):
+                remaining -= 1
+            else:
+                yield record
+        for future in futures:
+            future.result()  # re-raises the first error of a worker
@@ -1,7 +1,7 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/02_trait.ipynb.
 
 # %% auto 0
-__all__ = ['select_qtl_loci', 'TraitModule']
+__all__ = ['select_qtl_loci', 'TraitModule', 'NonAdditiveTraitModule']
 
 # %% ../nbs/02_trait.ipynb 3
 from .core import *
@@ -42,6 +42,10 @@ def select_qtl_loci(num_qtl_per_chromosome: int, genome: Genome) -> torch.Tensor
 class TraitModule(nn.Module):
     """
     Module for managing and simulating multiple correlated additive traits.
+
+    Only the QTL are stored: `qtl_indices` holds their flat column indices into
+    (n_chromosomes * n_loci_per_chromosome) and `effects` the (n_qtl, n_traits) effect matrix,
+    so evaluating a trait costs O(n_qtl) per individual rather than O(genome size).
     """
     def __init__(self, genome: Genome, founder_pop, target_means: torch.Tensor, target_vars: torch.Tensor, 
                  correlation_matrix: Optional[torch.Tensor], n_qtl_per_chromosome: int):
@@ -65,26 +69,45 @@ class TraitModule(nn.Module):
         self.n_qtl_per_chromosome = n_qtl_per_chromosome
         
         self.qtl_loci = select_qtl_loci(n_qtl_per_chromosome, genome)
+        self.qtl_indices = self.qtl_loci.flatten().nonzero().squeeze(1)
         self.effects = self._initialize_correlated_effects()
         self.intercepts = self._calculate_intercepts()
+        self.varE = None  # set once by `calibrate_error_variance`
+        self.calibrated_h2 = None  # the h2 (Python number or tensor object) `varE` was calibrated for
+        self.gxe_effects = None  # set by `set_gxe_variance`
+        self.gxe_intercepts = None
 
-    def _initialize_correlated_effects(self) -> torch.Tensor:
+    def _initialize_correlated_effects(self, n_qtl: Optional[int] = None) -> torch.Tensor:
         """
         Samples and scales correlated additive effects for all traits.
 
+        Args:
+            n_qtl (Optional[int]): Number of effects to sample. Defaults to the number of QTL.
+
         Returns:
-            torch.Tensor: Correlated effects (n_chromosomes, n_loci_per_chromosome, n_traits).
+            torch.Tensor: Correlated QTL effects (n_qtl, n_traits).
         """
-        n_chr, n_loci = self.genome.genetic_map.shape
+        n_qtl = len(self.qtl_indices) if n_qtl is None else n_qtl
         
         if self.correlation_matrix is not None:
             L = torch.linalg.cholesky(self.correlation_matrix)
-            uncorrelated_effects = torch.randn(n_chr, n_loci, self.n_traits, device=self.genome.device)
-            uncorrelated_effects = uncorrelated_effects.reshape(n_chr * n_loci, self.n_traits)
-            correlated_effects = torch.matmul(L, uncorrelated_effects.T).T
-            return correlated_effects.reshape(n_chr, n_loci, self.n_traits)
+            uncorrelated_effects = torch.randn(n_qtl, self.n_traits, device=self.genome.device)
+            return torch.matmul(L, uncorrelated_effects.T).T
         else:
-            return torch.randn(n_chr, n_loci, self.n_traits, device=self.genome.device)
+            return torch.randn(n_qtl, self.n_traits, device=self.genome.device)
+
+    @property
+    def dense_effects(self) -> torch.Tensor:
+        """
+        QTL effects scattered over the whole genome, zero at non-QTL loci.
+
+        Returns:
+            torch.Tensor: Effects (n_chromosomes, n_loci_per_chromosome, n_traits).
+        """
+        n_chr, n_loci = self.qtl_loci.shape
+        dense = torch.zeros(n_chr * n_loci, self.n_traits, device=self.effects.device)
+        dense[self.qtl_indices] = self.effects
+        return dense.view(n_chr, n_loci, self.n_traits)
 
     def _calculate_intercepts(self) -> torch.Tensor:
         """
@@ -97,45 +120,76 @@ class TraitModule(nn.Module):
         Returns:
             torch.Tensor: Trait intercepts (n_traits).
         """
-        dosages = self.founder_pop.get_dosages()
+        dosages = self.founder_pop.get_dosages(self.qtl_indices)
         unscaled_bvs = self.calculate_breeding_values(dosages, scale_effects=False)
         unscaled_var = unscaled_bvs.var(dim=0, unbiased=False)
         unscaled_mean = unscaled_bvs.mean(dim=0)
         
         scaling_factors = torch.sqrt(self.target_vars / unscaled_var)
-        self.effects *= scaling_factors.view(1, 1, self.n_traits)  # Scale the effects
+        self.effects *= scaling_factors.view(1, self.n_traits)  # Scale the effects
         return self.target_means - (unscaled_mean * scaling_factors)
 
+    def _qtl_dosages(self, dosages: torch.Tensor) -> torch.Tensor:
+        """Gathers the QTL columns (..., n_qtl) from full dosages (..., n_chr, n_loci); QTL dosages pass through."""
+        if dosages.dim() >= 3 and dosages.shape[-2:] == self.qtl_loci.shape:
+            return dosages.flatten(-2).index_select(-1, self.qtl_indices)
+        return dosages
+
     def calculate_breeding_values(self, dosages: torch.Tensor, scale_effects: bool = True) -> torch.Tensor:
         """
         Calculates breeding values for all traits given allele dosages.
 
+        Only the QTL columns are gathered and cast to float before the (n_qtl, n_traits) product.
+
         Args:
-            dosages (torch.Tensor): Allele dosages (population_size, n_chromosomes, n_loci_per_chromosome).
+            dosages (torch.Tensor): Allele dosages (population_size, n_chromosomes, n_loci_per_chromosome),
+                                    or QTL dosages (population_size, n_qtl) such as
+                                    `population.get_dosages(trait.qtl_indices)`. A leading replicate
+                                    axis (n_replicates, population_size, ...) is supported.
             scale_effects (bool): Whether to scale effects to target variances. Defaults to True.
 
         Returns:
-            torch.Tensor: Breeding values for all traits (population_size, n_traits).
+            torch.Tensor: Breeding values for all traits ([n_replicates,] population_size, n_traits).
         """
+        breeding_values = self._qtl_dosages(dosages).float() @ self.effects
         if scale_effects:
-            return torch.einsum('ijk,jkl->il', dosages.float(), self.effects) + self.intercepts 
+            return breeding_values + self.intercepts
         else:
-            return torch.einsum('ijk,jkl->il', dosages.float(), self.effects)
+            return breeding_values
     
+    def calculate_genetic_values(self, dosages: torch.Tensor) -> torch.Tensor:
+        """
+        Genetic values that phenotypes are built on. For additive traits these are the breeding values.
+
+        Args:
+            dosages (torch.Tensor): Allele dosages ([n_replicates,] pop_size, n_chr, n_loci) or QTL
+                                    dosages ([n_replicates,] pop_size, n_qtl).
+
+        Returns:
+            torch.Tensor: Genetic values ([n_replicates,] pop_size, n_traits).
+        """
+        return self.calculate_breeding_values(dosages)
+
     def forward(self, dosages: torch.Tensor, h2: Optional[Union[float, torch.Tensor]] = None, 
-                varE: Optional[Union[float, torch.Tensor]] = None) -> torch.Tensor:
+                varE: Optional[Union[float, torch.Tensor]] = None, batch_h2: bool = False) -> torch.Tensor:
         """
-        Calculates breeding values and adds environmental noise.
+        Calculates genetic values and adds environmental noise.
+
+        `h2` is the heritability in the founders: the error variance is calibrated from them once (see
+        `calibrate_error_variance`) and reused, so heritability falls as selection reduces the genetic variance.
 
         Args:
-            dosages (torch.Tensor): Allele dosages (pop_size, n_chr, n_loci).
+            dosages (torch.Tensor): Allele dosages ([n_replicates,] pop_size, n_chr, n_loci) or QTL
+                                    dosages ([n_replicates,] pop_size, n_qtl).
             h2 (Optional[Union[float, torch.Tensor]]): Heritability (single value or per trait). 
             varE (Optional[Union[float, torch.Tensor]]): Environmental variance (single value or per trait).
+            batch_h2 (bool): Derive the error variance from the genetic variance of this batch instead, per
+                             replicate with a leading replicate axis. Defaults to False.
 
         Returns:
-            torch.Tensor: Phenotypes (pop_size, n_traits).
+            torch.Tensor: Phenotypes ([n_replicates,] pop_size, n_traits).
         """
-        breeding_values = self.calculate_breeding_values(dosages.float())
+        breeding_values = self.calculate_genetic_values(dosages)
         
         # Add environmental noise
         if varE is not None:
@@ -144,12 +198,216 @@ class TraitModule(nn.Module):
             env_noise = torch.randn_like(breeding_values) * torch.sqrt(varE)
             return breeding_values + env_noise 
         elif h2 is not None:
-            if isinstance(h2, float):
-                h2 = torch.tensor([h2] * self.n_traits, device=self.genome.device)
-            varG = breeding_values.var(dim=0, unbiased=False)
-            varE = varG * (1 - h2) / h2
+            if batch_h2:
+                if isinstance(h2, float):
+                    h2 = torch.tensor([h2] * self.n_traits, device=self.genome.device)
+                varG = breeding_values.var(dim=-2, unbiased=False, keepdim=True)
+                varE = varG * (1 - h2) / h2
+            else:
+                # compared on the host: numbers by value, tensors by identity, so no device sync per call
+                calibrated = h2 is self.calibrated_h2 or (isinstance(h2, (int, float)) and h2 == self.calibrated_h2)
+                if self.varE is None or not calibrated:
+                    self.calibrate_error_variance(h2)
+                varE = self.varE
             env_noise = torch.randn_like(breeding_values) * torch.sqrt(varE)
             return breeding_values + env_noise
         else:
             return breeding_values  # No noise added
 
+    def calibrate_error_variance(self, h2: Union[float, torch.Tensor]) -> torch.Tensor:
+        """
+        Fixes the plot-level error variance from the founders, so heritability is not re-derived per batch.
+
+        Args:
+            h2 (Union[float, torch.Tensor]): Plot-level heritability in the founders (single value or per trait).
+
+        Returns:
+            torch.Tensor: Error variance per trait (n_traits), also stored as `varE`.
+        """
+        self.calibrated_h2 = h2
+        h2 = torch.as_tensor(h2, dtype=torch.float32, device=self.genome.device)
+        varG = self.calculate_genetic_values(self.founder_pop.get_dosages(self.qtl_indices)).var(dim=0, unbiased=False)
+        self.varE = varG * (1 - h2) / h2
+        return self.varE
+
+    def set_gxe_variance(self, gxe_vars: Union[float, torch.Tensor]):
+        """
+        Samples QTL effects for the genotype-by-environment interaction.
+
+        In environment `e` the QTL effects are `effects + w_e * gxe_effects`, with `w_e` the environment
+        covariate from `sample_environments`. The covariance of genetic values between environments `e`
+        and `f` is then varG + w_e * w_f * gxe_vars. The GxE values are scaled to `gxe_vars` and centered
+        in the founders.
+
+        Args:
+            gxe_vars (Union[float, torch.Tensor]): GxE variance in the founders (single value or per trait).
+        """
+        gxe_vars = torch.as_tensor(gxe_vars, dtype=torch.float32, device=self.genome.device).expand(self.n_traits)
+        effects = torch.randn(len(self.qtl_indices), self.n_traits, device=self.genome.device)
+        values = self.founder_pop.get_dosages(self.qtl_indices).float() @ effects
+        scaling_factors = torch.sqrt(gxe_vars / values.var(dim=0, unbiased=False))
+        self.gxe_effects = effects * scaling_factors
+        self.gxe_intercepts = -values.mean(dim=0) * scaling_factors
+
+    def sample_environments(self, n_environments: int,
+                            environment_vars: Union[float, torch.Tensor] = 0.) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Samples the environments of a trial.
+
+        Args:
+            n_environments (int): Number of environments, e.g. location-years.
+            environment_vars (Union[float, torch.Tensor]): Variance of the environment main effects
+                                                           (single value or per trait). Defaults to 0.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: GxE covariates and main effects, both (n_environments, n_traits).
+        """
+        environment_vars = torch.as_tensor(environment_vars, dtype=torch.float32, device=self.genome.device)
+        covariates = torch.randn(n_environments, self.n_traits, device=self.genome.device)
+        main_effects = torch.randn(n_environments, self.n_traits, device=self.genome.device) * torch.sqrt(environment_vars)
+        return covariates, main_effects
+
+    def genetic_values(self, dosages: torch.Tensor, covariates: torch.Tensor,
+                       main_effects: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Genetic values in every environment from one QTL gather.
+
+        Args:
+            dosages (torch.Tensor): Allele dosages ([n_replicates,] pop_size, n_chr, n_loci) or QTL
+                                    dosages ([n_replicates,] pop_size, n_qtl).
+            covariates (torch.Tensor): GxE covariates (n_environments, n_traits).
+            main_effects (Optional[torch.Tensor]): Environment main effects (n_environments, n_traits).
+
+        Returns:
+            torch.Tensor: Genetic values ([n_replicates,] pop_size, n_environments, n_traits).
+        """
+        dosages = self._qtl_dosages(dosages)
+        values = self.calculate_genetic_values(dosages).unsqueeze(-2)
+        if self.gxe_effects is None:
+            values = values.expand(*dosages.shape[:-1], len(covariates), self.n_traits)
+        else:
+            gxe = dosages.float() @ self.gxe_effects + self.gxe_intercepts
+            values = values + gxe.unsqueeze(-2) * covariates
+        return values if main_effects is None else values + main_effects
+
+    def trial(self, dosages: torch.Tensor, covariates: torch.Tensor, main_effects: Optional[torch.Tensor] = None,
+              n_reps: int = 1, plot_means: bool = False) -> torch.Tensor:
+        """
+        Phenotypes of a multi-environment trial with replicated plots.
+
+        Plot errors use the error variance fixed by `calibrate_error_variance`. The mean of `n_reps` plots is
+        drawn directly with variance varE / n_reps, so `plot_means` never materializes the single plots.
+
+        Args:
+            dosages (torch.Tensor): Allele dosages ([n_replicates,] pop_size, n_chr, n_loci) or QTL
+                                    dosages ([n_replicates,] pop_size, n_qtl).
+            covariates (torch.Tensor): GxE covariates (n_environments, n_traits).
+            main_effects (Optional[torch.Tensor]): Environment main effects (n_environments, n_traits).
+            n_reps (int): Plots per individual and environment. Defaults to 1.
+            plot_means (bool): Whether to return the mean over the plots. Defaults to False.
+
+        Returns:
+            torch.Tensor: Plot phenotypes ([n_replicates,] pop_size, n_environments, n_reps, n_traits), or
+                          their means ([n_replicates,] pop_size, n_environments, n_traits).
+        """
+        if self.varE is None:
+            raise ValueError("Call calibrate_error_variance(h2) before phenotyping trials.")
+        values = self.genetic_values(dosages, covariates, main_effects)
+        if plot_means:
+            return values + torch.randn_like(values) * torch.sqrt(self.varE / n_reps)
+        noise = torch.randn(*values.shape[:-1], n_reps, self.n_traits, device=values.device) * torch.sqrt(self.varE)
+        return values.unsqueeze(-2) + noise
+
+# %% ../nbs/02_trait.ipynb 11
+class NonAdditiveTraitModule(TraitModule):
+    """
+    Module for correlated traits with additive, dominance and sparse pairwise epistatic effects.
+
+    Dominance effects (n_qtl, n_traits) act on heterozygosity indicators, and epistatic effects
+    (n_pairs, n_traits) on the product of the centered dosages of the QTL pairs in `epistatic_pairs`.
+    Evaluating a trait costs O(n_qtl + n_pairs) per individual.
+    """
+    def __init__(self, genome: Genome, founder_pop, target_means: torch.Tensor, target_vars: torch.Tensor,
+                 correlation_matrix: Optional[torch.Tensor], n_qtl_per_chromosome: int,
+                 variance_proportions: Tuple[float, float, float] = (0.6, 0.3, 0.1), n_epistatic_pairs: int = 100,
+                 dominance_degree: float = 0.):
+        """
+        Initializes the NonAdditiveTraitModule.
+
+        Args:
+            genome (Genome): The genome object.
+            target_means (torch.Tensor): Target means of the genetic values (n_traits or 1 for single trait).
+            target_vars (torch.Tensor): Target genetic variances in the founders (n_traits or 1 for single trait).
+            correlation_matrix (Optional[torch.Tensor]): Correlation matrix between traits (n_traits, n_traits) or None for single trait.
+            n_qtl_per_chromosome (int): Number of QTLs per chromosome for each trait.
+            variance_proportions (Tuple[float, float, float]): Additive, dominance and epistatic shares of the
+                                                               founder genetic variance. Defaults to (0.6, 0.3, 0.1).
+            n_epistatic_pairs (int): Number of interacting QTL pairs. Defaults to 100.
+            dominance_degree (float): Mean dominance degree; positive values give heterosis. Defaults to 0.
+        """
+        super().__init__(genome, founder_pop, target_means, target_vars, correlation_matrix, n_qtl_per_chromosome)
+        self.variance_proportions = torch.as_tensor(variance_proportions, dtype=torch.float32, device=genome.device)
+        self.dominance_degree = dominance_degree
+        n_qtl = len(self.qtl_indices)
+        self.dominance_effects = (dominance_degree + self._initialize_correlated_effects()) * self.effects.abs()
+        first = torch.randint(0, n_qtl, (n_epistatic_pairs,), device=genome.device)
+        second = (first + torch.randint(1, n_qtl, (n_epistatic_pairs,), device=genome.device)) % n_qtl
+        self.epistatic_pairs = torch.stack([first, second], dim=1)
+        self.epistatic_effects = self._initialize_correlated_effects(n_epistatic_pairs)
+        self.intercepts = self._calibrate_components()
+
+    def genetic_components(self, dosages: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Additive, dominance and epistatic values, intercepts excluded.
+
+        Args:
+            dosages (torch.Tensor): Allele dosages ([n_replicates,] pop_size, n_chr, n_loci) or QTL
+                                    dosages ([n_replicates,] pop_size, n_qtl).
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor, torch.Tensor]: The three components, each ([n_replicates,] pop_size, n_traits).
+        """
+        dosages = self._qtl_dosages(dosages)
+        ploidy = self.genome.ploidy
+        additive = dosages.float() @ self.effects
+        heterozygous = (dosages > 0) & (dosages < ploidy)
+        dominance = heterozygous.float() @ self.dominance_effects
+        centered = dosages.float() - ploidy / 2
+        # gather both QTL of every pair, multiply, and reduce the pair products onto the traits
+        interactions = centered.index_select(-1, self.epistatic_pairs[:, 0]) * centered.index_select(-1, self.epistatic_pairs[:, 1])
+        epistatic = interactions @ self.epistatic_effects
+        return additive, dominance, epistatic
+
+    def _calibrate_components(self) -> torch.Tensor:
+        """
+        Scales every component to its share of the target variance in the founders.
+
+        Returns:
+            torch.Tensor: Trait intercepts (n_traits).
+        """
+        dosages = self.founder_pop.get_dosages(self.qtl_indices)
+        components = self.genetic_components(dosages)
+        target_vars = self.variance_proportions.view(3, 1) * self.target_vars
+        scaling_factors = [torch.sqrt(target / values.var(dim=0, unbiased=False)).nan_to_num(0.)
+                           for target, values in zip(target_vars, components)]
+        # the components covary in a finite population: rescale them jointly to the total target variance
+        total = sum(values * scaling for values, scaling in zip(components, scaling_factors))
+        joint = torch.sqrt(self.target_vars / total.var(dim=0, unbiased=False))
+        self.effects *= scaling_factors[0] * joint
+        self.dominance_effects *= scaling_factors[1] * joint
+        self.epistatic_effects *= scaling_factors[2] * joint
+        return self.target_means - total.mean(dim=0) * joint
+
+    def calculate_genetic_values(self, dosages: torch.Tensor) -> torch.Tensor:
+        """
+        Genetic values: the sum of the additive, dominance and epistatic values plus the intercepts.
+
+        Args:
+            dosages (torch.Tensor): Allele dosages ([n_replicates,] pop_size, n_chr, n_loci) or QTL
+                                    dosages ([n_replicates,] pop_size, n_qtl).
+
+        Returns:
+            torch.Tensor: Genetic values ([n_replicates,] pop_size, n_traits).
+        """
+        additive, dominance, epistatic = self.genetic_components(dosages)
+        return additive + dominance + epistatic + self.intercepts